@@ -1,4 +1,4 @@
-from typing import TypeAlias
+from typing import Any, TypeAlias
 
 import numpy as np
 import pandas as pd
@@ -15,6 +15,7 @@ NumericLike: TypeAlias = float | int | pd.Series
 DEFAULT_W = dict(wQ=0.4, wA=0.4, wC=0.2, wP=0.0)
 K_SIGMOID = 0.15
 DEFAULT_DISTANCE_SCORE_LIMIT_KM = 15.0
+DEFAULT_TRAVEL_TIME_SCORE_LIMIT_MIN = 60.0
 FIT_COMPONENTS = {
     "ranking": "RankingComponent",
     "admission": "AdmissionComponent",
@@ -28,6 +29,7 @@ BEST_SCHOOL_SUMMARY_COLUMNS = [
     "OddzialNazwa",
     "Liczba pasujących klas",
     "OdlegloscKm",
+    "CzasDojazduMin",
     "RankingScore",
     "AdmissionScore",
     "DistanceScore",
@@ -83,6 +85,23 @@ def add_distance_from_point(
     return df
 
 
+def add_travel_time_from_grid(
+    df_schools: pd.DataFrame, grid: Any, start_lat: float, start_lon: float
+) -> pd.DataFrame:
+    """Dodaje kolumnę CzasDojazduMin odczytaną z siatki czasów dojazdu.
+
+    `grid` to `travel_time_grid.TravelTimeGrid` (O(1) na punkt). Szkoły spoza
+    siatki i punkty poza jej zasięgiem dostają NaN.
+    """
+    df = df_schools.copy()
+    if grid is None or "SzkolaIdentyfikator" not in df.columns:
+        df["CzasDojazduMin"] = np.nan
+        return df
+    minutes = grid.lookup(start_lat, start_lon)
+    df["CzasDojazduMin"] = df["SzkolaIdentyfikator"].astype(str).map(minutes)
+    return df
+
+
 def _lat_lng_from_mapping(value: object) -> tuple[float, float] | None:
     """Wyciąga parę (lat, lng) ze słownika mapy lub zwraca None."""
     if not isinstance(value, dict):
@@ -115,17 +134,34 @@ def shortlist_schools_by_distance(
     df_schools: pd.DataFrame,
     limit: int = 40,
     max_distance_km: float | None = None,
+    spatial_index: Any = None,
+    start_point: tuple[float, float] | None = None,
 ) -> pd.DataFrame:
-    """Zwraca najbliższe szkoły z uzupełnioną odległością."""
-    if "OdlegloscKm" not in df_schools.columns:
+    """Zwraca najbliższe szkoły z uzupełnioną odległością.
+
+    Z `spatial_index` (`spatial_index.SpatialIndex` zbudowany z `df_schools`)
+    i `start_point` szkoły wybiera zapytanie o `limit` najbliższych, a
+    OdlegloscKm liczy się tylko dla nich; bez indeksu potrzebna jest kolumna
+    z `add_distance_from_point()`.
+    """
+    use_index = spatial_index is not None and start_point is not None
+    if not use_index and "OdlegloscKm" not in df_schools.columns:
         raise ValueError("Brak kolumny OdlegloscKm; wywołaj add_distance_from_point().")
     if limit <= 0:
         return df_schools.iloc[0:0].copy()
-    df_with_distance = df_schools.dropna(subset=["OdlegloscKm"]).copy()
-    if max_distance_km is not None:
-        df_with_distance = df_with_distance[
-            df_with_distance["OdlegloscKm"] <= float(max_distance_km)
-        ]
+    if spatial_index is not None and start_point is not None:
+        start_lat, start_lon = start_point
+        nearest = spatial_index.nearest(
+            start_lat, start_lon, k=limit, max_distance_km=max_distance_km
+        )
+        df_with_distance = df_schools.loc[nearest.index].copy()
+        df_with_distance["OdlegloscKm"] = nearest.to_numpy()
+    else:
+        df_with_distance = df_schools.dropna(subset=["OdlegloscKm"]).copy()
+        if max_distance_km is not None:
+            df_with_distance = df_with_distance[
+                df_with_distance["OdlegloscKm"] <= float(max_distance_km)
+            ]
     return (
         df_with_distance.sort_values(["OdlegloscKm", "NazwaSzkoly"], na_position="last")
         .head(limit)
@@ -179,6 +215,17 @@ def _score_distance(
     return (1 - distance_num / float(score_limit_km)).clip(0, 1)
 
 
+def _score_travel_time(
+    minutes: pd.Series,
+    score_limit_min: float = DEFAULT_TRAVEL_TIME_SCORE_LIMIT_MIN,
+) -> pd.Series:
+    """Skaluje czas dojazdu do zakresu 0-1: 0 min daje 1.0, limit i więcej 0.0."""
+    if score_limit_min <= 0:
+        raise ValueError("score_limit_min musi być większe od zera.")
+    minutes_num = pd.to_numeric(minutes, errors="coerce")
+    return (1 - minutes_num / float(score_limit_min)).clip(0, 1)
+
+
 def _score_profile(df: pd.DataFrame, subjects: list[str] | None) -> pd.Series:
     """Liczy udział wymaganych przedmiotów obecnych w wierszu klasy.
 
@@ -229,7 +276,14 @@ def build_fit_explanation(row: pd.Series) -> str:
             plusy.append("profil częściowo pasuje")
 
     distance = row.get("OdlegloscKm")
-    if pd.notna(distance):
+    travel_time = row.get("CzasDojazduMin")
+    if pd.notna(travel_time):
+        travel_time_text = f"dojazd {float(travel_time):.0f} min"
+        if travel_time <= 20:
+            plusy.append(f"blisko ({travel_time_text})")
+        elif travel_time >= 45:
+            ryzyka.append(f"daleko ({travel_time_text})")
+    elif pd.notna(distance):
         distance_text = f"{float(distance):.1f} km"
         if distance <= 5:
             plusy.append(f"blisko ({distance_text})")
@@ -285,8 +339,13 @@ def score_personalized_classes(
     profile_subjects: list[str] | None = None,
     distance_score_limit_km: float = DEFAULT_DISTANCE_SCORE_LIMIT_KM,
     ranking_max_reference: float | None = None,
+    travel_time_score_limit_min: float = DEFAULT_TRAVEL_TIME_SCORE_LIMIT_MIN,
 ) -> pd.DataFrame:
-    """Liczy FitScore 0-100 dla klas według preferencji użytkownika."""
+    """Liczy FitScore 0-100 dla klas według preferencji użytkownika.
+
+    Składowa odległości korzysta z CzasDojazduMin (siatka czasów dojazdu),
+    a gdy czasu brak - z odległości w linii prostej OdlegloscKm.
+    """
     df = df_classes.copy()
     df["MinProg"] = _compute_min_prog(df)
     df["AdmitMargin"] = points - df["MinProg"]
@@ -309,6 +368,10 @@ def score_personalized_classes(
         )
     else:
         df["DistanceComponent"] = np.nan
+    if "CzasDojazduMin" in df.columns:
+        df["DistanceComponent"] = _score_travel_time(
+            df["CzasDojazduMin"], score_limit_min=travel_time_score_limit_min
+        ).fillna(df["DistanceComponent"])
     df["ProfileComponent"] = _score_profile(df, profile_subjects)
 
     df["RankingScore"] = df["RankingComponent"] * 100
@@ -0,0 +1,190 @@
+"""Indeks przestrzenny współrzędnych szkół do zapytań o sąsiedztwo.
+
+Punkty rzutujemy równoodległościowo (km względem średniej szerokości zbioru)
+i wkładamy do siatki kwadratowych komórek ``cell_km``. Zapytanie o promień
+przegląda tylko komórki, które mogą go przeciąć, a kandydatów sprawdza
+dokładnym wzorem haversine, więc wynik jest taki sam jak przy pełnym
+przeglądzie, ale bez liczenia odległości do każdej szkoły (ani macierzy
+N×N przy liczeniu sąsiadów). Indeks buduje się raz na zbiór szkół; etykiety
+punktów to indeks ramki, z której powstał.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+DEFAULT_CELL_KM = 1.0
+# Zapas na błąd rzutu przy porównaniu z dokładnym haversine.
+PROJECTION_MARGIN = 1.01
+
+
+def _haversine_km(
+    lat: float, lon: float, lats: np.ndarray, lons: np.ndarray
+) -> np.ndarray:
+    lat_rad, lats_rad = math.radians(lat), np.radians(lats)
+    dlat = lats_rad - lat_rad
+    dlon = np.radians(lons) - math.radians(lon)
+    a = (
+        np.sin(dlat / 2) ** 2
+        + math.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class SpatialIndex:
+    """Siatka komórek ze współrzędnymi punktów i ich etykietami."""
+
+    def __init__(
+        self,
+        lat: Iterable[float],
+        lon: Iterable[float],
+        labels: Iterable[Any] | None = None,
+        cell_km: float = DEFAULT_CELL_KM,
+    ) -> None:
+        if cell_km <= 0:
+            raise ValueError("Rozmiar komórki indeksu musi być dodatni.")
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        if self.lat.shape != self.lon.shape:
+            raise ValueError("Różna liczba szerokości i długości geograficznych.")
+        if np.isnan(self.lat).any() or np.isnan(self.lon).any():
+            raise ValueError("Indeks przestrzenny nie przyjmuje brakujących pozycji.")
+        self.labels = pd.Index(range(len(self.lat)) if labels is None else list(labels))
+        if len(self.labels) != len(self.lat):
+            raise ValueError("Liczba etykiet nie zgadza się z liczbą punktów.")
+        self.cell_km = float(cell_km)
+        self.lat0 = float(self.lat.mean()) if len(self.lat) else 0.0
+        self.lon0 = float(self.lon.mean()) if len(self.lon) else 0.0
+        self._cos_lat0 = math.cos(math.radians(self.lat0))
+        self.x, self.y = self._project(self.lat, self.lon)
+        buckets: dict[tuple[int, int], list[int]] = defaultdict(list)
+        cx = np.floor(self.x / self.cell_km).astype(np.int64)
+        cy = np.floor(self.y / self.cell_km).astype(np.int64)
+        for position, cell in enumerate(zip(cx.tolist(), cy.tolist())):
+            buckets[cell].append(position)
+        self._cells: dict[tuple[int, int], np.ndarray] = {
+            cell: np.asarray(positions, dtype=np.intp)
+            for cell, positions in buckets.items()
+        }
+        self._max_abs_lat = float(np.abs(self.lat).max()) if len(self.lat) else 0.0
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        lat_col: str = "SzkolaLat",
+        lon_col: str = "SzkolaLon",
+        cell_km: float = DEFAULT_CELL_KM,
+    ) -> "SpatialIndex":
+        """Indeks wierszy ramki z poprawnymi współrzędnymi (etykiety = indeks)."""
+        if df.empty or {lat_col, lon_col}.difference(df.columns):
+            return cls([], [], [], cell_km=cell_km)
+        lat = pd.to_numeric(df[lat_col], errors="coerce")
+        lon = pd.to_numeric(df[lon_col], errors="coerce")
+        valid = lat.notna() & lon.notna()
+        return cls(lat[valid], lon[valid], df.index[valid], cell_km=cell_km)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def _project(
+        self, lat: np.ndarray | float, lon: np.ndarray | float
+    ) -> tuple[Any, Any]:
+        x = np.radians(np.subtract(lon, self.lon0)) * EARTH_RADIUS_KM * self._cos_lat0
+        y = np.radians(np.subtract(lat, self.lat0)) * EARTH_RADIUS_KM
+        return x, y
+
+    def _reach_km(self, lat: float, radius_km: float) -> float:
+        # Rzut zawyża odległość wschód-zachód dla punktów dalej od równika niż
+        # lat0; o tyle powiększamy zasięg przeglądanych komórek.
+        highest = max(self._max_abs_lat, abs(lat))
+        stretch = self._cos_lat0 / max(math.cos(math.radians(highest)), 1e-9)
+        return radius_km * max(stretch, 1.0) * PROJECTION_MARGIN
+
+    def _candidates(self, lat: float, lon: float, reach_km: float) -> np.ndarray:
+        qx, qy = self._project(lat, lon)
+        x_lo, x_hi = (
+            math.floor((qx - reach_km) / self.cell_km),
+            math.floor((qx + reach_km) / self.cell_km),
+        )
+        y_lo, y_hi = (
+            math.floor((qy - reach_km) / self.cell_km),
+            math.floor((qy + reach_km) / self.cell_km),
+        )
+        if (x_hi - x_lo + 1) * (y_hi - y_lo + 1) >= len(self._cells):
+            cells = [
+                positions
+                for (cx, cy), positions in self._cells.items()
+                if x_lo <= cx <= x_hi and y_lo <= cy <= y_hi
+            ]
+        else:
+            cells = [
+                self._cells[(cx, cy)]
+                for cx in range(x_lo, x_hi + 1)
+                for cy in range(y_lo, y_hi + 1)
+                if (cx, cy) in self._cells
+            ]
+        if not cells:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(cells)
+
+    def _within(
+        self, lat: float, lon: float, radius_km: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        if not len(self) or radius_km < 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        positions = self._candidates(lat, lon, self._reach_km(lat, radius_km))
+        distances = _haversine_km(lat, lon, self.lat[positions], self.lon[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.lexsort((positions, distances))
+        return positions[order], distances[order]
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> pd.Series:
+        """Odległości (km) punktów w promieniu, rosnąco, z etykietami w indeksie."""
+        positions, distances = self._within(lat, lon, radius_km)
+        return pd.Series(distances, index=self.labels[positions], dtype=float)
+
+    def count_radius(self, lat: float, lon: float, radius_km: float) -> int:
+        """Liczba punktów w promieniu."""
+        return len(self._within(lat, lon, radius_km)[0])
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 1,
+        max_distance_km: float | None = None,
+    ) -> pd.Series:
+        """``k`` najbliższych punktów (odległości w km, rosnąco).
+
+        Promień rośnie dwukrotnie od rozmiaru komórki, aż obejmie ``k`` punktów
+        (albo cały zbiór) lub dojdzie do ``max_distance_km``.
+        """
+        k = min(k, len(self))
+        if k <= 0:
+            return pd.Series(dtype=float, index=self.labels[:0])
+        radius_km = self.cell_km
+        while True:
+            if max_distance_km is not None and radius_km >= max_distance_km:
+                radius_km = float(max_distance_km)
+            positions, distances = self._within(lat, lon, radius_km)
+            if len(positions) >= k or radius_km == max_distance_km:
+                break
+            radius_km *= 2
+        return pd.Series(distances[:k], index=self.labels[positions[:k]], dtype=float)
+
+    def neighbour_counts(self, radius_km: float) -> pd.Series:
+        """Dla każdego punktu liczba innych punktów w promieniu ``radius_km``."""
+        counts = [
+            self.count_radius(lat, lon, radius_km) - 1
+            for lat, lon in zip(self.lat.tolist(), self.lon.tolist())
+        ]
+        return pd.Series(counts, index=self.labels, dtype=int)
@@ -0,0 +1,492 @@
+"""Lokalny router komunikacji miejskiej na rozkładzie GTFS (algorytm RAPTOR).
+
+Rozkład (np. ZTM Warszawa) jest wczytywany z katalogu albo archiwum ZIP i
+zamieniany na zwarte tablice: kursy o tej samej sekwencji przystanków tworzą
+wzorzec z macierzami przyjazdów/odjazdów ``(kursy, przystanki)`` posortowanymi
+tak, by kursy się nie wyprzedzały (kurs wyprzedzający trafia do osobnego
+wzorca). Przesiadki piesze łączą przystanki w promieniu ``transfer_radius_m``.
+
+Zapytanie jeden-do-wielu (``TransitRouter.travel_minutes``) liczy najwcześniejsze
+przyjazdy rundami RAPTOR: runda k skanuje wzorce przechodzące przez
+przystanki poprawione w rundzie k-1 (skan wzorca jest wektorowy), a potem
+rozchodzi się pieszo. Dojście do przystanków i zejście do celów to marsz w
+linii prostej ze stałą prędkością. Wynik to minuty od odjazdu do każdego celu
+(``NaN``, gdy cel jest nieosiągalny w ``max_minutes``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import logging
+import sys
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000.0
+WALK_SPEED_MPS = 1.25  # ok. 4,5 km/h
+MAX_ACCESS_WALK_M = 800.0
+TRANSFER_RADIUS_M = 300.0
+MAX_ROUNDS = 5  # liczba przejazdów, czyli do 4 przesiadek
+MAX_MINUTES = 120.0
+UNREACHED = np.iinfo(np.int32).max
+
+
+def parse_gtfs_time(values: pd.Series) -> np.ndarray:
+    """``HH:MM:SS`` (także powyżej 24:00) na sekundy od północy; NaN dla pustych."""
+    parts = values.astype("string").str.strip().str.split(":", expand=True)
+    if parts.shape[1] < 3:
+        return np.full(len(values), np.nan)
+    numbers = parts.iloc[:, :3].apply(pd.to_numeric, errors="coerce")
+    return (numbers[0] * 3600 + numbers[1] * 60 + numbers[2]).to_numpy(float)
+
+
+def _read_gtfs_table(
+    source: Path, name: str, usecols: list[str] | None = None, required: bool = True
+) -> pd.DataFrame | None:
+    dtype = {col: "string" for col in usecols or [] if col.endswith("_id")}
+    if source.is_dir():
+        path = source / name
+        if not path.exists():
+            if required:
+                raise FileNotFoundError(f"Brak {name} w GTFS: {source}")
+            return None
+        return pd.read_csv(path, usecols=usecols, dtype=dtype)
+    with zipfile.ZipFile(source) as archive:
+        if name not in archive.namelist():
+            if required:
+                raise FileNotFoundError(f"Brak {name} w GTFS: {source}")
+            return None
+        with archive.open(name) as f:
+            return pd.read_csv(f, usecols=usecols, dtype=dtype)
+
+
+def active_service_ids(
+    calendar: pd.DataFrame | None,
+    calendar_dates: pd.DataFrame | None,
+    service_date: datetime.date,
+) -> set[str]:
+    """Usługi kursujące w danym dniu (``calendar`` + wyjątki ``calendar_dates``)."""
+    active: set[str] = set()
+    day = int(service_date.strftime("%Y%m%d"))
+    if calendar is not None and not calendar.empty:
+        weekday = service_date.strftime("%A").lower()
+        in_range = (pd.to_numeric(calendar["start_date"]) <= day) & (
+            pd.to_numeric(calendar["end_date"]) >= day
+        )
+        runs = pd.to_numeric(calendar[weekday]) == 1
+        active = set(calendar.loc[in_range & runs, "service_id"].astype(str))
+    if calendar_dates is not None and not calendar_dates.empty:
+        today = calendar_dates[pd.to_numeric(calendar_dates["date"]) == day]
+        exception = pd.to_numeric(today["exception_type"])
+        active |= set(today.loc[exception == 1, "service_id"].astype(str))
+        active -= set(today.loc[exception == 2, "service_id"].astype(str))
+    return active
+
+
+def _local_xy(lat: Any, lon: Any, lat0: float) -> np.ndarray:
+    """Rzut równoodległościowy na metry wokół szerokości ``lat0``."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    x = EARTH_RADIUS_M * np.radians(lon) * np.cos(np.radians(lat0))
+    y = EARTH_RADIUS_M * np.radians(lat)
+    return np.column_stack([x, y])
+
+
+def pairs_within(
+    xy_a: np.ndarray, xy_b: np.ndarray, radius: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pary (i z A, j z B, odległość) w promieniu ``radius`` przez siatkę komórek."""
+    empty = (np.empty(0, int), np.empty(0, int), np.empty(0))
+    if len(xy_a) == 0 or len(xy_b) == 0:
+        return empty
+    cells_a = np.floor(xy_a / radius).astype(np.int64)
+    cells_b = pd.DataFrame(
+        {
+            "cx": np.floor(xy_b[:, 0] / radius).astype(np.int64),
+            "cy": np.floor(xy_b[:, 1] / radius).astype(np.int64),
+            "j": np.arange(len(xy_b)),
+        }
+    )
+    offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+    shifted = (cells_a[:, None, :] + offsets[None, :, :]).reshape(-1, 2)
+    probe = pd.DataFrame(
+        {
+            "cx": shifted[:, 0],
+            "cy": shifted[:, 1],
+            "i": np.repeat(np.arange(len(xy_a)), len(offsets)),
+        }
+    )
+    matched = probe.merge(cells_b, on=["cx", "cy"])
+    if matched.empty:
+        return empty
+    i = matched["i"].to_numpy()
+    j = matched["j"].to_numpy()
+    distance = np.hypot(*(xy_a[i] - xy_b[j]).T)
+    keep = distance <= radius
+    return i[keep], j[keep], distance[keep]
+
+
+@dataclass
+class Pattern:
+    """Kursy o tej samej sekwencji przystanków, bez wyprzedzania."""
+
+    stops: np.ndarray
+    arrivals: np.ndarray
+    departures: np.ndarray
+
+
+@dataclass
+class PreparedTargets:
+    """Cele z przystankami w zasięgu pieszym (do wielu zapytań)."""
+
+    xy: np.ndarray
+    target_index: np.ndarray
+    stop_index: np.ndarray
+    walk_seconds: np.ndarray
+
+
+def _split_overtaking(arrivals: np.ndarray, departures: np.ndarray) -> list[np.ndarray]:
+    """Dzieli kursy (posortowane po odjeździe) na grupy bez wyprzedzania."""
+    if (np.diff(arrivals, axis=0) >= 0).all() and (
+        np.diff(departures, axis=0) >= 0
+    ).all():
+        return [np.arange(len(arrivals))]
+    groups: list[list[int]] = []
+    for trip in range(len(arrivals)):
+        for group in groups:
+            last = group[-1]
+            if (arrivals[last] <= arrivals[trip]).all() and (
+                departures[last] <= departures[trip]
+            ).all():
+                group.append(trip)
+                break
+        else:
+            groups.append([trip])
+    return [np.array(group) for group in groups]
+
+
+def _concat_int(arrays: list[np.ndarray]) -> np.ndarray:
+    if not arrays:
+        return np.empty(0, dtype=int)
+    return np.concatenate(arrays).astype(int)
+
+
+class TransitRouter:
+    """Tablice rozkładu i zapytania najwcześniejszego przyjazdu (RAPTOR)."""
+
+    def __init__(
+        self,
+        stop_ids: np.ndarray,
+        stop_lat: np.ndarray,
+        stop_lon: np.ndarray,
+        patterns: list[Pattern],
+        transfer_radius_m: float = TRANSFER_RADIUS_M,
+        walk_speed_mps: float = WALK_SPEED_MPS,
+    ) -> None:
+        self.stop_ids = np.asarray(stop_ids)
+        self.lat0 = float(np.nanmean(stop_lat)) if len(stop_lat) else 0.0
+        self.stop_xy = _local_xy(stop_lat, stop_lon, self.lat0)
+        self.patterns = patterns
+        self.walk_speed_mps = walk_speed_mps
+
+        pattern_ids = _concat_int(
+            [np.full(len(p.stops), k) for k, p in enumerate(patterns)]
+        )
+        positions = _concat_int([np.arange(len(p.stops)) for p in patterns])
+        stops = _concat_int([p.stops for p in patterns])
+        order = np.argsort(stops, kind="stable")
+        self._stop_offsets = np.searchsorted(stops[order], np.arange(len(stop_ids) + 1))
+        self._stop_patterns = pattern_ids[order]
+        self._stop_positions = positions[order]
+        self._first_departures = [p.departures[:, 0] for p in patterns]
+        self._last_arrivals = [p.arrivals[:, -1] for p in patterns]
+
+        src, dst, distance = pairs_within(self.stop_xy, self.stop_xy, transfer_radius_m)
+        other = src != dst
+        self._transfer_src = src[other]
+        self._transfer_dst = dst[other]
+        self._transfer_seconds = np.ceil(distance[other] / walk_speed_mps).astype(
+            np.int64
+        )
+
+    @classmethod
+    def from_gtfs(
+        cls,
+        source: Path | str,
+        service_date: datetime.date | None = None,
+        transfer_radius_m: float = TRANSFER_RADIUS_M,
+        walk_speed_mps: float = WALK_SPEED_MPS,
+    ) -> "TransitRouter":
+        """Buduje router z GTFS; ``service_date`` ogranicza kursy do jednego dnia."""
+        source = Path(source)
+        started = time.perf_counter()
+        stops = _read_gtfs_table(
+            source, "stops.txt", ["stop_id", "stop_lat", "stop_lon"]
+        )
+        trips = _read_gtfs_table(source, "trips.txt", ["trip_id", "service_id"])
+        assert stops is not None and trips is not None
+        if service_date is not None:
+            services = active_service_ids(
+                _read_gtfs_table(source, "calendar.txt", required=False),
+                _read_gtfs_table(source, "calendar_dates.txt", required=False),
+                service_date,
+            )
+            trips = trips[trips["service_id"].astype(str).isin(services)]
+        stop_times = _read_gtfs_table(
+            source,
+            "stop_times.txt",
+            ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"],
+        )
+        assert stop_times is not None
+        stop_times = stop_times[stop_times["trip_id"].isin(trips["trip_id"])]
+
+        stops = stops.dropna(subset=["stop_lat", "stop_lon"]).reset_index(drop=True)
+        stop_index = pd.Index(stops["stop_id"])
+        stop_times = stop_times.assign(
+            stop=stop_index.get_indexer(stop_times["stop_id"]),
+            arr=parse_gtfs_time(stop_times["arrival_time"]),
+            dep=parse_gtfs_time(stop_times["departure_time"]),
+            stop_sequence=pd.to_numeric(stop_times["stop_sequence"]),
+        )
+        stop_times["arr"] = stop_times["arr"].fillna(stop_times["dep"])
+        stop_times["dep"] = stop_times["dep"].fillna(stop_times["arr"])
+        broken = stop_times.loc[
+            stop_times["arr"].isna() | (stop_times["stop"] < 0), "trip_id"
+        ].unique()
+        if len(broken):
+            logger.info("Pomijam %s kursów bez czasów lub przystanków.", len(broken))
+            stop_times = stop_times[~stop_times["trip_id"].isin(broken)]
+        stop_times = stop_times.sort_values(["trip_id", "stop_sequence"])
+
+        trip_codes, trip_starts = np.unique(
+            stop_times["trip_id"].to_numpy(), return_index=True
+        )
+        trip_lengths = np.diff(np.append(trip_starts, len(stop_times)))
+        stop_column = stop_times["stop"].to_numpy()
+        arr_column = stop_times["arr"].to_numpy(np.int64)
+        dep_column = stop_times["dep"].to_numpy(np.int64)
+        sequences = pd.Series(
+            [
+                stop_column[start : start + length].tobytes()
+                for start, length in zip(trip_starts, trip_lengths)
+            ]
+        )
+
+        patterns: list[Pattern] = []
+        for _, trips_in_pattern in sequences.groupby(sequences).groups.items():
+            members = np.asarray(trips_in_pattern)
+            length = trip_lengths[members[0]]
+            if length < 2:
+                continue
+            rows = trip_starts[members][:, None] + np.arange(length)[None, :]
+            arrivals = arr_column[rows]
+            departures = dep_column[rows]
+            order = np.lexsort((arrivals[:, -1], departures[:, 0]))
+            arrivals, departures = arrivals[order], departures[order]
+            for group in _split_overtaking(arrivals, departures):
+                patterns.append(
+                    Pattern(
+                        stops=stop_column[rows[0]].astype(np.int32),
+                        arrivals=arrivals[group],
+                        departures=departures[group],
+                    )
+                )
+        logger.info(
+            "GTFS: %s przystanków, %s kursów, %s wzorców (%.1f s)",
+            len(stops),
+            len(trip_codes),
+            len(patterns),
+            time.perf_counter() - started,
+        )
+        return cls(
+            stops["stop_id"].to_numpy(),
+            stops["stop_lat"].to_numpy(float),
+            stops["stop_lon"].to_numpy(float),
+            patterns,
+            transfer_radius_m=transfer_radius_m,
+            walk_speed_mps=walk_speed_mps,
+        )
+
+    def prepare_targets(
+        self, lat: Any, lon: Any, max_walk_m: float = MAX_ACCESS_WALK_M
+    ) -> PreparedTargets:
+        xy = _local_xy(lat, lon, self.lat0)
+        target_index, stop_index, distance = pairs_within(xy, self.stop_xy, max_walk_m)
+        return PreparedTargets(
+            xy=xy,
+            target_index=target_index,
+            stop_index=stop_index,
+            walk_seconds=distance / self.walk_speed_mps,
+        )
+
+    def _earliest_arrivals(
+        self,
+        access_stops: np.ndarray,
+        access_times: np.ndarray,
+        horizon: int,
+        departure: int,
+        max_rounds: int,
+    ) -> np.ndarray:
+        best = np.full(len(self.stop_ids), UNREACHED, dtype=np.int64)
+        np.minimum.at(best, access_stops, access_times)
+        marked = best < UNREACHED
+        windows: dict[int, slice] = {}
+        for _ in range(max_rounds):
+            marked_stops = np.flatnonzero(marked)
+            if not len(marked_stops):
+                break
+            # Wzorce przez oznaczone przystanki i najwcześniejsza pozycja wejścia.
+            starts = self._stop_offsets[marked_stops]
+            counts = self._stop_offsets[marked_stops + 1] - starts
+            entries = np.repeat(
+                starts - np.cumsum(counts) + counts, counts
+            ) + np.arange(counts.sum())
+            first_position = np.full(len(self.patterns), np.iinfo(np.int64).max)
+            np.minimum.at(
+                first_position,
+                self._stop_patterns[entries],
+                self._stop_positions[entries],
+            )
+
+            round_best = np.full_like(best, UNREACHED)
+            for k in np.flatnonzero(first_position < np.iinfo(np.int64).max).tolist():
+                window = windows.get(k)
+                if window is None:
+                    low = np.searchsorted(self._last_arrivals[k], departure)
+                    high = np.searchsorted(
+                        self._first_departures[k], horizon, side="right"
+                    )
+                    window = windows[k] = slice(low, max(low, high))
+                pattern = self.patterns[k]
+                if window.stop <= window.start:
+                    continue
+                start = first_position[k]
+                stops = pattern.stops[start:]
+                departures = pattern.departures[window, start:]
+                # Kurs dostępny na przystanku: liczba kursów odjeżdżających wcześniej.
+                board = (departures < best[stops][None, :]).sum(axis=0)
+                board[best[stops] >= UNREACHED] = len(departures)
+                riding = np.minimum.accumulate(board)[:-1]
+                valid = riding < len(departures)
+                if not valid.any():
+                    continue
+                positions = np.flatnonzero(valid) + 1
+                arrivals = pattern.arrivals[window, start:][riding[valid], positions]
+                np.minimum.at(round_best, stops[positions], arrivals)
+
+            improved = round_best < np.minimum(best, horizon)
+            best = np.where(improved, round_best, best)
+            # Przejścia piesze nie są domknięte przechodnio, więc idziemy z
+            # każdego przystanku osiągniętego pojazdem w tej rundzie, także gdy
+            # wcześniej dotarliśmy tam pieszo.
+            walking = (round_best < UNREACHED)[self._transfer_src]
+            if walking.any():
+                walked = np.full_like(best, UNREACHED)
+                np.minimum.at(
+                    walked,
+                    self._transfer_dst[walking],
+                    round_best[self._transfer_src[walking]]
+                    + self._transfer_seconds[walking],
+                )
+                by_foot = walked < np.minimum(best, horizon)
+                best = np.where(by_foot, walked, best)
+                improved |= by_foot
+            marked = improved
+        return best
+
+    def travel_minutes(
+        self,
+        lat: float,
+        lon: float,
+        targets: PreparedTargets,
+        departure_seconds: int = 7 * 3600 + 30 * 60,
+        max_rounds: int = MAX_ROUNDS,
+        max_access_walk_m: float = MAX_ACCESS_WALK_M,
+        max_minutes: float = MAX_MINUTES,
+    ) -> np.ndarray:
+        """Minuty od odjazdu z punktu do każdego celu (NaN: nieosiągalny)."""
+        origin_xy = _local_xy([lat], [lon], self.lat0)
+        _, access_stops, access_distance = pairs_within(
+            origin_xy, self.stop_xy, max_access_walk_m
+        )
+        access_times = departure_seconds + np.ceil(
+            access_distance / self.walk_speed_mps
+        ).astype(np.int64)
+        horizon = int(departure_seconds + max_minutes * 60)
+        best = self._earliest_arrivals(
+            access_stops, access_times, horizon, departure_seconds, max_rounds
+        )
+
+        arrival = np.full(len(targets.xy), np.inf)
+        reached = best[targets.stop_index] < UNREACHED
+        np.minimum.at(
+            arrival,
+            targets.target_index[reached],
+            best[targets.stop_index[reached]] + targets.walk_seconds[reached],
+        )
+        direct = np.hypot(*(targets.xy - origin_xy[0]).T)
+        walkable = direct <= max_access_walk_m
+        arrival[walkable] = np.minimum(
+            arrival[walkable],
+            departure_seconds + direct[walkable] / self.walk_speed_mps,
+        )
+        minutes = (arrival - departure_seconds) / 60.0
+        minutes[~np.isfinite(minutes) | (minutes > max_minutes)] = np.nan
+        return minutes
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Czasy dojazdu komunikacją miejską z punktu do szkół (GTFS)."
+    )
+    parser.add_argument("gtfs", type=Path, help="Katalog lub ZIP z rozkładem GTFS.")
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--lon", type=float, required=True)
+    parser.add_argument(
+        "--schools",
+        type=Path,
+        default=Path("results/app/licea_warszawa.xlsx"),
+        help="Plik aplikacji z arkuszem schools (SzkolaLat/SzkolaLon).",
+    )
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument("--departure", default="07:30", help="Godzina odjazdu HH:MM.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    router = TransitRouter.from_gtfs(args.gtfs, service_date=args.date)
+    schools = pd.read_excel(args.schools, sheet_name="schools")
+    schools = schools.dropna(subset=["SzkolaLat", "SzkolaLon"]).drop_duplicates(
+        "NazwaSzkoly"
+    )
+    targets = router.prepare_targets(schools["SzkolaLat"], schools["SzkolaLon"])
+    hour, minute = (int(part) for part in args.departure.split(":"))
+    started = time.perf_counter()
+    minutes = router.travel_minutes(
+        args.lat, args.lon, targets, departure_seconds=hour * 3600 + minute * 60
+    )
+    logger.info("Zapytanie: %.3f s", time.perf_counter() - started)
+    result = schools[["NazwaSzkoly"]].assign(CzasDojazdu=np.round(minutes))
+    print(result.sort_values("CzasDojazdu").to_string(index=False))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s"
+    )
+    main()
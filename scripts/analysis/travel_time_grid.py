@@ -0,0 +1,337 @@
+"""Siatka czasów dojazdu z każdej komórki Warszawy do każdej szkoły.
+
+Zadanie offline (``build_travel_time_grid``) dzieli prostokąt miasta na
+komórki ``cell_m`` x ``cell_m`` metrów i dla środka każdej komórki pyta
+wymienne źródło czasów (lokalny router GTFS, model prędkości albo dowolny
+obiekt wywoływalny ``(lat, lon) -> minuty do celów``). Wynik jest
+kwantyzowany do ``uint8`` (``step_min`` minut na jednostkę, 255 = brak danych)
+i zapisywany jako ``.npz``: dla ok. 15 tys. komórek i 120 szkół to ok. 2 MB.
+``TravelTimeGrid.lookup`` zwraca czasy dla dowolnego punktu w O(1): indeks
+komórki wynika wprost ze współrzędnych.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import logging
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.analysis.score import haversine_km  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_GRID_FILE = BASE_DIR / "results" / "processed" / "travel_time_grid.npz"
+# (lat_min, lon_min, lat_max, lon_max) - granice Warszawy z zapasem.
+WARSAW_BOUNDS = (52.09, 20.85, 52.37, 21.28)
+DEFAULT_CELL_M = 250.0
+DEFAULT_STEP_MIN = 1.0
+NO_DATA = 255
+METERS_PER_DEG_LAT = 6_371_000.0 * math.pi / 180
+
+TimeSource = Callable[[float, float], np.ndarray]
+
+
+@dataclass
+class TravelTimeGrid:
+    """Skwantyzowane minuty ``(wiersze, kolumny, szkoły)`` i geometria siatki."""
+
+    minutes: np.ndarray
+    keys: np.ndarray
+    lat_min: float
+    lon_min: float
+    cell_m: float
+    step_min: float = DEFAULT_STEP_MIN
+    metadata: dict[str, Any] | None = None
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.minutes.shape[0], self.minutes.shape[1]
+
+    @property
+    def _deg_lat(self) -> float:
+        return self.cell_m / METERS_PER_DEG_LAT
+
+    @property
+    def _deg_lon(self) -> float:
+        lat_mid = self.lat_min + self.shape[0] * self._deg_lat / 2
+        return self.cell_m / (METERS_PER_DEG_LAT * math.cos(math.radians(lat_mid)))
+
+    def cell_of(self, lat: float, lon: float) -> tuple[int, int] | None:
+        row = math.floor((lat - self.lat_min) / self._deg_lat)
+        col = math.floor((lon - self.lon_min) / self._deg_lon)
+        if 0 <= row < self.shape[0] and 0 <= col < self.shape[1]:
+            return row, col
+        return None
+
+    def cell_center(self, row: int, col: int) -> tuple[float, float]:
+        return (
+            self.lat_min + (row + 0.5) * self._deg_lat,
+            self.lon_min + (col + 0.5) * self._deg_lon,
+        )
+
+    def lookup(self, lat: float, lon: float) -> pd.Series:
+        """Minuty do każdej szkoły (indeks: klucz szkoły); NaN poza siatką."""
+        cell = self.cell_of(lat, lon)
+        if cell is None:
+            return pd.Series(np.nan, index=self.keys, dtype=float)
+        return pd.Series(dequantize(self.minutes[cell], self.step_min), index=self.keys)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            "lat_min": self.lat_min,
+            "lon_min": self.lon_min,
+            "cell_m": self.cell_m,
+            "step_min": self.step_min,
+            "metadata": self.metadata or {},
+        }
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez_compressed(
+            tmp_path,
+            minutes=self.minutes,
+            keys=self.keys.astype(str),
+            header=np.array(json.dumps(header, ensure_ascii=False)),
+        )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TravelTimeGrid":
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            return cls(
+                minutes=data["minutes"],
+                keys=data["keys"],
+                lat_min=header["lat_min"],
+                lon_min=header["lon_min"],
+                cell_m=header["cell_m"],
+                step_min=header["step_min"],
+                metadata=header.get("metadata"),
+            )
+
+
+def quantize(minutes: np.ndarray, step_min: float = DEFAULT_STEP_MIN) -> np.ndarray:
+    values = np.asarray(minutes, dtype=float) / step_min
+    result = np.full(values.shape, NO_DATA, dtype=np.uint8)
+    known = np.isfinite(values)
+    result[known] = np.clip(np.rint(values[known]), 0, NO_DATA - 1)
+    return result
+
+
+def dequantize(values: np.ndarray, step_min: float = DEFAULT_STEP_MIN) -> np.ndarray:
+    minutes = values.astype(float) * step_min
+    minutes[values == NO_DATA] = np.nan
+    return minutes
+
+
+def load_travel_time_grid(path: Path | None = None) -> TravelTimeGrid | None:
+    """Wczytuje siatkę; ``None``, gdy plik nie istnieje."""
+    path = Path(path) if path else DEFAULT_GRID_FILE
+    if not path.exists():
+        return None
+    return TravelTimeGrid.load(path)
+
+
+class SpeedModelTimeSource:
+    """Szacunek bez rozkładu: odległość x objazd / prędkość + stały narzut."""
+
+    def __init__(
+        self,
+        target_lat: Any,
+        target_lon: Any,
+        speed_kmh: float = 18.0,
+        detour: float = 1.3,
+        overhead_min: float = 8.0,
+    ) -> None:
+        self.target_lat = np.asarray(target_lat, dtype=float)
+        self.target_lon = np.asarray(target_lon, dtype=float)
+        self.speed_kmh = speed_kmh
+        self.detour = detour
+        self.overhead_min = overhead_min
+
+    def __call__(self, lat: float, lon: float) -> np.ndarray:
+        distance = np.asarray(
+            haversine_km(lat, lon, self.target_lat, self.target_lon), dtype=float
+        )
+        return distance * self.detour / self.speed_kmh * 60 + self.overhead_min
+
+
+class RouterTimeSource:
+    """Czasy z lokalnego routera GTFS (``transit_router.TransitRouter``)."""
+
+    def __init__(
+        self,
+        router: Any,
+        target_lat: Any,
+        target_lon: Any,
+        departure_seconds: int = 7 * 3600 + 30 * 60,
+    ) -> None:
+        self.router = router
+        self.targets = router.prepare_targets(target_lat, target_lon)
+        self.departure_seconds = departure_seconds
+
+    def __call__(self, lat: float, lon: float) -> np.ndarray:
+        return self.router.travel_minutes(
+            lat, lon, self.targets, departure_seconds=self.departure_seconds
+        )
+
+
+_worker_source: TimeSource | None = None
+
+
+def _init_worker(source: TimeSource) -> None:
+    global _worker_source
+    _worker_source = source
+
+
+def _grid_row(task: tuple[float, float, float, float, int, float, int]) -> np.ndarray:
+    # Do procesu trafia tylko geometria siatki i numer wiersza, nie cała tablica.
+    lat_min, lon_min, deg_lat, deg_lon, cols, step_min, row = task
+    assert _worker_source is not None
+    lat = lat_min + (row + 0.5) * deg_lat
+    return np.stack(
+        [
+            quantize(_worker_source(lat, lon_min + (col + 0.5) * deg_lon), step_min)
+            for col in range(cols)
+        ]
+    )
+
+
+def build_travel_time_grid(
+    keys: Any,
+    time_source: TimeSource,
+    bounds: tuple[float, float, float, float] = WARSAW_BOUNDS,
+    cell_m: float = DEFAULT_CELL_M,
+    step_min: float = DEFAULT_STEP_MIN,
+    workers: int | None = None,
+    metadata: dict[str, Any] | None = None,
+) -> TravelTimeGrid:
+    """
+    Liczy czasy ze środka każdej komórki do szkół ``keys``.
+
+    ``time_source(lat, lon)`` zwraca minuty w kolejności ``keys``. Wiersze
+    siatki są liczone równolegle w ``workers`` procesach (źródło musi dać się
+    zserializować pickle), a przy ``workers <= 1`` po kolei.
+    """
+    lat_min, lon_min, lat_max, lon_max = bounds
+    keys = np.asarray(keys).astype(str)
+    lat_mid = (lat_min + lat_max) / 2
+    rows = math.ceil((lat_max - lat_min) * METERS_PER_DEG_LAT / cell_m)
+    cols = math.ceil(
+        (lon_max - lon_min)
+        * METERS_PER_DEG_LAT
+        * math.cos(math.radians(lat_mid))
+        / cell_m
+    )
+    grid = TravelTimeGrid(
+        minutes=np.full((rows, cols, len(keys)), NO_DATA, dtype=np.uint8),
+        keys=keys,
+        lat_min=lat_min,
+        lon_min=lon_min,
+        cell_m=cell_m,
+        step_min=step_min,
+        metadata=(metadata or {})
+        | {"created_at": datetime.datetime.now().isoformat(timespec="seconds")},
+    )
+    started = time.perf_counter()
+    geometry = (lat_min, lon_min, grid._deg_lat, grid._deg_lon, cols, step_min)
+    tasks = [geometry + (row,) for row in range(rows)]
+    if workers is not None and workers <= 1:
+        _init_worker(time_source)
+        results = map(_grid_row, tasks)
+        for row, values in enumerate(results):
+            grid.minutes[row] = values
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(time_source,)
+        ) as executor:
+            for row, values in enumerate(executor.map(_grid_row, tasks)):
+                grid.minutes[row] = values
+    logger.info(
+        "Siatka %sx%s komórek, %s szkół (%.1f s)",
+        rows,
+        cols,
+        len(keys),
+        time.perf_counter() - started,
+    )
+    return grid
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Buduje siatkę czasów dojazdu z komórek Warszawy do szkół."
+    )
+    parser.add_argument(
+        "--schools",
+        type=Path,
+        default=BASE_DIR / "results" / "app" / "licea_warszawa.xlsx",
+        help="Plik aplikacji z arkuszem schools (SzkolaLat/SzkolaLon).",
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_GRID_FILE)
+    parser.add_argument("--source", choices=["gtfs", "speed"], default="gtfs")
+    parser.add_argument("--gtfs", type=Path, help="Katalog lub ZIP z rozkładem GTFS.")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=None)
+    parser.add_argument("--departure", default="07:30", help="Godzina odjazdu HH:MM.")
+    parser.add_argument("--cell-m", type=float, default=DEFAULT_CELL_M)
+    parser.add_argument("--workers", type=int, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    schools = pd.read_excel(args.schools, sheet_name="schools")
+    schools = schools.dropna(subset=["SzkolaLat", "SzkolaLon"]).drop_duplicates(
+        "SzkolaIdentyfikator"
+    )
+    lat = schools["SzkolaLat"].to_numpy(float)
+    lon = schools["SzkolaLon"].to_numpy(float)
+    source: TimeSource
+    metadata: dict[str, Any] = {"source": args.source}
+    if args.source == "gtfs":
+        if args.gtfs is None:
+            raise SystemExit("--source gtfs wymaga --gtfs")
+        from scripts.analysis.transit_router import TransitRouter
+
+        hour, minute = (int(part) for part in args.departure.split(":"))
+        router = TransitRouter.from_gtfs(args.gtfs, service_date=args.date)
+        source = RouterTimeSource(router, lat, lon, hour * 3600 + minute * 60)
+        metadata |= {
+            "gtfs": str(args.gtfs),
+            "date": str(args.date),
+            "departure": args.departure,
+        }
+    else:
+        source = SpeedModelTimeSource(lat, lon)
+    grid = build_travel_time_grid(
+        schools["SzkolaIdentyfikator"],
+        source,
+        cell_m=args.cell_m,
+        workers=args.workers,
+        metadata=metadata,
+    )
+    grid.save(args.output)
+    print(f"Zapisano siatkę {grid.minutes.shape} do {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s"
+    )
+    main()
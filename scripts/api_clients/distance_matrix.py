@@ -0,0 +1,170 @@
+"""Planowanie zapytań Distance Matrix dla wielu punktów startowych i celów.
+
+Punkty (adresy albo pary ``(lat, lon)``) są najpierw deduplikowane: adresy po
+``normalize_address``, współrzędne po zaokrągleniu do 5 miejsc (ok. 1 m).
+Macierz unikalnych startów x celów jest dzielona na jednakowe bloki
+mieszczące się w limitach jednego zapytania (startów, celów i elementów);
+kształt bloku jest dobierany tak, by liczba zapytań była najmniejsza.
+Wyniki bloków składają się w gęstą tablicę minut ``(starty, cele)`` dla
+wejścia w oryginalnej kolejności, z ``NaN`` tam, gdzie trasy nie ma.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Sequence, Union
+
+import numpy as np
+
+from scripts.api_clients.googlemaps_cache import normalize_address
+from scripts.api_clients.rate_limit import RateLimitedExecutor
+
+logger = logging.getLogger(__name__)
+
+# Limity Distance Matrix API na jedno zapytanie.
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+COORDINATE_DECIMALS = 5
+
+Point = Union[str, tuple[float, float]]
+
+
+def point_key(point: Point) -> str:
+    """Klucz deduplikacji: znormalizowany adres albo zaokrąglone współrzędne."""
+    if isinstance(point, str):
+        return normalize_address(point)
+    lat, lon = point
+    return f"{lat:.{COORDINATE_DECIMALS}f},{lon:.{COORDINATE_DECIMALS}f}"
+
+
+def dedupe_points(points: Sequence[Point]) -> tuple[list[Point], np.ndarray]:
+    """Zwraca (unikalne punkty, indeks unikalnego punktu dla każdego wejścia)."""
+    positions: dict[str, int] = {}
+    unique: list[Point] = []
+    index = np.empty(len(points), dtype=int)
+    for i, point in enumerate(points):
+        key = point_key(point)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(point)
+        index[i] = positions[key]
+    return unique, index
+
+
+@dataclass(frozen=True)
+class MatrixBlock:
+    origins: slice
+    destinations: slice
+
+
+def block_shape(
+    n_origins: int,
+    n_destinations: int,
+    max_origins: int = MAX_ORIGINS,
+    max_destinations: int = MAX_DESTINATIONS,
+    max_elements: int = MAX_ELEMENTS,
+) -> tuple[int, int]:
+    """Kształt bloku (starty, cele) dający najmniej zapytań w limitach."""
+    best: tuple[int, int, int] | None = None
+    for rows in range(1, min(n_origins, max_origins, max_elements) + 1):
+        cols = min(n_destinations, max_destinations, max_elements // rows)
+        requests = math.ceil(n_origins / rows) * math.ceil(n_destinations / cols)
+        if best is None or requests < best[0]:
+            best = (requests, rows, cols)
+    assert best is not None
+    return best[1], best[2]
+
+
+def plan_blocks(
+    n_origins: int, n_destinations: int, **limits: int
+) -> list[MatrixBlock]:
+    if n_origins == 0 or n_destinations == 0:
+        return []
+    rows, cols = block_shape(n_origins, n_destinations, **limits)
+    return [
+        MatrixBlock(slice(i, i + rows), slice(j, j + cols))
+        for i in range(0, n_origins, rows)
+        for j in range(0, n_destinations, cols)
+    ]
+
+
+@dataclass
+class MatrixPlan:
+    """Unikalne punkty, mapowanie wejścia na nie i bloki zapytań."""
+
+    origins: list[Point]
+    destinations: list[Point]
+    origin_index: np.ndarray
+    destination_index: np.ndarray
+    blocks: list[MatrixBlock]
+
+
+def plan_distance_matrix(
+    origins: Sequence[Point], destinations: Sequence[Point], **limits: int
+) -> MatrixPlan:
+    unique_origins, origin_index = dedupe_points(origins)
+    unique_destinations, destination_index = dedupe_points(destinations)
+    return MatrixPlan(
+        origins=unique_origins,
+        destinations=unique_destinations,
+        origin_index=origin_index,
+        destination_index=destination_index,
+        blocks=plan_blocks(len(unique_origins), len(unique_destinations), **limits),
+    )
+
+
+def _block_minutes(result: dict[str, Any], shape: tuple[int, int]) -> np.ndarray:
+    minutes = np.full(shape, np.nan)
+    for i, row in enumerate(result.get("rows", [])[: shape[0]]):
+        for j, element in enumerate(row.get("elements", [])[: shape[1]]):
+            if element.get("status") == "OK" and "duration" in element:
+                minutes[i, j] = round(element["duration"]["value"] / 60)
+    return minutes
+
+
+def compute_travel_matrix(
+    gmaps: Any,
+    origins: Sequence[Point],
+    destinations: Sequence[Point],
+    mode: str = "transit",
+    language: str = "pl",
+    departure_time: int | None = None,
+    executor: RateLimitedExecutor | None = None,
+    **limits: int,
+) -> np.ndarray:
+    """
+    Czasy dojazdu w minutach jako tablica ``(len(origins), len(destinations))``.
+
+    Każdy unikalny blok to jedno zapytanie Distance Matrix wysłane przez
+    ``executor`` (limit QPS, równoległość). Blok zakończony błędem zostaje
+    ``NaN`` i jest logowany.
+    """
+    plan = plan_distance_matrix(origins, destinations, **limits)
+    executor = executor or RateLimitedExecutor()
+    client = executor.wrap(gmaps)
+
+    def fetch(block: MatrixBlock) -> np.ndarray:
+        block_origins = plan.origins[block.origins]
+        block_destinations = plan.destinations[block.destinations]
+        shape = (len(block_origins), len(block_destinations))
+        kwargs: dict[str, Any] = {
+            "origins": block_origins,
+            "destinations": block_destinations,
+            "mode": mode,
+            "language": language,
+        }
+        if departure_time is not None:
+            kwargs["departure_time"] = departure_time
+        try:
+            return _block_minutes(client.distance_matrix(**kwargs), shape)
+        except Exception as exc:
+            logger.warning("Błąd Distance Matrix dla bloku %s: %s", block, exc)
+            return np.full(shape, np.nan)
+
+    unique = np.full((len(plan.origins), len(plan.destinations)), np.nan)
+    for block, minutes in zip(plan.blocks, executor.map(fetch, plan.blocks)):
+        unique[block.origins, block.destinations] = minutes
+    return unique[np.ix_(plan.origin_index, plan.destination_index)]
@@ -2,6 +2,8 @@ import os
 import time
 import datetime
 
+from scripts.api_clients.rate_limit import RateLimitedExecutor
+
 
 def build_gmaps_client(api_key: str | None = None):
     """Tworzy klienta Google Maps API lub zwraca None gdy brak klucza/biblioteki.
@@ -147,46 +149,33 @@ def get_travel_times_batch(
         return {addr: None for addr in destination_addresses}
 
 
-def get_coordinates_for_addresses_batch(gmaps, addresses, batch_size=25):
+def get_coordinates_for_addresses_batch(
+    gmaps, addresses, batch_size=25, executor: RateLimitedExecutor | None = None
+):
     """
-    Zwraca słownik {adres: (szerokość, długość)} dla listy adresów,
-    przetwarzając wiele adresów jednocześnie dla przyspieszenia działania.
+    Zwraca słownik {adres: (szerokość, długość)} dla listy adresów.
+
+    Google Maps geokoduje jeden adres na zapytanie, więc adresy idą równolegle
+    przez ``executor`` (limit QPS, ponowienia OVER_QUERY_LIMIT); wynik jest
+    w kolejności wejścia.
 
     Parametry:
     - gmaps: instancja klienta Google Maps API
     - addresses: lista adresów do geokodowania
-    - batch_size: maksymalna liczba adresów w jednej porcji (Google Maps ma limity)
+    - batch_size: nieużywany, zostawiony dla zgodności wywołań
+    - executor: wspólny RateLimitedExecutor; domyślnie nowy z domyślnym QPS
     """
-    coordinates_dict = {}
+    executor = executor or RateLimitedExecutor()
+    client = executor.wrap(gmaps)
 
-    # Przetwarzaj adresy w porcjach
-    for i in range(0, len(addresses), batch_size):
-        batch_addresses = addresses[i : i + batch_size]
+    def geocode(address):
         try:
-            # Wykonaj jedno zapytanie dla wielu adresów
-            geocode_results = []
-            for address in batch_addresses:
-                # Niestety Google Maps nie pozwala na jednoczesne geokodowanie wielu adresów w jednym wywołaniu API
-                # Ale możemy zoptymalizować wydajność eliminując opóźnienie między wywołaniami
-                result = gmaps.geocode(address)
-                geocode_results.append((address, result))
-
-            # Przetwórz wyniki
-            for address, result in geocode_results:
-                if result and len(result) > 0:
-                    lat = result[0]["geometry"]["location"]["lat"]
-                    lng = result[0]["geometry"]["location"]["lng"]
-                    coordinates_dict[address] = (lat, lng)
-                else:
-                    coordinates_dict[address] = (None, None)
-
+            result = client.geocode(address)
+            if result:
+                location = result[0]["geometry"]["location"]
+                return location["lat"], location["lng"]
         except Exception as e:
-            print(f"Błąd podczas przetwarzania porcji adresów: {e}")
-            # W przypadku błędu ustaw None dla wszystkich adresów w tej porcji
-            for address in batch_addresses:
-                coordinates_dict[address] = (None, None)
-
-        # Dodaj małe opóźnienie między porcjami, aby nie przekroczyć limitów API
-        time.sleep(0.5)
+            print(f"Błąd podczas geokodowania adresu {address}: {e}")
+        return None, None
 
-    return coordinates_dict
+    return dict(zip(addresses, executor.map(geocode, addresses)))
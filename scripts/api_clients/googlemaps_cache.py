@@ -0,0 +1,222 @@
+"""Trwały cache SQLite dla geokodowania i czasów dojazdu Google Maps.
+
+Współrzędne są kluczowane znormalizowanym adresem, a czasy dojazdu krotką
+(punkt startowy, cel, środek transportu, przedział odjazdu). Przedział to
+rodzaj dnia (``weekday``/``weekend``) i godzina odjazdu zaokrąglona w dół do
+``bucket_minutes``, więc "najbliższy dzień roboczy 7:30" trafia codziennie
+w ten sam wpis. Każdy wpis ma własny termin ważności; do API idą wyłącznie
+brakujące lub przeterminowane klucze. Puste wyniki (brak trasy, błąd API)
+nie są zapisywane.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_CACHE_FILE = BASE_DIR / "results" / "processed" / "googlemaps_cache.sqlite"
+DEFAULT_GEOCODE_TTL_DAYS = 180
+DEFAULT_TRAVEL_TIME_TTL_DAYS = 30
+DEFAULT_BUCKET_MINUTES = 30
+DAY_SECONDS = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    address_key TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS travel_time (
+    origin_key TEXT NOT NULL,
+    destination_key TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    departure_bucket TEXT NOT NULL,
+    minutes REAL NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (origin_key, destination_key, mode, departure_bucket)
+);
+"""
+
+Coordinates = tuple[float, float]
+
+
+def normalize_address(address: str) -> str:
+    """Klucz adresu: małe litery, pojedyncze spacje, bez spacji przy przecinkach."""
+    parts = [" ".join(part.split()) for part in str(address).casefold().split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+def departure_bucket(
+    departure_time: int | float | None, bucket_minutes: int = DEFAULT_BUCKET_MINUTES
+) -> str:
+    """Przedział odjazdu, np. ``weekday-07:30``; ``now`` bez czasu odjazdu."""
+    if departure_time is None:
+        return "now"
+    moment = datetime.datetime.fromtimestamp(departure_time)
+    day_kind = "weekend" if moment.weekday() >= 5 else "weekday"
+    minutes = moment.hour * 60 + moment.minute
+    minutes -= minutes % bucket_minutes
+    return f"{day_kind}-{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class GoogleMapsCache:
+    """Cache wyników Google Maps w jednym pliku SQLite (bezpieczny dla wątków)."""
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_CACHE_FILE,
+        geocode_ttl_days: float = DEFAULT_GEOCODE_TTL_DAYS,
+        travel_time_ttl_days: float = DEFAULT_TRAVEL_TIME_TTL_DAYS,
+        bucket_minutes: int = DEFAULT_BUCKET_MINUTES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.geocode_ttl = geocode_ttl_days * DAY_SECONDS
+        self.travel_time_ttl = travel_time_ttl_days * DAY_SECONDS
+        self.bucket_minutes = bucket_minutes
+        self.clock = clock
+        self._lock = threading.Lock()
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def get_coordinates(self, addresses: Iterable[str]) -> dict[str, Coordinates]:
+        """Zwraca ważne wpisy ``{adres: (lat, lon)}`` dla podanych adresów."""
+        keys = {address: normalize_address(address) for address in addresses}
+        rows = self._select(
+            "SELECT address_key, lat, lon FROM geocode "
+            "WHERE address_key IN ({}) AND expires_at > ?",
+            list(set(keys.values())),
+        )
+        found = {row[0]: (row[1], row[2]) for row in rows}
+        return {address: found[key] for address, key in keys.items() if key in found}
+
+    def put_coordinates(self, coordinates: dict[str, Coordinates | None]) -> None:
+        now = self.clock()
+        rows = [
+            (normalize_address(address), address, lat, lon, now, now + self.geocode_ttl)
+            for address, value in coordinates.items()
+            if value is not None
+            for lat, lon in [value]
+            if lat is not None and lon is not None
+        ]
+        self._write("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def get_travel_times(
+        self,
+        origin: str,
+        destinations: Iterable[str],
+        mode: str = "transit",
+        departure_time: int | float | None = None,
+    ) -> dict[str, float]:
+        """Zwraca ważne wpisy ``{cel: minuty}`` dla danego startu i odjazdu."""
+        keys = {address: normalize_address(address) for address in destinations}
+        rows = self._select(
+            "SELECT destination_key, minutes FROM travel_time "
+            "WHERE destination_key IN ({}) AND expires_at > ? "
+            "AND origin_key = ? AND mode = ? AND departure_bucket = ?",
+            list(set(keys.values())),
+            normalize_address(origin),
+            mode,
+            departure_bucket(departure_time, self.bucket_minutes),
+        )
+        found = dict(rows)
+        return {address: found[key] for address, key in keys.items() if key in found}
+
+    def put_travel_times(
+        self,
+        origin: str,
+        travel_times: dict[str, float | None],
+        mode: str = "transit",
+        departure_time: int | float | None = None,
+    ) -> None:
+        now = self.clock()
+        origin_key = normalize_address(origin)
+        bucket = departure_bucket(departure_time, self.bucket_minutes)
+        rows = [
+            (
+                origin_key,
+                normalize_address(address),
+                mode,
+                bucket,
+                minutes,
+                now,
+                now + self.travel_time_ttl,
+            )
+            for address, minutes in travel_times.items()
+            if minutes is not None
+        ]
+        self._write(
+            "INSERT OR REPLACE INTO travel_time VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def _select(self, sql: str, keys: list[str], *params: object) -> list[tuple]:
+        if not keys:
+            return []
+        placeholders = ", ".join("?" for _ in keys)
+        with self._lock:
+            cursor = self._connection.execute(
+                sql.format(placeholders), [*keys, self.clock(), *params]
+            )
+            return cursor.fetchall()
+
+    def _write(self, sql: str, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany(sql, rows)
+
+
+def cached_coordinates(
+    cache: GoogleMapsCache,
+    addresses: list[str],
+    fetch: Callable[[list[str]], dict[str, Coordinates | None]],
+) -> dict[str, Coordinates | None]:
+    """Współrzędne z cache, a dla brakujących adresów z ``fetch`` (i do cache)."""
+    result: dict[str, Coordinates | None] = dict(cache.get_coordinates(addresses))
+    missing = [address for address in dict.fromkeys(addresses) if address not in result]
+    logger.info("Geokodowanie: %s z cache, %s do pobrania", len(result), len(missing))
+    if missing:
+        fetched = fetch(missing)
+        cache.put_coordinates(fetched)
+        result.update(fetched)
+    return result
+
+
+def cached_travel_times(
+    cache: GoogleMapsCache,
+    origin: str,
+    destinations: list[str],
+    fetch: Callable[[list[str]], dict[str, float | None]],
+    mode: str = "transit",
+    departure_time: int | float | None = None,
+) -> dict[str, float | None]:
+    """Czasy dojazdu z cache, a dla brakujących celów z ``fetch`` (i do cache)."""
+    result: dict[str, float | None] = dict(
+        cache.get_travel_times(origin, destinations, mode, departure_time)
+    )
+    missing = [
+        address for address in dict.fromkeys(destinations) if address not in result
+    ]
+    logger.info("Czasy dojazdu: %s z cache, %s do pobrania", len(result), len(missing))
+    if missing:
+        fetched = fetch(missing)
+        cache.put_travel_times(origin, fetched, mode, departure_time)
+        result.update(fetched)
+    return result
@@ -0,0 +1,349 @@
+"""Nagrywanie i odtwarzanie ruchu HTTP klienta ``googlemaps``.
+
+``RecordingSession`` i ``ReplaySession`` podstawia się jako
+``requests_session`` klienta Google Maps. Zapytania są normalizowane do klucza
+(metoda, ścieżka, posortowane parametry bez ``key``/``signature``, a zmienne w
+czasie ``departure_time``/``arrival_time`` zastąpione ``*``), więc ten sam
+adres odtworzy się w kolejnym dniu. Nagranie trzymamy w jednym pliku JSON.
+
+Odtwarzanie jest deterministyczne (``seed``) i pozwala symulować opóźnienie,
+błędy HTTP 500 oraz limit zapytań (odpowiedź ``OVER_QUERY_LIMIT`` przy
+przekroczeniu ``max_requests_per_second`` albo z prawdopodobieństwem
+``over_query_limit_rate``), tak jak ``pzo_replay_server`` dla oferty PZO:
+
+    python scripts/api_clients/googlemaps_replay.py results/processed/googlemaps_replay.json --latency 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_REPLAY_FILE = BASE_DIR / "results" / "processed" / "googlemaps_replay.json"
+REPLAY_SCHEMA_VERSION = 1
+REPLAY_MODES = ("record", "replay")
+# Klucz odtwarzającego klienta; googlemaps wymaga prefiksu "AIza".
+REPLAY_API_KEY = "AIza-replay"
+IGNORED_PARAMS = frozenset({"key", "signature", "client", "channel"})
+VOLATILE_PARAMS = frozenset({"departure_time", "arrival_time"})
+TRANSIENT_STATUSES = frozenset({"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"})
+
+
+class ReplayMissError(LookupError):
+    """Zapytania nie ma w nagraniu."""
+
+
+def normalize_request(
+    method: str,
+    url: str,
+    json_body: Any = None,
+    volatile_params: frozenset[str] = VOLATILE_PARAMS,
+) -> str:
+    """Klucz nagrania: metoda, ścieżka i posortowane istotne parametry."""
+    parts = urlsplit(url)
+    params = sorted(
+        (name, "*" if name in volatile_params else value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in IGNORED_PARAMS
+    )
+    key = f"{method.upper()} {parts.path}"
+    if params:
+        key += "?" + urlencode(params)
+    if json_body is not None:
+        key += " " + json.dumps(json_body, sort_keys=True, ensure_ascii=False)
+    return key
+
+
+def make_response(
+    status_code: int, body: Any, url: str = "", latency: float = 0.0
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.headers["Content-Type"] = "application/json; charset=UTF-8"
+    response._content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    response.encoding = "utf-8"
+    response.elapsed = datetime.timedelta(seconds=latency)
+    return response
+
+
+class ReplayFile:
+    """Nagrane pary zapytanie -> odpowiedź w jednym pliku JSON."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.interactions: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.interactions = data.get("interactions", {})
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        return self.interactions.get(key)
+
+    def put(self, key: str, status_code: int, body: Any) -> None:
+        with self._lock:
+            self.interactions[key] = {"status_code": status_code, "body": body}
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {
+                "schema_version": REPLAY_SCHEMA_VERSION,
+                "interactions": dict(sorted(self.interactions.items())),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(
+            json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8"
+        )
+        tmp_path.replace(self.path)
+
+
+class RecordingSession:
+    """Przepuszcza zapytania do sieci i zapisuje udane odpowiedzi."""
+
+    def __init__(
+        self, replay_file: ReplayFile, session: requests.Session | None = None
+    ) -> None:
+        self.replay_file = replay_file
+        self.session = session or requests.Session()
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def _record(self, key: str, response: requests.Response) -> requests.Response:
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        status = body.get("status") if isinstance(body, dict) else None
+        if body is None or response.status_code >= 500 or status in TRANSIENT_STATUSES:
+            outcome = "skipped"
+        else:
+            self.replay_file.put(key, response.status_code, body)
+            outcome = "recorded"
+        with self._lock:
+            self.stats[outcome] += 1
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self._record(
+            normalize_request("GET", url), self.session.get(url, **kwargs)
+        )
+
+    def post(self, url: str, json: Any = None, **kwargs: Any) -> requests.Response:
+        response = self.session.post(url, json=json, **kwargs)
+        return self._record(normalize_request("POST", url, json), response)
+
+    def close(self) -> None:
+        self.replay_file.save()
+        self.session.close()
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    """Parametry symulacji zachowania Google Maps przy odtwarzaniu."""
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    over_query_limit_rate: float = 0.0
+    max_requests_per_second: float | None = None
+    seed: int | None = None
+
+
+class ReplaySession:
+    """Odpowiada z nagrania bez sieci; brak wpisu kończy się ``ReplayMissError``."""
+
+    def __init__(
+        self,
+        replay_file: ReplayFile,
+        config: ReplayConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.replay_file = replay_file
+        self.config = config or ReplayConfig()
+        self.stats: Counter[str] = Counter()
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._recent_requests: deque[float] = deque()
+
+    def is_throttled(self) -> bool:
+        limit = self.config.max_requests_per_second
+        if not limit:
+            return False
+        now = self._clock()
+        with self._lock:
+            while self._recent_requests and now - self._recent_requests[0] >= 1.0:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= limit:
+                return True
+            self._recent_requests.append(now)
+            return False
+
+    def _draw(self) -> tuple[float, float, float]:
+        with self._lock:
+            jitter = self._random.uniform(0, self.config.latency_jitter)
+            return (
+                self.config.latency + jitter,
+                self._random.random(),
+                self._random.random(),
+            )
+
+    def _serve(self, key: str, url: str) -> requests.Response:
+        delay, error_draw, quota_draw = self._draw()
+        if delay > 0:
+            self._sleep(delay)
+        if self.is_throttled() or quota_draw < self.config.over_query_limit_rate:
+            self._count("over_query_limit")
+            return make_response(
+                200,
+                {"status": "OVER_QUERY_LIMIT", "error_message": "Symulowany limit"},
+                url,
+                delay,
+            )
+        if error_draw < self.config.error_rate:
+            self._count("error")
+            return make_response(500, {"error": "Symulowany błąd serwera"}, url, delay)
+        entry = self.replay_file.get(key)
+        if entry is None:
+            self._count("miss")
+            raise ReplayMissError(key)
+        self._count("served")
+        return make_response(entry["status_code"], entry["body"], url, delay)
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self._serve(normalize_request("GET", url), url)
+
+    def post(self, url: str, json: Any = None, **kwargs: Any) -> requests.Response:
+        return self._serve(normalize_request("POST", url, json), url)
+
+    def close(self) -> None:
+        pass
+
+
+def build_replay_client(
+    mode: str,
+    path: Path = DEFAULT_REPLAY_FILE,
+    api_key: str | None = None,
+    config: ReplayConfig | None = None,
+    **client_kwargs: Any,
+) -> Any:
+    """
+    Klient ``googlemaps`` z sesją nagrywającą albo odtwarzającą.
+
+    ``record`` wymaga prawdziwego klucza; po pracy wywołaj
+    ``client.session.close()``, żeby zapisać nagranie. ``replay`` działa bez
+    klucza i sieci.
+    """
+    import googlemaps
+
+    if mode not in REPLAY_MODES:
+        raise ValueError(f"Nieznany tryb nagrania Google Maps: {mode}")
+    replay_file = ReplayFile(path)
+    session: RecordingSession | ReplaySession
+    if mode == "record":
+        if not api_key:
+            raise ValueError("Nagrywanie Google Maps wymaga klucza API.")
+        session = RecordingSession(replay_file)
+    else:
+        session = ReplaySession(replay_file, config)
+    return googlemaps.Client(
+        key=api_key or REPLAY_API_KEY, requests_session=session, **client_kwargs
+    )
+
+
+def recorded_addresses(replay_file: ReplayFile) -> list[str]:
+    """Adresy nagranych zapytań geokodowania (do benchmarku)."""
+    addresses = []
+    for key in replay_file.interactions:
+        method, _, target = key.partition(" ")
+        parts = urlsplit(target)
+        if method == "GET" and parts.path.endswith("/geocode/json"):
+            params = dict(parse_qsl(parts.query))
+            if "address" in params:
+                addresses.append(params["address"])
+    return addresses
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Odtwarza nagrane geokodowanie Google Maps i mierzy czas."
+    )
+    parser.add_argument(
+        "replay_file", type=Path, nargs="?", default=DEFAULT_REPLAY_FILE
+    )
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--over-query-limit-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float)
+    parser.add_argument("--qps", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> None:
+    from scripts.api_clients.googlemaps_api import (
+        get_coordinates_for_addresses_batch,
+    )
+    from scripts.api_clients.rate_limit import RateLimitedExecutor
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    args = parse_args()
+    config = ReplayConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        over_query_limit_rate=args.over_query_limit_rate,
+        max_requests_per_second=args.max_rps,
+        seed=args.seed,
+    )
+    client = build_replay_client(
+        "replay", args.replay_file, config=config, retry_over_query_limit=False
+    )
+    addresses = recorded_addresses(client.session.replay_file)
+    executor = RateLimitedExecutor(qps=args.qps, max_workers=args.workers)
+    started = time.perf_counter()
+    coordinates = get_coordinates_for_addresses_batch(
+        client, addresses, executor=executor
+    )
+    elapsed = time.perf_counter() - started
+    found = sum(lat is not None for lat, _ in coordinates.values())
+    print(f"Geokodowanie {found}/{len(addresses)} adresów w {elapsed:.2f} s")
+    print(f"Odpowiedzi: {dict(client.session.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Równoległe wywołania Google Maps z limitem zapytań na sekundę.
+
+``RateLimitedExecutor`` łączy kubełek żetonów (``qps`` zapytań na sekundę,
+``burst`` naraz) z pulą wątków. Klient opakowany przez ``wrap`` pobiera żeton
+przed każdym zapytaniem, a odpowiedź ``OVER_QUERY_LIMIT`` ponawia z
+wykładniczym opóźnieniem z losowym rozrzutem. ``map`` zwraca wyniki w
+kolejności wejścia.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QPS = 10.0
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+DEFAULT_JITTER = 0.5
+OVER_QUERY_LIMIT = "OVER_QUERY_LIMIT"
+# Tolerancja błędu zaokrągleń: bez niej po odczekaniu ``wait`` mogłoby brakować
+# ułamka żetonu, którego zegar o skończonej rozdzielczości nigdy nie doliczy.
+TOKEN_EPSILON = 1e-9
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def is_over_query_limit(exc: BaseException) -> bool:
+    """Rozpoznaje przekroczenie limitu (``googlemaps`` zgłasza je jako ApiError)."""
+    if getattr(exc, "status", None) == OVER_QUERY_LIMIT:
+        return True
+    return type(exc).__name__ == "_OverQueryLimit" or OVER_QUERY_LIMIT in str(exc)
+
+
+class TokenBucket:
+    """Kubełek żetonów: średnio ``rate`` pobrań na sekundę, najwyżej ``capacity`` naraz."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate musi być dodatnie")
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = self.clock()
+                elapsed = max(now - self._updated, 0.0)
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0 - TOKEN_EPSILON:
+                    self._tokens = max(self._tokens - 1.0, 0.0)
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class RateLimitedClient:
+    """Pośrednik klienta: każde wywołanie metody przechodzi przez ``executor.call``."""
+
+    def __init__(self, client: Any, executor: "RateLimitedExecutor") -> None:
+        self.client = client
+        self.executor = executor
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def limited(*args: Any, **kwargs: Any) -> Any:
+            return self.executor.call(attribute, *args, **kwargs)
+
+        return limited
+
+
+class RateLimitedExecutor:
+    """Limit QPS, ograniczona pula wątków i ponowienia ``OVER_QUERY_LIMIT``."""
+
+    def __init__(
+        self,
+        qps: float = DEFAULT_QPS,
+        max_workers: int = DEFAULT_WORKERS,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        jitter: float = DEFAULT_JITTER,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.bucket = TokenBucket(qps, capacity=burst, clock=clock, sleep=sleep)
+        self.max_workers = max(int(max_workers), 1)
+        self.retries = retries
+        self.backoff = backoff
+        self.jitter = jitter
+        self.sleep = sleep
+        self.rng = rng
+
+    def retry_delay(self, attempt: int) -> float:
+        return self.backoff * 2**attempt * (1.0 + self.jitter * self.rng())
+
+    def call(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R:
+        """Wywołuje ``fn`` po pobraniu żetonu; ponawia tylko przekroczenie limitu."""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as exc:
+                if not is_over_query_limit(exc) or attempt >= self.retries:
+                    raise
+                delay = self.retry_delay(attempt)
+                logger.warning(
+                    "Google Maps: %s, ponowienie za %.1f s", OVER_QUERY_LIMIT, delay
+                )
+                self.sleep(delay)
+                attempt += 1
+
+    def wrap(self, client: Any) -> Any:
+        if isinstance(client, RateLimitedClient) and client.executor is self:
+            return client
+        return RateLimitedClient(client, self)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> list[R]:
+        """Wykonuje ``fn`` równolegle w ``max_workers`` wątkach; kolejność wejścia."""
+        items = list(items)
+        if self.max_workers == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(fn, items))
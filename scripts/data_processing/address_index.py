@@ -0,0 +1,156 @@
+"""Lokalny geokoder adresów Warszawy z pliku punktów adresowych.
+
+Plik (CSV albo GeoJSON z punktami, np. punkty adresowe m.st. Warszawy lub
+eksport OSM) zawiera ulicę, numer i współrzędne. Klucz adresu to
+``ascii_key`` bez polskich znaków, kodu pocztowego, nazwy miasta i prefiksu
+typu ulicy ("ul.", "al.", "pl." ...), więc "ul. Marszałkowska 1, 00-624
+Warszawa" i "marszalkowska 1" trafiają w ten sam wpis. Klucze leżą w
+posortowanej liście: dokładne trafienie i zakres podpowiedzi dla prefiksu to
+``bisect`` w O(log n), czyli pojedyncze mikrosekundy.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from scripts.data_processing.text_keys import STROKE_LETTERS, ascii_key
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_ADDRESS_FILE = BASE_DIR / "data" / "reference" / "warszawa_adresy.csv"
+STREET_COLUMNS = ("ulica", "nazwa_ulicy", "street", "addr:street")
+NUMBER_COLUMNS = ("numer", "nr", "numer_porzadkowy", "housenumber", "addr:housenumber")
+LAT_COLUMNS = ("lat", "szerokosc", "y")
+LON_COLUMNS = ("lon", "lng", "dlugosc", "x")
+STREET_PREFIXES = frozenset(
+    {"ul", "ulica", "al", "aleja", "aleje", "pl", "plac", "os", "osiedle", "rondo"}
+)
+CITY_TOKENS = frozenset({"warszawa", "polska", "poland"})
+POSTCODE_RE = re.compile(r"\b\d{2}-\d{3}\b")
+APARTMENT_RE = re.compile(r"\s+(?:m|lok)\s+\w+$")
+# "10/5" lub "10 A / 5": numer lokalu po ukośniku za numerem domu.
+SLASH_APARTMENT_RE = re.compile(r"(\d+\s*[^\W\d_]?)\s*/\s*\w+")
+COMPLETION_SCAN_LIMIT = 2000
+
+
+def address_key(value: Any) -> str:
+    """Klucz wyszukiwania: ``ascii_key`` bez kodu, miasta, prefiksu i lokalu."""
+    text = POSTCODE_RE.sub(" ", str(value or "")).translate(STROKE_LETTERS)
+    text = SLASH_APARTMENT_RE.sub(r"\1", text)
+    tokens = [token for token in ascii_key(text).split() if token not in CITY_TOKENS]
+    while tokens and tokens[0] in STREET_PREFIXES:
+        tokens = tokens[1:]
+    return APARTMENT_RE.sub("", " ".join(tokens))
+
+
+def _natural_order(key: str) -> tuple[Any, ...]:
+    parts = re.split(r"(\d+)", key)
+    return tuple(int(part) if part.isdigit() else part for part in parts)
+
+
+@dataclass(frozen=True)
+class AddressMatch:
+    label: str
+    lat: float
+    lon: float
+
+    @property
+    def coordinates(self) -> tuple[float, float]:
+        return self.lat, self.lon
+
+
+class AddressIndex:
+    """Posortowane klucze adresów z etykietą i współrzędnymi."""
+
+    def __init__(self, entries: dict[str, AddressMatch]) -> None:
+        self.keys = sorted(entries)
+        self.matches = [entries[key] for key in self.keys]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AddressIndex":
+        """Buduje indeks z kolumn ulicy, numeru i współrzędnych (nazwy z aliasów)."""
+        columns = {ascii_key(col).replace(" ", "_"): col for col in df.columns}
+        columns |= {str(col).lower(): col for col in df.columns}
+
+        def pick(candidates: tuple[str, ...]) -> str:
+            for name in candidates:
+                if name in columns:
+                    return columns[name]
+            raise ValueError(
+                "Brak kolumny punktów adresowych: " + " / ".join(candidates)
+            )
+
+        street_col = pick(STREET_COLUMNS)
+        number_col = pick(NUMBER_COLUMNS)
+        lat = pd.to_numeric(df[pick(LAT_COLUMNS)], errors="coerce")
+        lon = pd.to_numeric(df[pick(LON_COLUMNS)], errors="coerce")
+        entries: dict[str, AddressMatch] = {}
+        for street, number, lat_value, lon_value in zip(
+            df[street_col], df[number_col], lat, lon
+        ):
+            if any(pd.isna(value) for value in (street, number, lat_value, lon_value)):
+                continue
+            label = f"{str(street).strip()} {str(number).strip()}"
+            key = address_key(label)
+            if key and key not in entries:
+                entries[key] = AddressMatch(label, float(lat_value), float(lon_value))
+        return cls(entries)
+
+    def resolve(self, query: str) -> AddressMatch | None:
+        """Dokładne trafienie po kluczu adresu albo None."""
+        key = address_key(query)
+        position = bisect.bisect_left(self.keys, key)
+        if key and position < len(self.keys) and self.keys[position] == key:
+            return self.matches[position]
+        return None
+
+    def complete(self, query: str, limit: int = 8) -> list[AddressMatch]:
+        """Adresy zaczynające się od zapytania, w naturalnej kolejności numerów."""
+        prefix = address_key(query)
+        if not prefix or limit <= 0:
+            return []
+        start = bisect.bisect_left(self.keys, prefix)
+        stop = bisect.bisect_left(self.keys, prefix + "\uffff", lo=start)
+        stop = min(stop, start + COMPLETION_SCAN_LIMIT)
+        positions = sorted(
+            range(start, stop), key=lambda pos: _natural_order(self.keys[pos])
+        )
+        return [self.matches[pos] for pos in positions[:limit]]
+
+
+def _read_geojson_points(path: Path) -> pd.DataFrame:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    rows = []
+    for feature in data.get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            continue
+        lon, lat = geometry["coordinates"][:2]
+        rows.append({**(feature.get("properties") or {}), "lat": lat, "lon": lon})
+    return pd.DataFrame(rows)
+
+
+def load_address_index(path: Path | None = None) -> AddressIndex | None:
+    """Wczytuje punkty adresowe; None, gdy pliku nie ma."""
+    path = Path(path) if path else DEFAULT_ADDRESS_FILE
+    if not path.exists():
+        return None
+    if path.suffix.lower() in {".geojson", ".json"}:
+        df = _read_geojson_points(path)
+    else:
+        df = pd.read_csv(path, sep=None, engine="python", dtype=str)
+    index = AddressIndex.from_frame(df)
+    logger.info("Indeks adresów: %s punktów z %s", len(index), path)
+    return index
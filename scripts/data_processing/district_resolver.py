@@ -0,0 +1,234 @@
+"""Przypisanie dzielnicy Warszawy na podstawie współrzędnych szkoły.
+
+Granice dzielnic są wczytywane z lokalnego GeoJSON (``Polygon`` lub
+``MultiPolygon``, współrzędne ``[lon, lat]``). Krawędzie wszystkich
+wielokątów trafiają do indeksu poziomych pasów szerokości geograficznej,
+więc test punkt-w-wielokącie (liczba przecięć promienia) dla punktu
+sprawdza tylko krawędzie z jego pasa i jest liczony macierzowo dla
+wszystkich punktów naraz.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from scripts.data_processing.text_keys import folded_key
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_DISTRICTS_FILE = BASE_DIR / "data" / "reference" / "warszawa_dzielnice.geojson"
+NAME_PROPERTIES = (
+    "name",
+    "nazwa",
+    "Dzielnica",
+    "dzielnica",
+    "NAZWA_DZIE",
+    "nazwa_dzie",
+)
+DEFAULT_BAND_HEIGHT = 0.005  # ok. 550 m szerokości geograficznej
+# Nazwy jak w data/reference/waw_kod_dzielnica.csv; po nich filtrujemy dzielnice.
+WARSAW_DISTRICTS = (
+    "Bemowo",
+    "Białołęka",
+    "Bielany",
+    "Mokotów",
+    "Ochota",
+    "Praga-Południe",
+    "Praga-Północ",
+    "Rembertów",
+    "Targówek",
+    "Ursus",
+    "Ursynów",
+    "Wawer",
+    "Wesoła",
+    "Wilanów",
+    "Wola",
+    "Włochy",
+    "Śródmieście",
+    "Żoliborz",
+)
+
+
+CANONICAL_DISTRICTS = {folded_key(name): name for name in WARSAW_DISTRICTS}
+
+
+def _polygon_rings(geometry: dict[str, Any]) -> list[list[list[float]]]:
+    geometry_type = geometry.get("type")
+    coordinates = geometry.get("coordinates") or []
+    if geometry_type == "Polygon":
+        return list(coordinates)
+    if geometry_type == "MultiPolygon":
+        return [ring for polygon in coordinates for ring in polygon]
+    raise ValueError(f"Nieobsługiwany typ geometrii dzielnicy: {geometry_type}")
+
+
+def _feature_name(properties: dict[str, Any], name_property: str | None) -> str:
+    keys = (name_property,) if name_property else NAME_PROPERTIES
+    for key in keys:
+        value = properties.get(key)
+        if not value:
+            continue
+        name = CANONICAL_DISTRICTS.get(folded_key(value))
+        if name is None:
+            raise ValueError(f"Nieznana dzielnica Warszawy w granicach: {value!r}")
+        return name
+    raise ValueError(f"Brak nazwy dzielnicy we właściwościach: {sorted(properties)}")
+
+
+class DistrictResolver:
+    """Indeks granic dzielnic z wektorowym testem punkt-w-wielokącie."""
+
+    def __init__(
+        self,
+        districts: Iterable[tuple[str, list[list[list[float]]]]],
+        band_height: float = DEFAULT_BAND_HEIGHT,
+    ) -> None:
+        names: list[str] = []
+        edges: list[np.ndarray] = []
+        owners: list[np.ndarray] = []
+        for name, rings in districts:
+            index = len(names)
+            names.append(name)
+            for ring in rings:
+                points = np.asarray(ring, dtype=float)[:, :2]
+                if len(points) < 3:
+                    continue
+                if not np.array_equal(points[0], points[-1]):
+                    points = np.vstack([points, points[:1]])
+                ring_edges = np.hstack([points[:-1], points[1:]])
+                # Krawędzie poziome nigdy nie są przecinane przez promień.
+                ring_edges = ring_edges[ring_edges[:, 1] != ring_edges[:, 3]]
+                edges.append(ring_edges)
+                owners.append(np.full(len(ring_edges), index))
+        if not names:
+            raise ValueError("Brak dzielnic w danych granic.")
+
+        self.names = np.array(names, dtype=object)
+        self.edges = np.vstack(edges) if edges else np.empty((0, 4))
+        self.owners = np.concatenate(owners) if owners else np.empty(0, dtype=int)
+        self.band_height = band_height
+
+        low = np.minimum(self.edges[:, 1], self.edges[:, 3])
+        high = np.maximum(self.edges[:, 1], self.edges[:, 3])
+        self.min_lat = float(low.min()) if len(low) else 0.0
+        self.max_lat = float(high.max()) if len(high) else 0.0
+        band_count = int(np.floor((self.max_lat - self.min_lat) / band_height)) + 1
+        first_band = self._band_of(low)
+        last_band = self._band_of(high)
+        self.bands: list[np.ndarray] = [
+            np.flatnonzero((first_band <= band) & (last_band >= band))
+            for band in range(band_count)
+        ]
+
+    @classmethod
+    def from_geojson(
+        cls,
+        path: Path,
+        name_property: str | None = None,
+        band_height: float = DEFAULT_BAND_HEIGHT,
+    ) -> "DistrictResolver":
+        with open(path, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        features = collection.get("features", [collection])
+        districts = [
+            (
+                _feature_name(feature.get("properties") or {}, name_property),
+                _polygon_rings(feature["geometry"]),
+            )
+            for feature in features
+            if feature.get("geometry")
+        ]
+        return cls(districts, band_height=band_height)
+
+    def _band_of(self, lat: np.ndarray) -> np.ndarray:
+        return np.floor((lat - self.min_lat) / self.band_height).astype(int)
+
+    def resolve(self, lat: Any, lon: Any) -> np.ndarray:
+        """Zwraca nazwy dzielnic (``None`` poza granicami lub bez współrzędnych)."""
+        lat_values = pd.to_numeric(pd.Series(lat), errors="coerce").to_numpy(float)
+        lon_values = pd.to_numeric(pd.Series(lon), errors="coerce").to_numpy(float)
+        result = np.full(len(lat_values), None, dtype=object)
+        valid = (
+            np.isfinite(lat_values)
+            & np.isfinite(lon_values)
+            & (lat_values >= self.min_lat)
+            & (lat_values <= self.max_lat)
+        )
+        if not valid.any():
+            return result
+
+        point_bands = np.full(len(lat_values), -1)
+        point_bands[valid] = self._band_of(lat_values[valid])
+        for band in np.unique(point_bands[valid]):
+            points = np.flatnonzero(point_bands == band)
+            edge_ids = self.bands[band] if band < len(self.bands) else []
+            if len(edge_ids) == 0:
+                continue
+            x1, y1, x2, y2 = self.edges[edge_ids].T
+            py = lat_values[points][:, None]
+            px = lon_values[points][:, None]
+            spans = (y1 > py) != (y2 > py)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+            crossings = spans & (px < crossing_x)
+            # Liczba przecięć na dzielnicę: (punkty x krawędzie) @ (krawędzie x dzielnice).
+            owner_matrix = np.zeros((len(edge_ids), len(self.names)), dtype=int)
+            owner_matrix[np.arange(len(edge_ids)), self.owners[edge_ids]] = 1
+            inside = (crossings.astype(int) @ owner_matrix) % 2 == 1
+            found = inside.any(axis=1)
+            result[points[found]] = self.names[inside[found].argmax(axis=1)]
+        return result
+
+
+def load_district_resolver(
+    path: Path | None = None, name_property: str | None = None
+) -> DistrictResolver | None:
+    """Wczytuje granice dzielnic; ``None``, gdy pliku nie ma."""
+    path = Path(path) if path else DEFAULT_DISTRICTS_FILE
+    if not path.exists():
+        logger.info(
+            "Brak granic dzielnic (%s); dzielnice z kodów pocztowych. "
+            "Granice pobiera scripts/data_processing/get_data_dzielnice.py.",
+            path,
+        )
+        return None
+    return DistrictResolver.from_geojson(path, name_property=name_property)
+
+
+def assign_districts(
+    df: pd.DataFrame,
+    resolver: DistrictResolver | None,
+    overwrite: bool = True,
+    lat_col: str = "SzkolaLat",
+    lon_col: str = "SzkolaLon",
+    district_col: str = "Dzielnica",
+) -> pd.DataFrame:
+    """
+    Ustawia dzielnicę z granic dla wierszy ze współrzędnymi.
+
+    Dotychczasowa wartość (np. z kodu pocztowego) zostaje tylko tam, gdzie
+    współrzędnych brakuje lub punkt leży poza granicami. Przy
+    ``overwrite=False`` uzupełniane są wyłącznie puste dzielnice.
+    """
+    df = df.copy()
+    if district_col not in df.columns:
+        df[district_col] = None
+    if resolver is None or lat_col not in df.columns or lon_col not in df.columns:
+        return df
+    resolved = pd.Series(resolver.resolve(df[lat_col], df[lon_col]), index=df.index)
+    current = df[district_col].astype(object)
+    if overwrite:
+        use_resolved = resolved.notna()
+    else:
+        use_resolved = resolved.notna() & (
+            current.isna() | (current.astype(str).str.strip() == "")
+        )
+    df[district_col] = current.where(~use_resolved, resolved)
+    return df
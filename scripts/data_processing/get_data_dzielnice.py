@@ -0,0 +1,183 @@
+"""Pobiera granice dzielnic Warszawy z OpenStreetMap (Overpass API) do GeoJSON.
+
+Dzielnice to relacje ``boundary=administrative`` z ``admin_level=9`` wewnątrz
+Warszawy (``wikidata=Q270``). Overpass zwraca geometrię dróg należących do
+relacji; drogi są sklejane w zamknięte pierścienie (``outer``/``inner``),
+a dziury przypisywane do zawierającego je pierścienia zewnętrznego. Nazwy
+są sprowadzane do nazw z ``waw_kod_dzielnica.csv``, więc wynik można od razu
+wczytać przez ``district_resolver.py``:
+
+    python scripts/data_processing/get_data_dzielnice.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any
+
+import requests
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.data_processing.district_resolver import (  # noqa: E402
+    CANONICAL_DISTRICTS,
+    DEFAULT_DISTRICTS_FILE,
+    WARSAW_DISTRICTS,
+)
+from scripts.data_processing.text_keys import folded_key  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_QUERY = """
+[out:json][timeout:180];
+area["wikidata"="Q270"]["boundary"="administrative"]->.warszawa;
+rel(area.warszawa)["boundary"="administrative"]["admin_level"="9"];
+out geom;
+"""
+DEFAULT_TIMEOUT = 180
+
+Point = tuple[float, float]
+
+
+def _way_points(member: dict[str, Any]) -> list[Point]:
+    return [(float(node["lon"]), float(node["lat"])) for node in member["geometry"]]
+
+
+def assemble_rings(ways: list[list[Point]]) -> list[list[Point]]:
+    """Skleja drogi w zamknięte pierścienie (kierunek dróg bywa dowolny)."""
+    pending = [list(way) for way in ways if len(way) >= 2]
+    rings = []
+    while pending:
+        ring = pending.pop(0)
+        while ring[0] != ring[-1]:
+            for index, way in enumerate(pending):
+                if way[0] == ring[-1]:
+                    ring.extend(way[1:])
+                elif way[-1] == ring[-1]:
+                    ring.extend(reversed(way[:-1]))
+                else:
+                    continue
+                pending.pop(index)
+                break
+            else:
+                raise ValueError(f"Niedomknięty pierścień granicy przy {ring[-1]}")
+        if len(ring) >= 4:
+            rings.append(ring)
+    return rings
+
+
+def _ring_contains(ring: list[Point], point: Point) -> bool:
+    x, y = point
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def relation_polygons(relation: dict[str, Any]) -> list[list[list[Point]]]:
+    """Wielokąty relacji: ``[[zewnętrzny, dziura, ...], ...]``."""
+    ways: dict[str, list[list[Point]]] = {"outer": [], "inner": []}
+    for member in relation.get("members", []):
+        if member.get("type") != "way" or not member.get("geometry"):
+            continue
+        role = "inner" if member.get("role") == "inner" else "outer"
+        ways[role].append(_way_points(member))
+    polygons = [[outer] for outer in assemble_rings(ways["outer"])]
+    for inner in assemble_rings(ways["inner"]):
+        owner = next(
+            (polygon for polygon in polygons if _ring_contains(polygon[0], inner[0])),
+            None,
+        )
+        if owner is not None:
+            owner.append(inner)
+    return polygons
+
+
+def districts_geojson(overpass: dict[str, Any]) -> dict[str, Any]:
+    """GeoJSON dzielnic z odpowiedzi Overpass; pomija relacje spoza listy."""
+    features: list[dict[str, Any]] = []
+    for element in overpass.get("elements", []):
+        if element.get("type") != "relation":
+            continue
+        raw_name = (element.get("tags") or {}).get("name", "")
+        name = CANONICAL_DISTRICTS.get(folded_key(raw_name))
+        if name is None:
+            logger.warning("Pomijam relację spoza dzielnic Warszawy: %r", raw_name)
+            continue
+        polygons = relation_polygons(element)
+        if not polygons:
+            logger.warning("Relacja %s (%s) nie ma geometrii.", element.get("id"), name)
+            continue
+        features.append(
+            {
+                "type": "Feature",
+                "properties": {"nazwa": name, "osm_id": element.get("id")},
+                "geometry": {
+                    "type": "MultiPolygon",
+                    "coordinates": [
+                        [[list(point) for point in ring] for ring in polygon]
+                        for polygon in polygons
+                    ],
+                },
+            }
+        )
+    if not features:
+        raise ValueError("Odpowiedź Overpass nie zawiera granic dzielnic Warszawy.")
+    missing = sorted(
+        set(WARSAW_DISTRICTS) - {f["properties"]["nazwa"] for f in features}
+    )
+    if missing:
+        logger.warning("Brak granic dzielnic: %s", ", ".join(missing))
+    features.sort(key=lambda feature: feature["properties"]["nazwa"])
+    return {"type": "FeatureCollection", "features": features}
+
+
+def fetch_districts(
+    output: Path = DEFAULT_DISTRICTS_FILE,
+    overpass_url: str = OVERPASS_URL,
+    session: requests.Session | Any | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> dict[str, Any]:
+    """Pobiera granice z Overpass i zapisuje GeoJSON pod ``output``."""
+    session = session or requests
+    response = session.post(
+        overpass_url, data={"data": OVERPASS_QUERY}, timeout=timeout
+    )
+    response.raise_for_status()
+    geojson = districts_geojson(response.json())
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.name + ".tmp")
+    tmp_path.write_text(json.dumps(geojson, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(output)
+    logger.info("Zapisano %s dzielnic do %s", len(geojson["features"]), output)
+    return geojson
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Pobiera granice dzielnic Warszawy z OpenStreetMap do GeoJSON."
+    )
+    parser.add_argument("--output", type=Path, default=DEFAULT_DISTRICTS_FILE)
+    parser.add_argument("--overpass-url", default=OVERPASS_URL)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    args = parse_args()
+    fetch_districts(args.output, overpass_url=args.overpass_url, timeout=args.timeout)
+
+
+if __name__ == "__main__":
+    main()
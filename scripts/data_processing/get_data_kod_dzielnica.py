@@ -1,15 +1,43 @@
+"""Pobiera mapowanie kod pocztowy -> dzielnica Warszawy z kodypocztowe.info.
+
+Podstrony są pobierane równolegle przez wspólną sesję HTTP, z ponowieniami
+i zapisem każdej strony (gzip) do katalogu cache. Przerwane pobieranie
+wznawia się od brakujących stron, a z kompletnego cache CSV można odtworzyć
+bez sieci (``--offline``). Strona bez wierszy z kodami (np. captcha albo
+strona błędu mimo HTTP 200) nie trafia do cache i jest pobierana ponownie.
+"""
+
+import argparse
+import gzip
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 
+BASE_DIR = Path(__file__).resolve().parents[2]
 BASE_URL = "https://www.kodypocztowe.info/warszawa"  # strona 1
 LAST_PAGE = 670  # na dziś jest 670 podstron
+DEFAULT_CACHE_DIR = BASE_DIR / "data" / "raw" / "kodypocztowe_warszawa"
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmptyPageError(requests.RequestException):
+    """Odpowiedź 200 bez wierszy z kodami pocztowymi."""
+
+
+def page_url(page: int) -> str:
+    return BASE_URL if page == 1 else f"{BASE_URL}/page:{page}"
 
 
-def _rows_from_page(page: int) -> list[tuple[str, str]]:
-    """Zwraca [(kod, dzielnica), ...] z pojedynczej podstrony."""
-    url = BASE_URL if page == 1 else f"{BASE_URL}/page:{page}"
-    html = requests.get(url, timeout=10).text
+def parse_rows(html: str) -> list[tuple[str, str]]:
+    """Zwraca [(kod, dzielnica), ...] z HTML pojedynczej podstrony."""
     soup = BeautifulSoup(html, "html.parser")
     rows = []
     for tr in soup.select("tr._data"):  # wiersze z danymi
@@ -25,10 +53,125 @@ def _rows_from_page(page: int) -> list[tuple[str, str]]:
     return rows
 
 
-def build_csv(out_path: str = "data/reference/waw_kod_dzielnica.csv") -> pd.DataFrame:
+class PageCache:
+    """Surowe podstrony zapisane jako ``page_0001.html.gz``."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, page: int) -> Path:
+        return self.cache_dir / f"page_{page:04d}.html.gz"
+
+    def has(self, page: int) -> bool:
+        return self.path(page).exists()
+
+    def read(self, page: int) -> str:
+        return gzip.decompress(self.path(page).read_bytes()).decode("utf-8")
+
+    def write(self, page: int, html: str) -> None:
+        path = self.path(page)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(gzip.compress(html.encode("utf-8")))
+        tmp_path.replace(path)
+
+    def missing(self, pages: range) -> list[int]:
+        return [page for page in pages if not self.has(page)]
+
+
+def fetch_page(
+    session: requests.Session,
+    page: int,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    retry_backoff: float = RETRY_BACKOFF,
+) -> str:
+    """
+    Pobiera podstronę, ponawiając błędy sieci i odpowiedzi 429/5xx.
+
+    Strona, w której ``parse_rows`` nie znajduje wierszy, też jest ponawiana,
+    a po wyczerpaniu prób zgłaszana jako ``EmptyPageError``.
+    """
+    attempt = 0
+    while True:
+        try:
+            response = session.get(page_url(page), timeout=timeout)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                if parse_rows(response.text):
+                    return response.text
+                error: Exception = EmptyPageError(f"Brak wierszy na stronie {page}")
+            else:
+                error = requests.HTTPError(
+                    f"HTTP {response.status_code} dla strony {page}"
+                )
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            error = exc
+        if attempt >= retries:
+            raise error
+        time.sleep(retry_backoff * 2**attempt)
+        attempt += 1
+
+
+def fetch_missing_pages(
+    cache: PageCache,
+    pages: range,
+    session: requests.Session | None = None,
+    max_workers: int = DEFAULT_WORKERS,
+    **fetch_kwargs,
+) -> dict[int, str]:
+    """
+    Pobiera brakujące w cache strony z ograniczoną liczbą wątków.
+
+    Każda strona jest zapisywana zaraz po pobraniu, więc po przerwaniu
+    kolejne uruchomienie pobiera tylko resztę. Zwraca ``{strona: błąd}``
+    dla stron, których nie udało się pobrać.
+    """
+    missing = cache.missing(pages)
+    if not missing:
+        return {}
+    session = session or requests.Session()
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_page, session, page, **fetch_kwargs): page
+            for page in missing
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                cache.write(page, future.result())
+            except requests.RequestException as exc:
+                failed[page] = str(exc)
+    return failed
+
+
+def build_csv(
+    out_path: str = "data/reference/waw_kod_dzielnica.csv",
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    session: requests.Session | None = None,
+    max_workers: int = DEFAULT_WORKERS,
+    offline: bool = False,
+    **fetch_kwargs,
+) -> pd.DataFrame:
+    cache = PageCache(cache_dir)
+    pages = range(1, LAST_PAGE + 1)
+    if offline:
+        failed = {page: "brak w cache" for page in cache.missing(pages)}
+    else:
+        failed = fetch_missing_pages(
+            cache, pages, session=session, max_workers=max_workers, **fetch_kwargs
+        )
+    if failed:
+        first = sorted(failed)[:5]
+        raise RuntimeError(
+            f"Nie pobrano {len(failed)} stron (np. {first}); "
+            "uruchom ponownie, aby dokończyć pobieranie."
+        )
+
     all_rows = []
-    for p in range(1, LAST_PAGE + 1):
-        all_rows.extend(_rows_from_page(p))
+    for p in pages:
+        all_rows.extend(parse_rows(cache.read(p)))
     df = (
         pd.DataFrame(all_rows, columns=["Kod", "Dzielnica"])
         .drop_duplicates()  # ten sam kod potrafi być na kilku ulicach
@@ -39,5 +182,30 @@ def build_csv(out_path: str = "data/reference/waw_kod_dzielnica.csv") -> pd.Data
     return df
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Buduje CSV kod pocztowy -> dzielnica z kodypocztowe.info."
+    )
+    parser.add_argument("--output", default="data/reference/waw_kod_dzielnica.csv")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Nie łącz się z siecią; zbuduj CSV wyłącznie z --cache-dir.",
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    build_csv()
+    args = parse_args()
+    build_csv(
+        args.output,
+        cache_dir=args.cache_dir,
+        max_workers=args.workers,
+        offline=args.offline,
+        timeout=args.timeout,
+        retries=args.retries,
+    )
@@ -10,16 +10,23 @@ import argparse
 import json
 import logging
 import re
+import sys
 import time
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 from urllib.parse import urljoin
 
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.data_processing.html_extract import extract_html  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +38,36 @@ SCHEMA_VERSION = "1.0"
 EXCEL_CELL_LIMIT = 32767
 EXCEL_TRUNCATION_SUFFIX = " [ucieto w Excelu; pelna wartosc jest w raw JSON]"
 
+PZO_TABLE_NAMES = (
+    "schools",
+    "classes",
+    "offer_values_long",
+    "criteria_long",
+    "assets_manifest",
+    "download_manifest",
+)
+# Znany schemat tabel z build_tables: kolumny z zagnieżdżonym JSON, liczbami
+# i wartościami logicznymi. Pozostałe kolumny są tekstowe.
+TABLE_JSON_COLUMNS: dict[str, tuple[str, ...]] = {
+    "offer_values_long": ("value_raw", "raw_json"),
+    "criteria_long": ("raw_json",),
+    "assets_manifest": ("raw_json",),
+}
+TABLE_NUMERIC_COLUMNS: dict[str, tuple[str, ...]] = {
+    "schools": ("SzkolaLat", "SzkolaLon", "latitude", "longitude"),
+    "classes": (
+        "LiczbaOddzialow",
+        "LiczbaMiejsc",
+        "SzkolaLat",
+        "SzkolaLon",
+        "latitude",
+        "longitude",
+    ),
+}
+TABLE_BOOL_COLUMNS: dict[str, tuple[str, ...]] = {
+    "classes": ("BlockApply", "HasCriteria", "ShowCriteria"),
+}
+
 SEARCH_METADATA_PATH = "/api/offer/search"
 SEARCH_SUBMIT_PATH = "/api/offer/searchSubmit"
 SCHOOL_DETAILS_PATH = "/api/offer/schoolDetails"
@@ -176,8 +213,7 @@ def clean_text(value: Any) -> str:
 def html_to_text(value: Any) -> str:
     if value is None:
         return ""
-    soup = BeautifulSoup(str(value), "html.parser")
-    text = soup.get_text(" ", strip=True)
+    text = extract_html(value).text
     text = text.replace("Text-editor", " ")
     return clean_text(text)
 
@@ -185,13 +221,7 @@ def html_to_text(value: Any) -> str:
 def extract_image_sources(value: Any) -> list[str]:
     if not value:
         return []
-    soup = BeautifulSoup(str(value), "html.parser")
-    sources: list[str] = []
-    for tag in soup.find_all("img"):
-        src = tag.get("src")
-        if src:
-            sources.append(str(src))
-    return sources
+    return list(extract_html(value).image_sources)
 
 
 def first_present(*values: Any) -> Any:
@@ -459,8 +489,12 @@ def read_json(path: Path) -> Any:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def load_snapshot_files(raw_dir: Path) -> JsonDict:
-    """Odtwarza snapshot z katalogu raw, żeby regenerować tabele bez sieci."""
+def school_detail_paths(raw_dir: Path) -> list[Path]:
+    return sorted((raw_dir / "school_details").glob("*.json"))
+
+
+def load_snapshot_index(raw_dir: Path) -> JsonDict:
+    """Wczytuje snapshot bez ``school_details``; szczegóły czyta się leniwie."""
     manifest = read_json(raw_dir / "manifest.json")
     search_metadata = read_json(raw_dir / "search_metadata.json")
 
@@ -469,9 +503,7 @@ def load_snapshot_files(raw_dir: Path) -> JsonDict:
         school_type_id = path.stem.replace("school_type_", "")
         search_results[school_type_id] = read_json(path)
 
-    school_details: dict[str, JsonDict] = {}
-    for path in sorted((raw_dir / "school_details").glob("*.json")):
-        school_details[path.stem] = read_json(path)
+    detail_ids = {path.stem for path in school_detail_paths(raw_dir)}
 
     search_schools: dict[str, JsonDict] = {}
     rebuilt_type_ids_by_school: dict[str, list[int]] = {}
@@ -481,7 +513,7 @@ def load_snapshot_files(raw_dir: Path) -> JsonDict:
             if school_id is None:
                 continue
             school_key = str(school_id)
-            if school_key not in school_details:
+            if school_key not in detail_ids:
                 continue
             search_schools.setdefault(school_key, item)
             rebuilt_type_ids_by_school.setdefault(school_key, [])
@@ -495,13 +527,29 @@ def load_snapshot_files(raw_dir: Path) -> JsonDict:
         "manifest": manifest,
         "search_metadata": search_metadata,
         "search_results": search_results,
-        "school_details": school_details,
         "search_schools": search_schools,
         "type_ids_by_school": manifest.get("type_ids_by_school")
         or rebuilt_type_ids_by_school,
     }
 
 
+def iter_raw_school_details(raw_dir: Path) -> Iterator[tuple[str, JsonDict]]:
+    """Czyta pliki schoolDetails po jednym, w kolejności numerycznej id szkoły."""
+    paths = school_detail_paths(raw_dir)
+    for path in sorted(paths, key=lambda item: int(item.stem)):
+        yield path.stem, read_json(path)
+
+
+def load_snapshot_files(raw_dir: Path) -> JsonDict:
+    """Odtwarza snapshot z katalogu raw, żeby regenerować tabele bez sieci."""
+    snapshot = load_snapshot_index(raw_dir)
+    school_details: dict[str, JsonDict] = {}
+    for path in school_detail_paths(raw_dir):
+        school_details[path.stem] = read_json(path)
+    snapshot["school_details"] = school_details
+    return snapshot
+
+
 def compact_json_cell(value: Any) -> str:
     if isinstance(value, (dict, list)):
         return json.dumps(value, ensure_ascii=False, sort_keys=True)
@@ -889,248 +937,294 @@ def iter_criteria_rows(
     return rows
 
 
-def build_tables(snapshot: JsonDict) -> dict[str, pd.DataFrame]:
-    """Buduje robocze tabele z raw JSON bez ponownego pobierania danych."""
+ROW_TABLE_NAMES = (
+    "schools",
+    "classes",
+    "offer_values_long",
+    "criteria_long",
+    "assets_manifest",
+)
+DEFAULT_BATCH_SCHOOLS = 50
+
+
+def school_table_rows(
+    snapshot: JsonDict, school_id: str, detail: JsonDict
+) -> dict[str, list[JsonDict]]:
+    """Buduje wiersze wszystkich tabel dla jednej szkoły ze snapshotu."""
     schools_rows: list[JsonDict] = []
     classes_rows: list[JsonDict] = []
     offer_rows: list[JsonDict] = []
     criteria_rows: list[JsonDict] = []
     assets_rows: list[JsonDict] = []
 
-    for school_id, detail in sorted(
-        snapshot["school_details"].items(), key=lambda item: int(item[0])
-    ):
-        search_item = snapshot.get("search_schools", {}).get(school_id)
-        school_offer = get_school_offer(detail)
-        school_long = (
-            school_offer.get("schoolLong") if isinstance(school_offer, dict) else {}
+    search_item = snapshot.get("search_schools", {}).get(school_id)
+    school_offer = get_school_offer(detail)
+    school_long = (
+        school_offer.get("schoolLong") if isinstance(school_offer, dict) else {}
+    )
+    school_long = school_long if isinstance(school_long, dict) else {}
+    address = get_school_address(search_item, detail)
+    latitude, longitude = get_school_coords(search_item, detail)
+    type_ids, type_names, school_kind = school_type_info(snapshot, school_id)
+    school_name = get_school_name(search_item, detail)
+    short_name = get_short_school_name(search_item, detail)
+    logo_hash = get_school_logo(search_item, detail)
+    description_html = clean_text(school_long.get("description"))
+
+    schools_rows.append(
+        {
+            "source_school_id": f"pzo:{school_id}",
+            "pzo_school_id": school_id,
+            "pzo_school_type_ids": type_ids,
+            "pzo_school_type_names": type_names,
+            "TypSzkoly": school_kind,
+            "NazwaSzkoly": school_name,
+            "NazwaJednostki": short_name,
+            "AdresSzkoly": address_to_text(address),
+            "Ulica": clean_text(address.get("street")),
+            "NumerBudynku": clean_text(address.get("house")),
+            "NumerLokalu": clean_text(address.get("flat")),
+            "Kod": clean_text(address.get("zipcode")),
+            "Miasto": clean_text(address.get("city")),
+            "Poczta": clean_text(address.get("post")),
+            "Dzielnica": clean_text(school_offer.get("locationDisplay")),
+            "Telefon": clean_text(address.get("phone")),
+            "Email": clean_text(school_offer.get("email")),
+            "WWW": clean_text(school_offer.get("homeSite")),
+            "SzkolaLat": latitude,
+            "SzkolaLon": longitude,
+            "latitude": latitude,
+            "longitude": longitude,
+            "LogoHash": logo_hash,
+            "Dyrektor": clean_text(school_offer.get("headMaster")),
+            "OpisSzkolyHtml": description_html,
+            "OpisSzkolyText": html_to_text(description_html),
+            "SioPublicity": clean_text(school_long.get("sioPublicity")),
+        }
+    )
+
+    if logo_hash:
+        assets_rows.append(
+            {
+                "source_school_id": f"pzo:{school_id}",
+                "source_class_id": "",
+                "pzo_school_id": school_id,
+                "pzo_admission_point_id": "",
+                "asset_kind": "school_logo",
+                "hash": logo_hash,
+                "file_name": "",
+                "content_type": "",
+                "url": "",
+                "label": "logo",
+                "raw_json": {"logo": logo_hash},
+            }
         )
-        school_long = school_long if isinstance(school_long, dict) else {}
-        address = get_school_address(search_item, detail)
-        latitude, longitude = get_school_coords(search_item, detail)
-        type_ids, type_names, school_kind = school_type_info(snapshot, school_id)
-        school_name = get_school_name(search_item, detail)
-        short_name = get_short_school_name(search_item, detail)
-        logo_hash = get_school_logo(search_item, detail)
-        description_html = clean_text(school_long.get("description"))
-
-        schools_rows.append(
+    for image_hash in detail.get("schoolImageHashList") or []:
+        assets_rows.append(
             {
                 "source_school_id": f"pzo:{school_id}",
+                "source_class_id": "",
                 "pzo_school_id": school_id,
-                "pzo_school_type_ids": type_ids,
-                "pzo_school_type_names": type_names,
-                "TypSzkoly": school_kind,
+                "pzo_admission_point_id": "",
+                "asset_kind": "school_image",
+                "hash": clean_text(image_hash),
+                "file_name": "",
+                "content_type": "",
+                "url": "",
+                "label": "schoolImageHashList",
+                "raw_json": {"hash": image_hash},
+            }
+        )
+    for image_src in extract_image_sources(description_html):
+        assets_rows.append(
+            {
+                "source_school_id": f"pzo:{school_id}",
+                "source_class_id": "",
+                "pzo_school_id": school_id,
+                "pzo_admission_point_id": "",
+                "asset_kind": "description_image_url",
+                "hash": "",
+                "file_name": "",
+                "content_type": "",
+                "url": image_src,
+                "label": "OpisSzkolyHtml",
+                "raw_json": {"src": image_src},
+            }
+        )
+
+    for admission_point in admission_points(detail):
+        class_id = clean_text(admission_point.get("id"))
+        offers = offer_items_by_label(admission_point)
+        count_data = admission_point_count(detail, admission_point.get("id"))
+        first_language = first_offer_value(offers, LABEL_FIRST_LANGUAGE)
+        second_language = first_offer_value(offers, LABEL_SECOND_LANGUAGE)
+        icon_classes, icon_descriptions = icon_summary(admission_point.get("iconList"))
+        class_description_html = first_offer_html(offers, LABEL_CLASS_DESCRIPTION)
+
+        classes_rows.append(
+            {
+                "source_school_id": f"pzo:{school_id}",
+                "source_class_id": f"pzo:{class_id}" if class_id else "",
+                "pzo_school_id": school_id,
+                "pzo_admission_point_id": class_id,
+                "IdSzkoly": school_id,
+                "IdOddzialu": class_id,
                 "NazwaSzkoly": school_name,
-                "NazwaJednostki": short_name,
+                "TypSzkoly": school_kind,
                 "AdresSzkoly": address_to_text(address),
-                "Ulica": clean_text(address.get("street")),
-                "NumerBudynku": clean_text(address.get("house")),
-                "NumerLokalu": clean_text(address.get("flat")),
-                "Kod": clean_text(address.get("zipcode")),
-                "Miasto": clean_text(address.get("city")),
-                "Poczta": clean_text(address.get("post")),
                 "Dzielnica": clean_text(school_offer.get("locationDisplay")),
-                "Telefon": clean_text(address.get("phone")),
-                "Email": clean_text(school_offer.get("email")),
-                "WWW": clean_text(school_offer.get("homeSite")),
+                "OddzialNazwa": clean_text(admission_point.get("name")),
+                "OddzialNazwaPzo": clean_text(admission_point.get("name")),
+                "OddzialKod": first_offer_value(offers, LABEL_CLASS_IDENTIFIER),
+                "TypOddzialu": class_type_name(admission_point),
+                "TypOddzialuPzo": class_type_name(admission_point),
+                "LiczbaOddzialow": parse_number(
+                    first_offer_value(offers, LABEL_CLASS_COUNT)
+                ),
+                "LiczbaMiejsc": count_data.get("limit", ""),
+                "PrzedmiotyRozszerzone": first_offer_value(
+                    offers, LABEL_EXTENDED_SUBJECTS
+                ),
+                "PierwszyJezykObcy": first_language,
+                "DrugiJezykObcy": second_language,
+                "JezykiObce": joined_languages(first_language, second_language),
+                "JezykiObceIkony": icon_classes,
+                "JezykiObceIkonyOpis": icon_descriptions,
+                "Zawod": first_offer_value(offers, LABEL_PROFESSION),
+                "DyscyplinaSportowa": first_offer_value(offers, LABEL_SPORT_DISCIPLINE),
+                "OpisOddzialuHtml": class_description_html,
+                "OpisOddzialuText": html_to_text(class_description_html),
+                "QualificationGroup": clean_text(
+                    admission_point.get("qualificationGroup")
+                ),
+                "QualificationGroupId": clean_text(
+                    admission_point.get("qualificationGroupId")
+                ),
+                "ModuleId": clean_text(admission_point.get("moduleId")),
+                "BlockApply": admission_point.get("blockApply"),
+                "HasCriteria": admission_point.get("hasCriteria"),
+                "ShowCriteria": admission_point.get("showCriteria"),
+                "UrlGrupy": "",
                 "SzkolaLat": latitude,
                 "SzkolaLon": longitude,
                 "latitude": latitude,
                 "longitude": longitude,
-                "LogoHash": logo_hash,
-                "Dyrektor": clean_text(school_offer.get("headMaster")),
-                "OpisSzkolyHtml": description_html,
-                "OpisSzkolyText": html_to_text(description_html),
-                "SioPublicity": clean_text(school_long.get("sioPublicity")),
             }
         )
 
-        if logo_hash:
-            assets_rows.append(
-                {
-                    "source_school_id": f"pzo:{school_id}",
-                    "source_class_id": "",
-                    "pzo_school_id": school_id,
-                    "pzo_admission_point_id": "",
-                    "asset_kind": "school_logo",
-                    "hash": logo_hash,
-                    "file_name": "",
-                    "content_type": "",
-                    "url": "",
-                    "label": "logo",
-                    "raw_json": {"logo": logo_hash},
-                }
-            )
-        for image_hash in detail.get("schoolImageHashList") or []:
-            assets_rows.append(
-                {
-                    "source_school_id": f"pzo:{school_id}",
-                    "source_class_id": "",
-                    "pzo_school_id": school_id,
-                    "pzo_admission_point_id": "",
-                    "asset_kind": "school_image",
-                    "hash": clean_text(image_hash),
-                    "file_name": "",
-                    "content_type": "",
-                    "url": "",
-                    "label": "schoolImageHashList",
-                    "raw_json": {"hash": image_hash},
-                }
-            )
-        for image_src in extract_image_sources(description_html):
-            assets_rows.append(
-                {
-                    "source_school_id": f"pzo:{school_id}",
-                    "source_class_id": "",
-                    "pzo_school_id": school_id,
-                    "pzo_admission_point_id": "",
-                    "asset_kind": "description_image_url",
-                    "hash": "",
-                    "file_name": "",
-                    "content_type": "",
-                    "url": image_src,
-                    "label": "OpisSzkolyHtml",
-                    "raw_json": {"src": image_src},
-                }
-            )
-
-        for admission_point in admission_points(detail):
-            class_id = clean_text(admission_point.get("id"))
-            offers = offer_items_by_label(admission_point)
-            count_data = admission_point_count(detail, admission_point.get("id"))
-            first_language = first_offer_value(offers, LABEL_FIRST_LANGUAGE)
-            second_language = first_offer_value(offers, LABEL_SECOND_LANGUAGE)
-            icon_classes, icon_descriptions = icon_summary(
-                admission_point.get("iconList")
-            )
-            class_description_html = first_offer_html(offers, LABEL_CLASS_DESCRIPTION)
-
-            classes_rows.append(
+        for order, item in enumerate(
+            admission_point.get("admissionPointOffersForPublic") or []
+        ):
+            if not isinstance(item, dict):
+                continue
+            raw_value = raw_offer_value_for_long(item)
+            label = offer_item_label(item)
+            attachments = iter_attachment_metadata(item)
+            offer_rows.append(
                 {
                     "source_school_id": f"pzo:{school_id}",
                     "source_class_id": f"pzo:{class_id}" if class_id else "",
                     "pzo_school_id": school_id,
                     "pzo_admission_point_id": class_id,
-                    "IdSzkoly": school_id,
-                    "IdOddzialu": class_id,
-                    "NazwaSzkoly": school_name,
-                    "TypSzkoly": school_kind,
-                    "AdresSzkoly": address_to_text(address),
-                    "Dzielnica": clean_text(school_offer.get("locationDisplay")),
-                    "OddzialNazwa": clean_text(admission_point.get("name")),
-                    "OddzialNazwaPzo": clean_text(admission_point.get("name")),
-                    "OddzialKod": first_offer_value(offers, LABEL_CLASS_IDENTIFIER),
-                    "TypOddzialu": class_type_name(admission_point),
-                    "TypOddzialuPzo": class_type_name(admission_point),
-                    "LiczbaOddzialow": parse_number(
-                        first_offer_value(offers, LABEL_CLASS_COUNT)
-                    ),
-                    "LiczbaMiejsc": count_data.get("limit", ""),
-                    "PrzedmiotyRozszerzone": first_offer_value(
-                        offers, LABEL_EXTENDED_SUBJECTS
-                    ),
-                    "PierwszyJezykObcy": first_language,
-                    "DrugiJezykObcy": second_language,
-                    "JezykiObce": joined_languages(first_language, second_language),
-                    "JezykiObceIkony": icon_classes,
-                    "JezykiObceIkonyOpis": icon_descriptions,
-                    "Zawod": first_offer_value(offers, LABEL_PROFESSION),
-                    "DyscyplinaSportowa": first_offer_value(
-                        offers, LABEL_SPORT_DISCIPLINE
-                    ),
-                    "OpisOddzialuHtml": class_description_html,
-                    "OpisOddzialuText": html_to_text(class_description_html),
-                    "QualificationGroup": clean_text(
-                        admission_point.get("qualificationGroup")
-                    ),
-                    "QualificationGroupId": clean_text(
-                        admission_point.get("qualificationGroupId")
-                    ),
-                    "ModuleId": clean_text(admission_point.get("moduleId")),
-                    "BlockApply": admission_point.get("blockApply"),
-                    "HasCriteria": admission_point.get("hasCriteria"),
-                    "ShowCriteria": admission_point.get("showCriteria"),
-                    "UrlGrupy": "",
-                    "SzkolaLat": latitude,
-                    "SzkolaLon": longitude,
-                    "latitude": latitude,
-                    "longitude": longitude,
+                    "offer_order": order,
+                    "offer_id": clean_text(item.get("id")),
+                    "label": label,
+                    "type": offer_item_type(item),
+                    "value_text": offer_value_text(raw_value),
+                    "value_raw": raw_value,
+                    "attachment_count": len(attachments),
+                    "raw_json": item,
                 }
             )
-
-            for order, item in enumerate(
-                admission_point.get("admissionPointOffersForPublic") or []
-            ):
-                if not isinstance(item, dict):
-                    continue
-                raw_value = raw_offer_value_for_long(item)
-                label = offer_item_label(item)
-                attachments = iter_attachment_metadata(item)
-                offer_rows.append(
+            for attachment in attachments:
+                assets_rows.append(
                     {
                         "source_school_id": f"pzo:{school_id}",
                         "source_class_id": f"pzo:{class_id}" if class_id else "",
                         "pzo_school_id": school_id,
                         "pzo_admission_point_id": class_id,
-                        "offer_order": order,
-                        "offer_id": clean_text(item.get("id")),
+                        "asset_kind": "class_attachment",
+                        "hash": attachment_hash(attachment),
+                        "file_name": attachment_name(attachment),
+                        "content_type": attachment_content_type(attachment),
+                        "url": clean_text(attachment.get("url")),
+                        "label": label or LABEL_FILES,
+                        "raw_json": attachment,
+                    }
+                )
+            for image_src in extract_image_sources(raw_value):
+                assets_rows.append(
+                    {
+                        "source_school_id": f"pzo:{school_id}",
+                        "source_class_id": f"pzo:{class_id}" if class_id else "",
+                        "pzo_school_id": school_id,
+                        "pzo_admission_point_id": class_id,
+                        "asset_kind": "description_image_url",
+                        "hash": "",
+                        "file_name": "",
+                        "content_type": "",
+                        "url": image_src,
                         "label": label,
-                        "type": offer_item_type(item),
-                        "value_text": offer_value_text(raw_value),
-                        "value_raw": raw_value,
-                        "attachment_count": len(attachments),
-                        "raw_json": item,
+                        "raw_json": {"src": image_src},
                     }
                 )
-                for attachment in attachments:
-                    assets_rows.append(
-                        {
-                            "source_school_id": f"pzo:{school_id}",
-                            "source_class_id": f"pzo:{class_id}" if class_id else "",
-                            "pzo_school_id": school_id,
-                            "pzo_admission_point_id": class_id,
-                            "asset_kind": "class_attachment",
-                            "hash": attachment_hash(attachment),
-                            "file_name": attachment_name(attachment),
-                            "content_type": attachment_content_type(attachment),
-                            "url": clean_text(attachment.get("url")),
-                            "label": label or LABEL_FILES,
-                            "raw_json": attachment,
-                        }
-                    )
-                for image_src in extract_image_sources(raw_value):
-                    assets_rows.append(
-                        {
-                            "source_school_id": f"pzo:{school_id}",
-                            "source_class_id": f"pzo:{class_id}" if class_id else "",
-                            "pzo_school_id": school_id,
-                            "pzo_admission_point_id": class_id,
-                            "asset_kind": "description_image_url",
-                            "hash": "",
-                            "file_name": "",
-                            "content_type": "",
-                            "url": image_src,
-                            "label": label,
-                            "raw_json": {"src": image_src},
-                        }
-                    )
-
-            criteria_rows.extend(
-                iter_criteria_rows(school_id, class_id, admission_point)
-            )
 
-    tables = {
-        "schools": pd.DataFrame(schools_rows),
-        "classes": pd.DataFrame(classes_rows),
-        "offer_values_long": pd.DataFrame(offer_rows),
-        "criteria_long": pd.DataFrame(criteria_rows),
-        "assets_manifest": pd.DataFrame(assets_rows),
-        "download_manifest": manifest_dataframe(snapshot["manifest"]),
+        criteria_rows.extend(iter_criteria_rows(school_id, class_id, admission_point))
+
+    return {
+        "schools": schools_rows,
+        "classes": classes_rows,
+        "offer_values_long": offer_rows,
+        "criteria_long": criteria_rows,
+        "assets_manifest": assets_rows,
     }
+
+
+def iter_snapshot_details(snapshot: JsonDict) -> Iterator[tuple[str, JsonDict]]:
+    yield from sorted(snapshot["school_details"].items(), key=lambda item: int(item[0]))
+
+
+def build_tables(snapshot: JsonDict) -> dict[str, pd.DataFrame]:
+    """Buduje robocze tabele z raw JSON bez ponownego pobierania danych."""
+    rows: dict[str, list[JsonDict]] = {name: [] for name in ROW_TABLE_NAMES}
+    for school_id, detail in iter_snapshot_details(snapshot):
+        for name, school_rows in school_table_rows(snapshot, school_id, detail).items():
+            rows[name].extend(school_rows)
+
+    tables = {name: pd.DataFrame(rows[name]) for name in ROW_TABLE_NAMES}
+    tables["download_manifest"] = manifest_dataframe(snapshot["manifest"])
     return tables
 
 
+def iter_table_batches(
+    snapshot: JsonDict,
+    school_details: Iterable[tuple[str, JsonDict]] | None = None,
+    batch_size: int = DEFAULT_BATCH_SCHOOLS,
+) -> Iterator[dict[str, pd.DataFrame]]:
+    """Zwraca tabele porcjami po ``batch_size`` szkół.
+
+    Przy ``school_details`` czytanych leniwie z dysku (``iter_raw_school_details``)
+    w pamięci jest naraz tylko jedna porcja szkół i jej wiersze.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size musi być dodatni.")
+    details = (
+        iter_snapshot_details(snapshot) if school_details is None else school_details
+    )
+    rows: dict[str, list[JsonDict]] = {name: [] for name in ROW_TABLE_NAMES}
+    schools_in_batch = 0
+    for school_id, detail in details:
+        for name, school_rows in school_table_rows(snapshot, school_id, detail).items():
+            rows[name].extend(school_rows)
+        schools_in_batch += 1
+        if schools_in_batch >= batch_size:
+            yield {name: pd.DataFrame(rows[name]) for name in ROW_TABLE_NAMES}
+            rows = {name: [] for name in ROW_TABLE_NAMES}
+            schools_in_batch = 0
+    if schools_in_batch:
+        yield {name: pd.DataFrame(rows[name]) for name in ROW_TABLE_NAMES}
+
+
 def manifest_dataframe(manifest: JsonDict) -> pd.DataFrame:
     rows = []
     for key, value in manifest.items():
@@ -1152,34 +1246,181 @@ def excel_safe_value(value: Any) -> Any:
     return value[:max_length] + EXCEL_TRUNCATION_SUFFIX
 
 
-def dataframe_for_output(df: pd.DataFrame, excel: bool = False) -> pd.DataFrame:
+def dataframe_for_output(
+    df: pd.DataFrame,
+    excel: bool = False,
+    json_columns: tuple[str, ...] | None = None,
+) -> pd.DataFrame:
+    """Przygotowuje tabelę do zapisu.
+
+    Gdy ``json_columns`` jest znane ze schematu tabeli, tylko te kolumny są
+    serializowane do JSON; bez schematu każda kolumna jest skanowana.
+    """
     output = df.copy()
     for column in output.columns:
-        if output[column].map(lambda value: isinstance(value, (dict, list))).any():
+        if json_columns is None:
+            has_json = (
+                output[column].map(lambda value: isinstance(value, (dict, list))).any()
+            )
+        else:
+            has_json = column in json_columns
+        if has_json:
             output[column] = output[column].map(compact_json_cell)
         if excel and output[column].dtype == "object":
             output[column] = output[column].map(excel_safe_value)
     return output
 
 
+def dataframe_for_parquet(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Ujednolica typy kolumn według schematu tabeli, bez ucinania wartości."""
+    output = dataframe_for_output(df, json_columns=TABLE_JSON_COLUMNS.get(name, ()))
+    numeric_columns = set(TABLE_NUMERIC_COLUMNS.get(name, ()))
+    bool_columns = set(TABLE_BOOL_COLUMNS.get(name, ()))
+    for column in output.columns:
+        if column in numeric_columns:
+            output[column] = pd.to_numeric(output[column], errors="coerce").astype(
+                "float64"
+            )
+        elif column in bool_columns:
+            output[column] = output[column].astype("boolean")
+        elif output[column].dtype == "object" or pd.api.types.is_string_dtype(
+            output[column]
+        ):
+            # Nullowalny ``string``: braki zostają brakami, a typ kolumny jest
+            # ten sam w każdej porcji zapisu.
+            output[column] = output[column].astype("string")
+    return output
+
+
 def write_tables(
     tables: dict[str, pd.DataFrame],
-    output_xlsx: Path,
+    output_xlsx: Path | None,
     csv_dir: Path | None = None,
+    parquet_dir: Path | None = None,
 ) -> None:
-    output_xlsx.parent.mkdir(parents=True, exist_ok=True)
-    with pd.ExcelWriter(output_xlsx, engine="openpyxl") as writer:
-        for sheet_name, df in tables.items():
-            dataframe_for_output(df, excel=True).to_excel(
-                writer, sheet_name=sheet_name[:31], index=False
-            )
+    if output_xlsx is not None:
+        output_xlsx.parent.mkdir(parents=True, exist_ok=True)
+        with pd.ExcelWriter(output_xlsx, engine="openpyxl") as writer:
+            for sheet_name, df in tables.items():
+                dataframe_for_output(
+                    df, excel=True, json_columns=TABLE_JSON_COLUMNS.get(sheet_name, ())
+                ).to_excel(writer, sheet_name=sheet_name[:31], index=False)
 
     if csv_dir is not None:
         csv_dir.mkdir(parents=True, exist_ok=True)
         for name, df in tables.items():
-            dataframe_for_output(df).to_csv(
-                csv_dir / f"{name}.csv", index=False, encoding="utf-8-sig"
+            dataframe_for_output(
+                df, json_columns=TABLE_JSON_COLUMNS.get(name, ())
+            ).to_csv(csv_dir / f"{name}.csv", index=False, encoding="utf-8-sig")
+
+    if parquet_dir is not None:
+        write_parquet_tables(tables, parquet_dir)
+
+
+def write_parquet_tables(tables: dict[str, pd.DataFrame], parquet_dir: Path) -> None:
+    """Zapisuje tabele jako Parquet; zagnieżdżony JSON zostaje pełnym tekstem."""
+    parquet_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in tables.items():
+        dataframe_for_parquet(name, df).to_parquet(
+            parquet_dir / f"{name}.parquet", index=False
+        )
+
+
+def parquet_dir_for_xlsx(output_xlsx: Path) -> Path:
+    return output_xlsx.with_suffix("")
+
+
+def has_parquet_tables(parquet_dir: Path) -> bool:
+    return parquet_dir.is_dir() and all(
+        (parquet_dir / f"{name}.parquet").exists()
+        for name in ("schools", "classes", "criteria_long")
+    )
+
+
+def read_parquet_tables(parquet_dir: Path) -> dict[str, pd.DataFrame]:
+    tables = {}
+    for name in PZO_TABLE_NAMES:
+        path = parquet_dir / f"{name}.parquet"
+        if path.exists():
+            tables[name] = pd.read_parquet(path)
+    return tables
+
+
+class ChunkedTableWriter:
+    """Dopisuje porcje tabel do plików Parquet (grupy wierszy) i/lub CSV."""
+
+    def __init__(
+        self, parquet_dir: Path | None = None, csv_dir: Path | None = None
+    ) -> None:
+        self.parquet_dir = parquet_dir
+        self.csv_dir = csv_dir
+        self.row_counts: dict[str, int] = {}
+        self._parquet_writers: dict[str, Any] = {}
+        for directory in (parquet_dir, csv_dir):
+            if directory is not None:
+                directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, name: str, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        if self.parquet_dir is not None:
+            self._write_parquet(name, dataframe_for_parquet(name, df))
+        if self.csv_dir is not None:
+            path = self.csv_dir / f"{name}.csv"
+            first_chunk = name not in self.row_counts
+            dataframe_for_output(
+                df, json_columns=TABLE_JSON_COLUMNS.get(name, ())
+            ).to_csv(
+                path,
+                index=False,
+                mode="w" if first_chunk else "a",
+                header=first_chunk,
+                encoding="utf-8-sig" if first_chunk else "utf-8",
+            )
+        self.row_counts[name] = self.row_counts.get(name, 0) + len(df)
+
+    def _write_parquet(self, name: str, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        assert self.parquet_dir is not None
+        writer = self._parquet_writers.get(name)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(
+                self.parquet_dir / f"{name}.parquet", table.schema
             )
+            self._parquet_writers[name] = writer
+        else:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+
+    def close(self) -> None:
+        for writer in self._parquet_writers.values():
+            writer.close()
+        self._parquet_writers.clear()
+
+    def __enter__(self) -> ChunkedTableWriter:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def write_tables_streaming(
+    snapshot: JsonDict,
+    school_details: Iterable[tuple[str, JsonDict]] | None = None,
+    parquet_dir: Path | None = None,
+    csv_dir: Path | None = None,
+    batch_size: int = DEFAULT_BATCH_SCHOOLS,
+) -> dict[str, int]:
+    """Buduje i zapisuje tabele porcjami; zwraca liczbę wierszy w tabelach."""
+    with ChunkedTableWriter(parquet_dir, csv_dir) as writer:
+        for batch in iter_table_batches(snapshot, school_details, batch_size):
+            for name, df in batch.items():
+                writer.write(name, df)
+        writer.write("download_manifest", manifest_dataframe(snapshot["manifest"]))
+        return dict(writer.row_counts)
 
 
 def parse_args() -> argparse.Namespace:
@@ -1193,6 +1434,25 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--raw-dir", type=Path)
     parser.add_argument("--output-xlsx", type=Path)
     parser.add_argument("--csv-dir", type=Path)
+    parser.add_argument(
+        "--parquet-dir",
+        type=Path,
+        help="Katalog na tabele Parquet (domyślnie obok pliku Excel).",
+    )
+    parser.add_argument(
+        "--no-excel",
+        action="store_true",
+        help="Pomiń zapis Excela; Parquet zawiera pełne, nieucięte wartości.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Buduj tabele porcjami szkół czytanych po kolei z katalogu raw "
+            "i zapisuj je przyrostowo do Parquet/CSV (bez Excela)."
+        ),
+    )
+    parser.add_argument("--batch-schools", type=int, default=DEFAULT_BATCH_SCHOOLS)
     parser.add_argument(
         "--school-type-id", type=int, action="append", dest="school_type_ids"
     )
@@ -1212,10 +1472,11 @@ def main() -> None:
     args = parse_args()
     raw_dir = args.raw_dir or default_raw_dir(args.year, args.school_year)
     output_xlsx = args.output_xlsx or default_output_xlsx(args.school_year)
+    parquet_dir = args.parquet_dir or parquet_dir_for_xlsx(output_xlsx)
 
+    snapshot: JsonDict | None = None
     if args.from_raw:
         logger.info("Odtwarzanie snapshotu z raw JSON: %s", raw_dir)
-        snapshot = load_snapshot_files(raw_dir)
     else:
         client = PzoOmikronClient(
             base_url=args.base_url,
@@ -1231,8 +1492,28 @@ def main() -> None:
             delay=args.delay,
         )
         write_snapshot_files(snapshot, raw_dir)
-    tables = build_tables(snapshot)
-    write_tables(tables, output_xlsx, args.csv_dir)
+    write_excel = not (args.no_excel or args.stream)
+    if args.stream:
+        # Także po pobraniu zwalniamy pełny snapshot i czytamy szkoły z raw.
+        snapshot = load_snapshot_index(raw_dir)
+        row_counts = write_tables_streaming(
+            snapshot,
+            school_details=iter_raw_school_details(raw_dir),
+            parquet_dir=parquet_dir,
+            csv_dir=args.csv_dir,
+            batch_size=args.batch_schools,
+        )
+        logger.info("Zapisano tabele porcjami: %s", row_counts)
+    else:
+        if snapshot is None:
+            snapshot = load_snapshot_files(raw_dir)
+        tables = build_tables(snapshot)
+        write_tables(
+            tables,
+            output_xlsx if write_excel else None,
+            args.csv_dir,
+            parquet_dir=parquet_dir,
+        )
 
     manifest = snapshot["manifest"]
     logger.info(
@@ -1242,7 +1523,9 @@ def main() -> None:
         manifest["total_seats"],
     )
     logger.info("Raw JSON: %s", raw_dir)
-    logger.info("Excel: %s", output_xlsx)
+    if write_excel:
+        logger.info("Excel: %s", output_xlsx)
+    logger.info("Parquet: %s", parquet_dir)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,30 @@
+import argparse
 import asyncio
+import gzip
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+
 import pandas as pd
 from bs4 import BeautifulSoup
 
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.data_processing.html_extract import (  # noqa: E402
+    resolve_charref,
+    resolve_entityref,
+)
+
 GROUP_LIST_TITLE = "Lista grup rekrutacyjnych/oddziałów"
 INTERNAL_ERROR_TITLE = "Wewnętrzny błąd aplikacji"
 COLUMNS = [
@@ -15,10 +38,359 @@ COLUMNS = [
     "UrlGrupy",
 ]
 
-SEM = asyncio.Semaphore(32)  # max równoczesnych żądań
+SCHOOL_URL_TEMPLATE = (
+    "https://warszawa.edu.com.pl/kandydat/app/offer_school_details.xhtml"
+    "?schoolId={school_id}"
+)
+DEFAULT_CONCURRENCY = 32  # max równoczesnych żądań
+DEFAULT_TIMEOUT = 60  # sekundy na całe żądanie
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 1.0  # sekundy, podwajane przy każdej próbie
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Tryb adaptacyjny: co który identyfikator sondować i ile kolejnych pudeł
+# kończy poszerzanie zakresu.
+DEFAULT_PROBE_STEP = 8
+DEFAULT_MISS_LIMIT = 8
+DEFAULT_KNOWN_IDS_FILE = Path("results/vulcan_known_school_ids.json")
+DEFAULT_RAW_DIR = Path("data/raw/2025/vulcan_pages")
+RAW_SCHEMA_VERSION = "1.0"
+
+
+# Zachowanie drzewa BeautifulSoup z backendem html.parser, które odtwarza
+# szybki parser strumieniowy.
+VOID_ELEMENTS = frozenset(
+    {
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+        "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+        "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+    }
+)  # fmt: skip
+STRING_CONTAINER_TAGS = frozenset({"rt", "rp", "style", "script", "template"})
+PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "textarea"})
+ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+GROUP_URL_PREFIX = "https://warszawa.edu.com.pl"
+
+
+class UnsupportedPageStructure(Exception):
+    """Strona wymaga pełnego drzewa BeautifulSoup."""
+
+
+class _Frame:
+    __slots__ = ("name", "children", "only_string", "string")
+
+    def __init__(self, name):
+        self.name = name
+        self.children = 0
+        self.only_string = None
+        self.string = None
+
+
+class _Cell:
+    __slots__ = ("frame", "strings", "anchor", "anchor_strings", "href")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.strings = []
+        self.anchor = None
+        self.anchor_strings = []
+        self.href = None
+
+
+class _SchoolPageParser(HTMLParser):
+    """Jednoprzebiegowy odpowiednik ``parse_school_html_soup``.
+
+    Odtwarza stos znaczników BeautifulSoup (zamykanie do najbliższego
+    pasującego znacznika, elementy puste, łączenie sąsiednich tekstów,
+    zwijanie białych znaków), ale zamiast drzewa liczy tylko to, czego
+    potrzebuje parser oferty: ``.string`` nagłówków h2/h3, rodzeństwo
+    nagłówka "Oferta szkoły" i komórki pierwszego tbody tabeli grup.
+    Nietypowa struktura (zagnieżdżone tabele, wiersze, komórki, skrypty
+    w interesujących miejscach) zgłasza ``UnsupportedPageStructure``.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = [_Frame("[document]")]
+        self.pending = []
+        self.closed_void = []
+        self.container_depth = 0
+        self.preserve_depth = 0
+        self.heading_depth = 0
+        self.error_page = False
+        self.school_lines = None
+        self.scan_parent = None
+        self.scan_element = None
+        self.scan_done = False
+        self.group_header_found = False
+        self.table = None
+        self.table_done = False
+        self.tbody = None
+        self.tbody_done = False
+        self.tbody_found = False
+        self.row = None
+        self.row_frame = None
+        self.cell = None
+        self.rows = []
+
+    # --- zdarzenia tokenizera -------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        self._open(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self._close_top()
+            self.closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self._open(tag, attrs)
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void:
+            self.closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def handle_entityref(self, name):
+        self.pending.append(resolve_entityref(name))
+
+    def handle_charref(self, name):
+        self.pending.append(resolve_charref(name))
+
+    def handle_comment(self, data):
+        self._flush()
+        self._add_string(data, in_text=False)
+
+    def handle_decl(self, decl):
+        self._flush()
+        self._add_string(decl[len("DOCTYPE ") :], in_text=False)
+
+    def handle_pi(self, data):
+        self._flush()
+        self._add_string(data, in_text=False)
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._add_string(data[len("CDATA[") :], in_text=True)
+        else:
+            self._add_string(data, in_text=False)
+
+    def close(self):
+        super().close()
+        self._flush()
+        while len(self.stack) > 1:
+            self._close_top()
+
+    # --- model drzewa ---------------------------------------------------
+
+    def _in_region(self):
+        return (
+            self.heading_depth
+            or self.scan_parent is not None
+            and not self.scan_done
+            or self.table is not None
+            and not self.table_done
+        )
+
+    def _flush(self):
+        if self.pending:
+            text = "".join(self.pending)
+            self.pending = []
+            self._add_string(text, in_text=True)
+
+    def _add_string(self, text, in_text):
+        if not self.preserve_depth and all(char in ASCII_SPACES for char in text):
+            text = "\n" if "\n" in text else " "
+        parent = self.stack[-1]
+        parent.children += 1
+        parent.only_string = text
+        if self.container_depth and self._in_region():
+            raise UnsupportedPageStructure("tekst skryptu w analizowanym fragmencie")
+        if parent is self.scan_parent and not self.scan_done:
+            self._add_school_line(text)
+        if in_text and self.cell is not None:
+            self.cell.strings.append(text)
+            if self.cell.anchor is not None and self.cell.anchor in self.stack:
+                self.cell.anchor_strings.append(text)
+
+    def _add_school_line(self, line):
+        if line and line.strip():
+            self.school_lines.append(line.strip())
+            if len(self.school_lines) >= 2:
+                self.scan_done = True
+
+    def _open(self, name, attrs):
+        parent = self.stack[-1]
+        parent.children += 1
+        parent.only_string = None
+        frame = _Frame(name)
+        if parent is self.scan_parent and not self.scan_done:
+            self.scan_element = frame
+        if name in STRING_CONTAINER_TAGS:
+            if self._in_region():
+                raise UnsupportedPageStructure(f"<{name}> w analizowanym fragmencie")
+            self.container_depth += 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+        if name in ("h2", "h3"):
+            if self.heading_depth or self.container_depth:
+                raise UnsupportedPageStructure("zagnieżdżone nagłówki")
+            self.heading_depth += 1
+        elif name == "table":
+            if self.table is not None and not self.table_done:
+                raise UnsupportedPageStructure("zagnieżdżona tabela")
+            if self.group_header_found and self.table is None:
+                if self.container_depth:
+                    raise UnsupportedPageStructure("tabela w szablonie")
+                self.table = frame
+        elif name == "tbody" and self.table is not None and not self.table_done:
+            if self.tbody is not None and not self.tbody_done:
+                raise UnsupportedPageStructure("zagnieżdżone tbody")
+            if not self.tbody_found:
+                self.tbody = frame
+                self.tbody_found = True
+        elif name == "tr" and self._tbody_open():
+            if self.row is not None:
+                raise UnsupportedPageStructure("zagnieżdżony wiersz")
+            self.row = []
+            self.row_frame = frame
+        elif name == "td" and self.row is not None:
+            if self.cell is not None:
+                raise UnsupportedPageStructure("zagnieżdżona komórka")
+            self.cell = _Cell(frame)
+            self.row.append(self.cell)
+        elif name == "a" and self.cell is not None and len(self.row) == 1:
+            if self.cell.anchor is None:
+                self.cell.anchor = frame
+                href = None
+                for key, value in attrs:
+                    if key == "href":
+                        href = "" if value is None else value
+                self.cell.href = href
+        self.stack.append(frame)
+
+    def _tbody_open(self):
+        return self.tbody is not None and not self.tbody_done
+
+    def _pop_to(self, name):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].name == name:
+                while len(self.stack) > index:
+                    self._close_top()
+                return
+
+    def _close_top(self):
+        frame = self.stack.pop()
+        frame.string = frame.only_string if frame.children == 1 else None
+        parent = self.stack[-1]
+        if parent.children and parent.only_string is None:
+            parent.only_string = frame.string
+        name = frame.name
+        if name in STRING_CONTAINER_TAGS:
+            self.container_depth -= 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+
+        if frame is self.scan_element:
+            self.scan_element = None
+            if not self.scan_done:
+                self._add_school_line(frame.string)
+                if name == "h3":
+                    self.scan_done = True
+        elif frame is self.scan_parent:
+            self.scan_done = True
+
+        if name in ("h2", "h3"):
+            self.heading_depth -= 1
+            if name == "h2":
+                self._close_h2(frame, parent)
+            elif frame.string == GROUP_LIST_TITLE:
+                self.group_header_found = True
+        elif frame is self.table:
+            self.table_done = True
+        elif frame is self.tbody:
+            self.tbody_done = True
+        elif frame is self.row_frame:
+            self._finish_row()
+        elif self.cell is not None and frame is self.cell.frame:
+            self.cell = None
+
+    def _close_h2(self, frame, parent):
+        if frame.string == INTERNAL_ERROR_TITLE:
+            self.error_page = True
+        if (
+            self.school_lines is None
+            and frame.string
+            and "Oferta szkoły" in frame.string
+        ):
+            self.school_lines = []
+            self.scan_parent = parent
+
+    def _finish_row(self):
+        cells = self.row
+        self.row = None
+        self.row_frame = None
+        self.cell = None
+        if len(cells) < 4:
+            return
+        first = cells[0]
+        if first.anchor is not None and first.href is None:
+            raise UnsupportedPageStructure("link oddziału bez href")
+        self.rows.append(
+            (
+                "".join(text.strip() for text in first.anchor_strings),
+                first.href or "",
+                " ".join(cells[1].strings).strip(),
+                " ".join(cells[2].strings).strip(),
+                "".join(text.strip() for text in cells[3].strings),
+            )
+        )
+
+
+def parse_school_html_fast(html, school_id):
+    """Szybka ścieżka bez drzewa BeautifulSoup; ``None`` gdy struktura nietypowa."""
+    parser = _SchoolPageParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except UnsupportedPageStructure:
+        return None
+    if parser.error_page or not parser.tbody_found:
+        return []
+    lines = parser.school_lines or []
+    school_name, school_address = (lines[0], lines[1]) if len(lines) >= 2 else ("", "")
+    results = []
+    for name, href, subjects, languages, places in parser.rows:
+        results.append(
+            [
+                school_id,
+                school_name,
+                school_address,
+                name,
+                subjects,
+                languages,
+                places,
+                f"{GROUP_URL_PREFIX}{href}" if href else "",
+            ]
+        )
+    return results
 
 
 def parse_school_html(html, school_id):
+    """Parsuje stronę oferty szkoły; przy nietypowej strukturze używa BeautifulSoup."""
+    results = parse_school_html_fast(html, school_id)
+    if results is None:
+        return parse_school_html_soup(html, school_id)
+    return results
+
+
+def parse_school_html_soup(html, school_id):
     soup = BeautifulSoup(html, "html.parser")
     error_h2 = soup.find("h2", string=INTERNAL_ERROR_TITLE)
     if error_h2:
@@ -57,7 +429,7 @@ def parse_school_html(html, school_id):
         oddzial_nazwa = a_tag.get_text(strip=True) if a_tag else ""
         url_grupy = a_tag["href"] if a_tag else ""
         if url_grupy:
-            url_grupy = f"https://warszawa.edu.com.pl{url_grupy}"
+            url_grupy = f"{GROUP_URL_PREFIX}{url_grupy}"
         przedmioty_rozszerzone = cells[1].get_text(separator=" ").strip()
         jezyki_obce = cells[2].get_text(separator=" ").strip()
         liczba_miejsc = cells[3].get_text(strip=True)
@@ -76,28 +448,202 @@ def parse_school_html(html, school_id):
     return results
 
 
-async def fetch_school(session, school_id):
-    url = f"https://warszawa.edu.com.pl/kandydat/app/offer_school_details.xhtml?schoolId={school_id}"
-    async with SEM, session.get(url) as r:
-        if r.status != 200:
-            return []
-        html = await r.text()
-        return parse_school_html(html, school_id)
+async def fetch_school_html(
+    session,
+    school_id,
+    semaphore,
+    retries=DEFAULT_RETRIES,
+    retry_backoff=RETRY_BACKOFF,
+    url_template=SCHOOL_URL_TEMPLATE,
+):
+    """Pobiera stronę szkoły; zwraca (status HTTP, HTML) albo (status, None).
+
+    Semafor obejmuje tylko pobranie, więc parsowanie nie blokuje kolejnych
+    żądań. Błędy sieci, timeouty i statusy z RETRY_STATUSES są ponawiane.
+    """
+    import aiohttp
+
+    url = url_template.format(school_id=school_id)
+    status = None
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore, session.get(url) as r:
+                status = r.status
+                if status == 200:
+                    return status, await r.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = None
+        if status is not None and status not in RETRY_STATUSES:
+            break
+        if attempt < retries:
+            await asyncio.sleep(retry_backoff * 2**attempt)
+    return status, None
+
 
+class VulcanRawStore:
+    """Surowe strony szkół (``pages/<id>.html.gz``) i manifest pobrań.
 
-async def download_all_async(start_id=1, end_id=400, verbose=True):
+    Manifest zapisuje dla każdego schoolId czas pobrania, status HTTP i skrót
+    treści, więc zmiany w ``parse_school_html`` można sprawdzić bez sieci.
+    """
+
+    def __init__(self, raw_dir):
+        self.raw_dir = Path(raw_dir)
+        self.manifest_path = self.raw_dir / "manifest.json"
+        self.pages = {}
+        if self.manifest_path.exists():
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            self.pages = manifest.get("pages", {})
+        self._lock = threading.Lock()
+
+    def page_path(self, school_id):
+        return self.raw_dir / "pages" / f"{school_id}.html.gz"
+
+    def save(self, school_id, status, html, url=""):
+        entry = {
+            "status": status,
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "url": url,
+        }
+        if html is not None:
+            data = html.encode("utf-8")
+            path = self.page_path(school_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(gzip.compress(data, mtime=0))
+            entry["file"] = path.relative_to(self.raw_dir).as_posix()
+            entry["sha256"] = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self.pages[str(school_id)] = entry
+
+    def write_manifest(self):
+        with self._lock:
+            pages = dict(sorted(self.pages.items(), key=lambda item: int(item[0])))
+        self.raw_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "schema_version": RAW_SCHEMA_VERSION,
+            "source": "vulcan_offer_school_details",
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "pages": pages,
+        }
+        self.manifest_path.write_text(
+            json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+
+    def page_ids(self):
+        """Identyfikatory szkół z zapisaną stroną, rosnąco."""
+        return sorted(
+            int(school_id)
+            for school_id, entry in self.pages.items()
+            if entry.get("file") and (self.raw_dir / entry["file"]).exists()
+        )
+
+    def read_page(self, school_id):
+        return _read_page_file(self.page_path(school_id))
+
+
+def _read_page_file(path):
+    return gzip.decompress(Path(path).read_bytes()).decode("utf-8")
+
+
+async def fetch_school(
+    session, school_id, semaphore, executor=None, raw_store=None, **fetch_kwargs
+):
+    status, html = await fetch_school_html(
+        session, school_id, semaphore, **fetch_kwargs
+    )
+    loop = asyncio.get_running_loop()
+    if raw_store is not None:
+        url_template = fetch_kwargs.get("url_template", SCHOOL_URL_TEMPLATE)
+        await loop.run_in_executor(
+            None,
+            raw_store.save,
+            school_id,
+            status,
+            html,
+            url_template.format(school_id=school_id),
+        )
+    if html is None:
+        return []
+    return await loop.run_in_executor(executor, parse_school_html, html, school_id)
+
+
+class SchoolCrawler:
+    """Pobiera i parsuje strony szkół we wspólnej sesji; liczy wykonane żądania."""
+
+    def __init__(self, session, semaphore, executor, fetch_kwargs, raw_store=None):
+        self.session = session
+        self.semaphore = semaphore
+        self.executor = executor
+        self.fetch_kwargs = fetch_kwargs
+        self.raw_store = raw_store
+        self.requests = 0
+
+    async def _fetch(self, school_id):
+        rows = await fetch_school(
+            self.session,
+            school_id,
+            self.semaphore,
+            self.executor,
+            raw_store=self.raw_store,
+            **self.fetch_kwargs,
+        )
+        return school_id, rows
+
+    async def fetch_many(self, school_ids, verbose=False):
+        """Zwraca {schoolId: wiersze}; pusta lista oznacza brak oferty."""
+        school_ids = list(school_ids)
+        self.requests += len(school_ids)
+        results = {}
+        tasks = [self._fetch(school_id) for school_id in school_ids]
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            school_id, rows = await task
+            results[school_id] = rows
+            if verbose and done % 10 == 0:
+                print(f"Pobrano {done}/{len(tasks)} szkół")
+        return results
+
+
+@asynccontextmanager
+async def open_crawler(
+    concurrency=DEFAULT_CONCURRENCY,
+    timeout=DEFAULT_TIMEOUT,
+    retries=DEFAULT_RETRIES,
+    retry_backoff=RETRY_BACKOFF,
+    parse_workers=None,
+    url_template=SCHOOL_URL_TEMPLATE,
+    raw_dir=None,
+):
+    """Sesja aiohttp z limitem połączeń i pula procesów do parsowania HTML.
+
+    Parsowanie odbywa się w ProcessPoolExecutor (``parse_workers`` procesów,
+    domyślnie liczba rdzeni), równolegle z kolejnymi pobraniami. Z ``raw_dir``
+    każda pobrana strona trafia też do ``VulcanRawStore``.
+    """
     import aiohttp
 
-    async with aiohttp.ClientSession(
-        timeout=aiohttp.ClientTimeout(total=60)
-    ) as session:
-        tasks = [fetch_school(session, i) for i in range(start_id, end_id + 1)]
-        all_rows = []
-        for i, task in enumerate(asyncio.as_completed(tasks), start=start_id):
-            rows = await task
-            if verbose and (i - start_id) % 10 == 0:
-                print(f"Pobrano schoolId={i}")
-            all_rows.extend(rows)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    fetch_kwargs = {
+        "retries": retries,
+        "retry_backoff": retry_backoff,
+        "url_template": url_template,
+    }
+    raw_store = VulcanRawStore(raw_dir) if raw_dir is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as session:
+                yield SchoolCrawler(
+                    session, semaphore, executor, fetch_kwargs, raw_store
+                )
+    finally:
+        if raw_store is not None:
+            raw_store.write_manifest()
+
+
+def rows_to_dataframe(all_rows):
     df = pd.DataFrame(all_rows, columns=COLUMNS)
     # Sortowanie po IdSzkoly (jako liczba) i OddzialNazwa (alfabetycznie)
     df["IdSzkoly"] = pd.to_numeric(df["IdSzkoly"], errors="coerce")
@@ -105,11 +651,269 @@ async def download_all_async(start_id=1, end_id=400, verbose=True):
     return df
 
 
+def _parse_raw_page(page_path, school_id):
+    return parse_school_html(_read_page_file(page_path), school_id)
+
+
+def rebuild_from_raw(raw_dir=DEFAULT_RAW_DIR, parse_workers=None):
+    """Odtwarza DataFrame oferty z zapisanych stron, parsując je równolegle."""
+    store = VulcanRawStore(raw_dir)
+    school_ids = store.page_ids()
+    if not school_ids:
+        raise FileNotFoundError(f"Brak zapisanych stron Vulcan w {raw_dir}")
+    with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+        parsed = executor.map(
+            _parse_raw_page,
+            [store.page_path(school_id) for school_id in school_ids],
+            school_ids,
+            chunksize=16,
+        )
+        all_rows = [row for rows in parsed for row in rows]
+    return rows_to_dataframe(all_rows)
+
+
+def benchmark_parsers(pages, repeat=5):
+    """Porównuje czas parsowania stron ścieżką szybką i BeautifulSoup.
+
+    ``pages`` to słownik ``{id_szkoły: html}``. Zwraca średnie czasy na
+    stronę (w sekundach), przyspieszenie, liczbę stron obsłużonych przez
+    fallback oraz identyfikatory stron, dla których wyniki się różnią.
+    """
+    fast_seconds = soup_seconds = 0.0
+    fallbacks = []
+    mismatches = []
+    for school_id, html in pages.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fast = parse_school_html_fast(html, school_id)
+        fast_seconds += time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(repeat):
+            soup = parse_school_html_soup(html, school_id)
+        soup_seconds += time.perf_counter() - started
+        if fast is None:
+            fallbacks.append(school_id)
+        elif fast != soup:
+            mismatches.append(school_id)
+    runs = max(len(pages) * repeat, 1)
+    return {
+        "pages": len(pages),
+        "fast_per_page": fast_seconds / runs,
+        "soup_per_page": soup_seconds / runs,
+        "speedup": soup_seconds / fast_seconds if fast_seconds else float("nan"),
+        "fallbacks": fallbacks,
+        "mismatches": mismatches,
+    }
+
+
+async def download_all_async(start_id=1, end_id=400, verbose=True, **crawl_options):
+    """Pobiera oferty szkół start_id..end_id.
+
+    ``crawl_options`` trafiają do ``open_crawler`` (concurrency, timeout,
+    retries, retry_backoff, parse_workers, url_template, raw_dir).
+    """
+    async with open_crawler(**crawl_options) as crawler:
+        results = await crawler.fetch_many(range(start_id, end_id + 1), verbose)
+    return rows_to_dataframe(row for rows in results.values() for row in rows)
+
+
+async def discover_school_pages(
+    crawler,
+    start_id=1,
+    known_ids=(),
+    probe_step=DEFAULT_PROBE_STEP,
+    miss_limit=DEFAULT_MISS_LIMIT,
+    max_id=None,
+    verbose=False,
+):
+    """Adaptacyjnie wyszukuje identyfikatory szkół z ofertą.
+
+    1. Najpierw pobiera identyfikatory znane z poprzedniego przebiegu.
+    2. Sonduje co ``probe_step``-ty identyfikator w górę, aż ``miss_limit``
+       kolejnych sond powyżej najwyższego trafienia nic nie zwróci.
+    3. Wokół każdego trafienia dociąga sąsiadów, aż po obu stronach jest
+       ``miss_limit`` kolejnych pudeł.
+
+    Zwraca {schoolId: wiersze} dla wszystkich odpytanych identyfikatorów.
+    """
+    results = {}
+
+    def in_range(school_id):
+        return school_id >= start_id and (max_id is None or school_id <= max_id)
+
+    def hits():
+        return [school_id for school_id, rows in results.items() if rows]
+
+    async def fetch(school_ids):
+        pending = sorted({i for i in school_ids if in_range(i) and i not in results})
+        if pending:
+            results.update(await crawler.fetch_many(pending, verbose))
+
+    await fetch(int(school_id) for school_id in known_ids)
+
+    position = start_id
+    while max_id is None or position <= max_id:
+        probes = [position + k * probe_step for k in range(miss_limit)]
+        await fetch(probes)
+        position = probes[-1] + probe_step
+        top = max(hits(), default=start_id - 1)
+        trailing_misses = sum(
+            1 for probe in range(start_id, position, probe_step) if probe > top
+        )
+        if trailing_misses >= miss_limit:
+            break
+
+    while True:
+        window = {
+            neighbour
+            for school_id in hits()
+            for neighbour in range(school_id - miss_limit, school_id + miss_limit + 1)
+        }
+        targets = {i for i in window if in_range(i) and i not in results}
+        if not targets:
+            break
+        await fetch(targets)
+    return results
+
+
+async def discover_all_async(
+    start_id=1,
+    known_ids=(),
+    probe_step=DEFAULT_PROBE_STEP,
+    miss_limit=DEFAULT_MISS_LIMIT,
+    max_id=None,
+    verbose=True,
+    **crawl_options,
+):
+    """Jak ``download_all_async``, ale bez sztywnego zakresu identyfikatorów.
+
+    Zwraca (DataFrame, statystyki) - statystyki zawierają liczbę żądań
+    i listę identyfikatorów z ofertą do zapamiętania na kolejny przebieg.
+    """
+    async with open_crawler(**crawl_options) as crawler:
+        results = await discover_school_pages(
+            crawler,
+            start_id=start_id,
+            known_ids=known_ids,
+            probe_step=probe_step,
+            miss_limit=miss_limit,
+            max_id=max_id,
+            verbose=verbose,
+        )
+    valid_ids = sorted(school_id for school_id, rows in results.items() if rows)
+    stats = {
+        "requests": crawler.requests,
+        "valid_ids": valid_ids,
+        "max_probed_id": max(results, default=None),
+    }
+    if verbose:
+        print(
+            f"Odpytano {stats['requests']} identyfikatorów, "
+            f"szkoły z ofertą: {len(valid_ids)}"
+        )
+    df = rows_to_dataframe(row for rows in results.values() for row in rows)
+    return df, stats
+
+
+def load_known_ids(path):
+    path = Path(path)
+    if not path.exists():
+        return []
+    return [int(school_id) for school_id in json.loads(path.read_text("utf-8"))]
+
+
+def save_known_ids(path, school_ids):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(sorted(school_ids)), encoding="utf-8")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pobiera ofertę szkół z Vulcan.")
+    parser.add_argument("--start-id", type=int, default=1)
+    parser.add_argument("--end-id", type=int, default=400)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Wyszukuj identyfikatory adaptacyjnie zamiast pełnego zakresu.",
+    )
+    parser.add_argument("--known-ids", type=Path, default=DEFAULT_KNOWN_IDS_FILE)
+    parser.add_argument("--probe-step", type=int, default=DEFAULT_PROBE_STEP)
+    parser.add_argument("--miss-limit", type=int, default=DEFAULT_MISS_LIMIT)
+    parser.add_argument("--max-id", type=int)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--parse-workers", type=int)
+    parser.add_argument(
+        "--raw-dir",
+        type=Path,
+        default=DEFAULT_RAW_DIR,
+        help="Katalog na skompresowane strony szkół i manifest pobrań.",
+    )
+    parser.add_argument(
+        "--from-raw",
+        action="store_true",
+        help="Nie pobieraj stron; odtwórz ofertę z --raw-dir.",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Porównaj szybki parser z BeautifulSoup na stronach z --raw-dir.",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("results/szkoly_vulcan_async.xlsx")
+    )
+    return parser.parse_args()
+
+
 def main():
-    df = asyncio.run(download_all_async(1, 400, verbose=True))
+    args = parse_args()
+    crawl_options = {
+        "concurrency": args.concurrency,
+        "timeout": args.timeout,
+        "retries": args.retries,
+        "parse_workers": args.parse_workers,
+        "raw_dir": args.raw_dir,
+    }
+    if args.benchmark:
+        store = VulcanRawStore(args.raw_dir)
+        pages = {
+            school_id: store.read_page(school_id) for school_id in store.page_ids()
+        }
+        report = benchmark_parsers(pages)
+        print(
+            f"Stron: {report['pages']}, szybki parser: "
+            f"{report['fast_per_page'] * 1000:.2f} ms/stronę, BeautifulSoup: "
+            f"{report['soup_per_page'] * 1000:.2f} ms/stronę, "
+            f"przyspieszenie x{report['speedup']:.1f}"
+        )
+        print(
+            f"Fallback: {len(report['fallbacks'])}, "
+            f"różnice wyników: {report['mismatches']}"
+        )
+        return
+    if args.from_raw:
+        df = rebuild_from_raw(args.raw_dir, parse_workers=args.parse_workers)
+    elif args.adaptive:
+        df, stats = asyncio.run(
+            discover_all_async(
+                args.start_id,
+                known_ids=load_known_ids(args.known_ids),
+                probe_step=args.probe_step,
+                miss_limit=args.miss_limit,
+                max_id=args.max_id,
+                **crawl_options,
+            )
+        )
+        save_known_ids(args.known_ids, stats["valid_ids"])
+    else:
+        df = asyncio.run(
+            download_all_async(args.start_id, args.end_id, **crawl_options)
+        )
     print(f"Łączna liczba wierszy = {len(df)}")
-    df.to_excel("results/szkoly_vulcan_async.xlsx", index=False)
-    print("Zapisano do szkoly_vulcan_async.xlsx")
+    df.to_excel(args.output, index=False)
+    print(f"Zapisano do {args.output}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,275 @@
+"""Szybka ekstrakcja tekstu i obrazków z fragmentów HTML.
+
+Opisy szkół, klas i wartości oferty PZO to krótkie fragmenty HTML, z których
+potrzebujemy tylko tekstu i listy ``<img src>``. Zamiast budować drzewo
+BeautifulSoup dla każdego fragmentu, parser strumieniowy przechodzi po tokenach
+``html.parser.HTMLParser`` (tego samego tokenizera, którego używa BeautifulSoup
+z backendem ``html.parser``), więc wynik jest zgodny z
+``BeautifulSoup(value, "html.parser").get_text(" ", strip=True)``.
+Wyniki są zapamiętywane po skrócie treści, bo te same opisy powtarzają się
+w wielu wierszach tabel.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import html as html_lib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from html.entities import html5 as HTML5_ENTITIES
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+# Tekst w tych elementach BeautifulSoup trzyma jako Script/Stylesheet/
+# TemplateString i pomija go w get_text().
+SKIPPED_TEXT_TAGS = frozenset({"script", "style", "template"})
+CACHE_MAX_ENTRIES = 4096
+
+
+@dataclass(frozen=True)
+class HtmlExtract:
+    """Tekst i źródła obrazków wyciągnięte z jednego fragmentu HTML."""
+
+    text: str
+    image_sources: tuple[str, ...]
+
+
+NUMERIC_REFERENCE = re.compile(r"([xX][0-9a-fA-F]+|[0-9]+)(.*)", re.S)
+
+
+def resolve_entityref(name: str) -> str:
+    """Rozwija ``&name;`` tak jak BeautifulSoup (nieznane zostają jako ``&name``)."""
+    return HTML5_ENTITIES.get(f"{name};", f"&{name}")
+
+
+def resolve_charref(name: str) -> str:
+    """Rozwija ``&#...;`` tak jak BeautifulSoup, z doklejeniem nadmiarowych znaków."""
+    match = NUMERIC_REFERENCE.match(name)
+    if match is None:
+        return f"&#{name}"
+    reference, extra = match.groups()
+    return html_lib.unescape(f"&#{reference};") + extra
+
+
+class _TextAndImagesParser(HTMLParser):
+    """Zbiera tekst tak jak drzewo BeautifulSoup, ale bez budowania drzewa.
+
+    Referencje znakowe są rozwijane ręcznie (``convert_charrefs=False``), tak jak
+    robi to BeautifulSoup, a sąsiednie kawałki tekstu są łączone do najbliższego
+    znacznika, bo w drzewie tworzą jeden węzeł tekstowy.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.chunks: list[str] = []
+        self.image_sources: list[str] = []
+        self._pending: list[str] = []
+        self._skip_depth = 0
+
+    def _flush(self) -> None:
+        if self._pending:
+            if not self._skip_depth:
+                self.chunks.append("".join(self._pending))
+            self._pending = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush()
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == "img":
+            src = dict(attrs).get("src")
+            if src:
+                self.image_sources.append(src)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush()
+        if tag == "img":
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush()
+        if tag in SKIPPED_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        self._pending.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self._pending.append(resolve_entityref(name))
+
+    def handle_charref(self, name: str) -> None:
+        self._pending.append(resolve_charref(name))
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if data.startswith("CDATA[") and not self._skip_depth:
+            self.chunks.append(data[len("CDATA[") :])
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+
+def _parse(html: str) -> HtmlExtract:
+    parser = _TextAndImagesParser()
+    parser.feed(html)
+    parser.close()
+    stripped = (chunk.strip() for chunk in parser.chunks)
+    return HtmlExtract(
+        text=" ".join(chunk for chunk in stripped if chunk),
+        image_sources=tuple(parser.image_sources),
+    )
+
+
+_EMPTY = HtmlExtract(text="", image_sources=())
+_cache: OrderedDict[bytes, HtmlExtract] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_key(html: str) -> bytes:
+    """Zwraca krótki skrót treści używany jako klucz pamięci podręcznej."""
+    return hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest()
+
+
+def extract_html(value: Any, use_cache: bool = True) -> HtmlExtract:
+    """Jednym przebiegiem wyciąga tekst i ``<img src>`` z fragmentu HTML."""
+    if value is None:
+        return _EMPTY
+    html = str(value)
+    if not html:
+        return _EMPTY
+    if not use_cache:
+        return _parse(html)
+
+    key = content_key(html)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    result = _parse(html)
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def html_text(value: Any) -> str:
+    """Odpowiednik ``BeautifulSoup(value, "html.parser").get_text(" ", strip=True)``."""
+    return extract_html(value).text
+
+
+def html_image_sources(value: Any) -> list[str]:
+    return list(extract_html(value).image_sources)
+
+
+def soup_extract(value: Any) -> HtmlExtract:
+    """Referencyjna ścieżka BeautifulSoup, używana w testach zgodności i benchmarku."""
+    from bs4 import BeautifulSoup
+
+    if value is None or not str(value):
+        return _EMPTY
+    soup = BeautifulSoup(str(value), "html.parser")
+    return HtmlExtract(
+        text=soup.get_text(" ", strip=True),
+        image_sources=tuple(
+            str(tag.get("src")) for tag in soup.find_all("img") if tag.get("src")
+        ),
+    )
+
+
+def iter_snapshot_html(snapshot: dict[str, Any]) -> Iterator[str]:
+    """Zwraca fragmenty HTML ze snapshotu PZO: opisy szkół i wartości oferty."""
+    for detail in snapshot.get("school_details", {}).values():
+        school_long = (detail.get("schoolOffer") or {}).get("schoolLong") or {}
+        description = school_long.get("description") if school_long else None
+        if description:
+            yield str(description)
+        for admission_point in detail.get("admissionPointList") or []:
+            if not isinstance(admission_point, dict):
+                continue
+            for item in admission_point.get("admissionPointOffersForPublic") or []:
+                if not isinstance(item, dict):
+                    continue
+                for key in ("trimmedOfferValue", "offerValue"):
+                    value = item.get(key)
+                    if isinstance(value, str) and "<" in value and ">" in value:
+                        yield value
+
+
+def benchmark(values: Iterable[str], repeat: int = 3) -> dict[str, float]:
+    """Porównuje czas ekstrakcji BeautifulSoup i parsera strumieniowego."""
+    values = list(values)
+    timings: dict[str, float] = {"fragments": float(len(values))}
+    variants = {
+        "beautifulsoup_s": soup_extract,
+        "streaming_s": lambda value: extract_html(value, use_cache=False),
+    }
+    for name, func in variants.items():
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for value in values:
+                func(value)
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best
+
+    clear_cache()
+    started = time.perf_counter()
+    for value in values:
+        extract_html(value)
+    timings["streaming_cached_s"] = time.perf_counter() - started
+    mismatches = sum(
+        1 for value in values if soup_extract(value) != extract_html(value)
+    )
+    timings["mismatches"] = float(mismatches)
+    return timings
+
+
+def main() -> None:
+    from scripts.data_processing.get_data_pzo_omikron import (
+        DEFAULT_SCHOOL_YEAR,
+        default_raw_dir,
+        load_snapshot_files,
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark ekstrakcji HTML na opisach z raw snapshotu PZO."
+    )
+    parser.add_argument("--raw-dir", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    raw_dir = args.raw_dir or default_raw_dir(2026, DEFAULT_SCHOOL_YEAR)
+
+    values = list(iter_snapshot_html(load_snapshot_files(raw_dir)))
+    timings = benchmark(values, repeat=args.repeat)
+    speedup = timings["beautifulsoup_s"] / max(timings["streaming_s"], 1e-9)
+    print(f"Fragmenty HTML: {int(timings['fragments'])}")
+    print(f"BeautifulSoup: {timings['beautifulsoup_s']:.3f} s")
+    print(f"Parser strumieniowy: {timings['streaming_s']:.3f} s ({speedup:.1f}x)")
+    print(f"Z pamięcią podręczną: {timings['streaming_cached_s']:.3f} s")
+    print(f"Rozbieżności: {int(timings['mismatches'])}")
+
+
+if __name__ == "__main__":
+    main()
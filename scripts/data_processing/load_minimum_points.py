@@ -10,16 +10,37 @@ MIN_POINTS_COLUMN_ALIASES = {
 }
 
 
+def _promote_header_row(raw, header_row):
+    """Odpowiednik ``read_excel(header=header_row)`` na już wczytanym arkuszu."""
+    columns = []
+    seen = {}
+    for index, value in enumerate(raw.iloc[header_row].tolist()):
+        name = f"Unnamed: {index}" if pd.isna(value) else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    body = raw.iloc[header_row + 1 :].reset_index(drop=True)
+    body.columns = columns
+    return body.infer_objects()
+
+
 def _read_min_points_sheet(excel_path):
-    """Reads either the old 2024 header layout or the newer direct-table layout."""
-    raw = pd.read_excel(excel_path, header=None, nrows=5)
+    """Reads either the old 2024 header layout or the newer direct-table layout.
+
+    Arkusz jest wczytywany raz (``header=None``), a wiersz nagłówka wybierany
+    na podstawie pierwszego wiersza.
+    """
+    raw = pd.read_excel(excel_path, header=None)
     first_row_values = {
         str(value).strip()
         for value in raw.iloc[0].dropna().tolist()
         if str(value).strip()
     }
     header = 0 if "Dzielnica" in first_row_values else 2
-    return pd.read_excel(excel_path, header=header)
+    return _promote_header_row(raw, header)
 
 
 def load_min_points(excel_path, admission_year: int | None = None):
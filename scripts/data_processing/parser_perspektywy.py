@@ -1,12 +1,27 @@
+import hashlib
 import html as html_lib
+import json
 import logging
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 import pandas as pd
 from bs4 import BeautifulSoup
 
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.data_processing.html_extract import html_text  # noqa: E402
+
 logger = logging.getLogger(__name__)
 
+BASE_DIR = Path(__file__).resolve().parents[2]
+
 
 def _ranking_position_to_number(value):
     value = str(value).strip().replace("=", "")
@@ -14,13 +29,12 @@ def _ranking_position_to_number(value):
 
 
 def _strip_html(value: str) -> str:
-    soup = BeautifulSoup(html_lib.unescape(value), "html.parser")
-    return soup.get_text(" ", strip=True)
+    return html_text(html_lib.unescape(value))
 
 
-def _parse_embedded_astro_ranking(html_text: str, year: int | None):
-    """Parses the Perspektywy Astro payload embedded in HTML."""
-    unescaped = html_lib.unescape(html_text)
+def _parse_embedded_astro_ranking_regex(page_html: str, year: int | None):
+    """Fallback: wyszukuje wiersze rankingu regexem w całym HTML."""
+    unescaped = html_lib.unescape(page_html)
     if year is None:
         year_match = re.search(r'"(20\d{2})":\[0,', unescaped)
         if year_match is None:
@@ -61,6 +75,145 @@ def _parse_embedded_astro_ranking(html_text: str, year: int | None):
     return pd.DataFrame(rows)
 
 
+ASTRO_ISLAND_PROPS = re.compile(r"<astro-island\b[^>]*?\sprops=\"([^\"]*)\"")
+YEAR_KEY = re.compile(r"20\d{2}")
+
+
+def _astro_value(node):
+    """Dekoduje wartość z serializacji propsów Astro (``[typ, wartość]``)."""
+    if not isinstance(node, list) or len(node) != 2:
+        return node
+    kind, value = node
+    if kind == 0:
+        if isinstance(value, dict):
+            return {key: _astro_value(item) for key, item in value.items()}
+        return value
+    if kind == 1 and isinstance(value, list):
+        return [_astro_value(item) for item in value]
+    # Pozostałe typy (RegExp, Date, Map, ...) nie występują w rankingu.
+    return value
+
+
+def _find_ranking_rows(value):
+    """Szuka listy wierszy rankingu (słowników z ``name`` i ``dzielnica``)."""
+    pending = [value]
+    while pending:
+        current = pending.pop()
+        if isinstance(current, dict):
+            pending.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            if current and all(
+                isinstance(item, dict) and "name" in item and "dzielnica" in item
+                for item in current
+            ):
+                return current
+            pending.extend(reversed(current))
+    return None
+
+
+def _astro_ranking_rows(page_html: str):
+    for match in ASTRO_ISLAND_PROPS.finditer(page_html):
+        try:
+            props = json.loads(html_lib.unescape(match.group(1)))
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(props, dict):
+            continue
+        rows = _find_ranking_rows(
+            {key: _astro_value(value) for key, value in props.items()}
+        )
+        if rows:
+            return rows
+    return None
+
+
+def _parse_astro_island_rankings(page_html: str):
+    """
+    Dekoduje propsy wyspy Astro z rankingiem i zwraca wiersze dla wszystkich lat.
+
+    Każdy atrybut ``props`` jest odescapowany i parsowany jako JSON raz, a
+    wiersze są odczytywane bezpośrednio z krotek ``[0, wartość]``. ``wsk``
+    dotyczy bieżącej edycji (najnowszego roku w payloadzie), więc starsze lata
+    dostają NaN. Zwraca ``None``, gdy w HTML nie ma rozpoznawalnej wyspy z
+    rankingiem.
+    """
+    rows = _astro_ranking_rows(page_html)
+    if rows is None:
+        return None
+    edition_year = max(
+        (int(key) for row in rows for key in row if YEAR_KEY.fullmatch(str(key))),
+        default=None,
+    )
+    records = []
+    for row in rows:
+        name = _strip_html(str(row.get("name") or ""))
+        district = str(row.get("dzielnica") or "")
+        wsk = pd.to_numeric(row.get("wsk"), errors="coerce")
+        for key, ranking in row.items():
+            if not YEAR_KEY.fullmatch(str(key)) or ranking in (None, ""):
+                continue
+            ranking_text = str(ranking)
+            records.append(
+                {
+                    "RankingPoz": _ranking_position_to_number(ranking_text),
+                    "RankingPozTekst": ranking_text,
+                    "NazwaSzkoly": name,
+                    "Dzielnica": district,
+                    "WSK": wsk if int(key) == edition_year else float("nan"),
+                    "year": int(key),
+                }
+            )
+    return pd.DataFrame(
+        records,
+        columns=[
+            "RankingPoz",
+            "RankingPozTekst",
+            "NazwaSzkoly",
+            "Dzielnica",
+            "WSK",
+            "year",
+        ],
+    )
+
+
+def parse_embedded_astro_rankings(page_html: str):
+    """
+    Zwraca rankingi wszystkich lat z osadzonego payloadu Astro (kolumna ``year``).
+
+    Najpierw dekoduje propsy wyspy Astro; gdy się nie da, używa regexu
+    osobno dla każdego roku znalezionego w HTML.
+    """
+    df = _parse_astro_island_rankings(page_html)
+    if df is not None and not df.empty:
+        return df.sort_values(["year", "RankingPoz"], kind="stable").reset_index(
+            drop=True
+        )
+    unescaped = html_lib.unescape(page_html)
+    years = sorted(set(re.findall(r'"(20\d{2})":\[0,', unescaped)))
+    frames = []
+    for year_key in years:
+        year_df = _parse_embedded_astro_ranking_regex(page_html, int(year_key))
+        if not year_df.empty:
+            year_df["year"] = int(year_key)
+            if year_key != years[-1]:
+                year_df["WSK"] = float("nan")
+            frames.append(year_df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def _parse_embedded_astro_ranking(page_html: str, year: int | None):
+    """Parses the Perspektywy Astro payload embedded in HTML."""
+    df = _parse_astro_island_rankings(page_html)
+    if df is None or df.empty:
+        return _parse_embedded_astro_ranking_regex(page_html, year)
+    if year is None:
+        # Jak w wariancie regex: pierwszy rok występujący w payloadzie.
+        year = int(df["year"].iloc[0])
+    return df[df["year"] == year].drop(columns="year").reset_index(drop=True)
+
+
 def parse_ranking_perspektywy_html_text(html: str, year: int | None = None):
     """
     Odczytuje plik HTML z rankingiem Perspektyw i zwraca DataFrame
@@ -118,17 +271,12 @@ def parse_ranking_perspektywy_html(html_file_path, year: int | None = None):
     return parse_ranking_perspektywy_html_text(html, year=year)
 
 
-def parse_ranking_perspektywy_pdf(pdf_file_path):
-    """
-    Wariant: Gdy mamy ranking w PDF.
-    Można użyć pdfplumber/tabula-py - poniżej tylko schemat.
-    """
-    import pdfplumber
-
-    import re
-
-    data_rows = []
-    dzielnice = [
+# Podnieś przy każdej zmianie logiki wyciągania wierszy z PDF - unieważnia cache.
+PDF_PARSER_VERSION = "2"
+PDF_COLUMNS = ["RankingPoz", "NazwaSzkoly", "Dzielnica"]
+DEFAULT_PDF_CACHE_DIR = BASE_DIR / "results" / "processed" / "ranking_cache"
+DZIELNICE = frozenset(
+    {
         "Bemowo",
         "Białołęka",
         "Bielany",
@@ -147,44 +295,133 @@ def parse_ranking_perspektywy_pdf(pdf_file_path):
         "Włochy",
         "Wola",
         "Żoliborz",
+    }
+)
+
+
+def _rows_from_pdf_table(table):
+    data_rows = []
+    for row in table[1:]:  # pomijamy nagłówek
+        poz = str(row[0]).strip()
+        # Pobierz nazwę szkoły z drugiej kolumny (lub połącz 2 i 3 jeśli trzecia nie jest dzielnicą)
+        nazwa = str(row[1]).strip() if len(row) > 1 and row[1] else ""
+        dzielnica = ""
+        # Jeśli trzecia kolumna istnieje i pasuje do dzielnic, to ją ustaw
+        if len(row) > 2 and row[2]:
+            dzielnica_kand = str(row[2]).strip()
+            if dzielnica_kand in DZIELNICE:
+                dzielnica = dzielnica_kand
+            else:
+                # Jeśli trzecia kolumna nie jest dzielnicą, może to druga część nazwy szkoły
+                nazwa = nazwa.rstrip() + dzielnica_kand.lstrip()
+
+        if not dzielnica and len(row) > 3:
+            for extra_col in row[3:]:
+                extra_val = str(extra_col).strip()
+                if extra_val in DZIELNICE:
+                    dzielnica = extra_val
+                    break
+        # Sprawdź czy poz to liczba od 1 do 100 i czy nazwa nie jest pusta
+        if re.fullmatch(r"[1-9][0-9]?|100", poz) and nazwa:
+            data_rows.append([poz, nazwa, dzielnica])
+    return data_rows
+
+
+def _extract_pdf_pages(pdf_file_path, page_numbers):
+    """Wyciąga wiersze rankingu z podanych stron; uruchamiane w procesie roboczym."""
+    import pdfplumber
+
+    rows_by_page = []
+    with pdfplumber.open(pdf_file_path) as pdf:
+        for page_number in page_numbers:
+            table = pdf.pages[page_number].extract_table()
+            rows_by_page.append(
+                (page_number, _rows_from_pdf_table(table) if table else [])
+            )
+    return rows_by_page
+
+
+def _page_chunks(page_count, workers):
+    chunk_size = max(1, -(-page_count // workers))
+    return [
+        list(range(first, min(first + chunk_size, page_count)))
+        for first in range(0, page_count, chunk_size)
     ]
+
+
+def parse_ranking_perspektywy_pdf(pdf_file_path, workers=None):
+    """
+    Odczytuje ranking Perspektyw z PDF (pdfplumber, jedna tabela na stronę).
+
+    Strony są dzielone na ciągłe bloki i przetwarzane w puli procesów
+    (``workers``, domyślnie liczba CPU); wiersze są scalane w kolejności
+    stron. Dla ``workers=1`` lub jednostronicowego PDF parsowanie odbywa
+    się w bieżącym procesie.
+    """
+    import pdfplumber
+
     with pdfplumber.open(pdf_file_path) as pdf:
-        for page in pdf.pages:
-            table = page.extract_table()
-            if not table:
-                continue
-            for row in table[1:]:  # pomijamy nagłówek
-                poz = str(row[0]).strip()
-                # Pobierz nazwę szkoły z drugiej kolumny (lub połącz 2 i 3 jeśli trzecia nie jest dzielnicą)
-                nazwa = str(row[1]).strip() if len(row) > 1 and row[1] else ""
-                dzielnica = ""
-                # Jeśli trzecia kolumna istnieje i pasuje do dzielnic, to ją ustaw
-                if len(row) > 2 and row[2]:
-                    dzielnica_kand = str(row[2]).strip()
-                    if dzielnica_kand in dzielnice:
-                        dzielnica = dzielnica_kand
-                    else:
-                        # Jeśli trzecia kolumna nie jest dzielnicą, może to druga część nazwy szkoły
-                        nazwa = nazwa.rstrip() + dzielnica_kand.lstrip()
-
-                if not dzielnica and len(row) > 3:
-                    for extra_col in row[3:]:
-                        extra_val = str(extra_col).strip()
-                        if extra_val in dzielnice:
-                            dzielnica = extra_val
-                            break
-                # Sprawdź czy poz to liczba od 1 do 100 i czy nazwa nie jest pusta
-                if re.fullmatch(r"[1-9][0-9]?|100", poz) and nazwa:
-                    data_rows.append([poz, nazwa, dzielnica])
-
-    df = pd.DataFrame(data_rows, columns=["RankingPoz", "NazwaSzkoly", "Dzielnica"])
+        page_count = len(pdf.pages)
+    workers = min(workers or os.cpu_count() or 1, page_count)
+
+    if workers <= 1:
+        pages = _extract_pdf_pages(pdf_file_path, range(page_count))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(
+                _extract_pdf_pages,
+                [pdf_file_path] * workers,
+                _page_chunks(page_count, workers),
+            )
+            pages = [page for chunk in chunks for page in chunk]
+
+    data_rows = [
+        row for _, rows in sorted(pages, key=lambda page: page[0]) for row in rows
+    ]
+    df = pd.DataFrame(data_rows, columns=PDF_COLUMNS)
     df["RankingPoz"] = pd.to_numeric(df["RankingPoz"], errors="coerce")
     return df
 
 
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ranking_pdf_cache_path(pdf_file_path, cache_dir=DEFAULT_PDF_CACHE_DIR):
+    """Ścieżka cache zależna od treści PDF i wersji parsera."""
+    digest = file_sha256(pdf_file_path)
+    return Path(cache_dir) / f"perspektywy_{digest}_v{PDF_PARSER_VERSION}.parquet"
+
+
+def load_ranking_perspektywy_pdf(
+    pdf_file_path, cache_dir=DEFAULT_PDF_CACHE_DIR, workers=None
+):
+    """
+    Zwraca ranking z PDF, korzystając z cache Parquet.
+
+    Klucz cache to SHA-256 pliku i ``PDF_PARSER_VERSION``, więc podmiana
+    PDF albo zmiana parsera wymusza ponowne parsowanie, a rankingi z wielu
+    lat mogą współdzielić jeden katalog.
+    """
+    cache_path = ranking_pdf_cache_path(pdf_file_path, cache_dir)
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+    df = parse_ranking_perspektywy_pdf(pdf_file_path, workers=workers)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, index=False)
+    tmp_path.replace(cache_path)
+    logger.info("Zapisano cache rankingu PDF: %s", cache_path)
+    return df
+
+
 def main():
     # Przykład: odczyt z PDF
-    df_pdf = parse_ranking_perspektywy_pdf(
+    df_pdf = load_ranking_perspektywy_pdf(
         "data/raw/2025/ranking_liceow_warszawskich_2025.pdf"
     )
     print(df_pdf.head())
@@ -0,0 +1,394 @@
+"""Lokalny magazyn zasobów PZO (logo, zdjęcia, obrazki z opisów, załączniki).
+
+Tabela ``assets_manifest`` z ``get_data_pzo_omikron.py`` opisuje zasoby przez
+hash PZO albo adres URL. Synchronizacja pobiera brakujące wpisy równolegle
+i zapisuje je adresowane treścią (``objects/<sha256[:2]>/<sha256><ext>``), więc
+ten sam plik występujący pod wieloma hashami lub adresami trafia na dysk raz.
+``index.json`` mapuje klucz źródła (``hash:...`` albo ``url:...``) na obiekt
+i miniaturę; wpisy z indeksu nie są pobierane ponownie.
+
+Wpisy mające tylko hash (logo, zdjęcia szkół) dostają adres z szablonu.
+Snapshot API nie podaje adresu plików, więc CLI wymaga jawnego
+``--hash-url-template`` (np. ``"{base_url}/sciezka/{hash}"``), a pusty
+szablon wyłącza pobieranie po hashu.
+Miniatury powstają przez Pillow, jeśli jest zainstalowany.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Any
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_ASSET_DIR = BASE_DIR / "data" / "assets" / "pzo"
+INDEX_FILE_NAME = "index.json"
+THUMBNAIL_SIZE = (160, 160)
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 30
+
+
+@dataclass(frozen=True)
+class AssetRequest:
+    """Jeden unikalny zasób do pobrania z ``assets_manifest``."""
+
+    source_key: str
+    url: str
+    asset_kind: str
+    content_type: str = ""
+    file_name: str = ""
+
+
+@dataclass
+class AssetSyncReport:
+    downloaded: int = 0
+    deduplicated: int = 0
+    skipped_existing: int = 0
+    thumbnails: int = 0
+    missing_url: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+def asset_source_key(row: dict[str, Any] | pd.Series) -> str:
+    """Klucz zasobu: hash PZO, a gdy go brak - adres URL."""
+    asset_hash = str(row.get("hash") or "").strip()
+    if asset_hash:
+        return f"hash:{asset_hash}"
+    url = str(row.get("url") or "").strip()
+    return f"url:{url}" if url else ""
+
+
+def asset_url(
+    row: dict[str, Any] | pd.Series,
+    hash_url_template: str | None = None,
+    base_url: str = "",
+) -> str:
+    url = str(row.get("url") or "").strip()
+    if url:
+        return url
+    asset_hash = str(row.get("hash") or "").strip()
+    if not asset_hash or not hash_url_template:
+        return ""
+    return hash_url_template.format(
+        hash=asset_hash,
+        base_url=base_url.rstrip("/"),
+        file_name=str(row.get("file_name") or ""),
+    )
+
+
+def asset_requests(
+    manifest: pd.DataFrame,
+    hash_url_template: str | None = None,
+    base_url: str = "",
+    kinds: set[str] | None = None,
+) -> tuple[list[AssetRequest], list[str]]:
+    """Zwraca unikalne zasoby z manifestu i klucze, dla których brak adresu."""
+    requests_by_key: dict[str, AssetRequest] = {}
+    missing_url: list[str] = []
+    for row in manifest.to_dict("records"):
+        kind = str(row.get("asset_kind") or "")
+        if kinds and kind not in kinds:
+            continue
+        source_key = asset_source_key(row)
+        if not source_key or source_key in requests_by_key:
+            continue
+        url = asset_url(row, hash_url_template, base_url)
+        if not url:
+            if source_key not in missing_url:
+                missing_url.append(source_key)
+            continue
+        requests_by_key[source_key] = AssetRequest(
+            source_key=source_key,
+            url=url,
+            asset_kind=kind,
+            content_type=str(row.get("content_type") or ""),
+            file_name=str(row.get("file_name") or ""),
+        )
+    return list(requests_by_key.values()), missing_url
+
+
+def object_extension(content_type: str, url: str = "", file_name: str = "") -> str:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    extension = mimetypes.guess_extension(media_type) if media_type else None
+    if extension:
+        return extension
+    for name in (file_name, urlparse(url).path):
+        suffix = PurePosixPath(name).suffix.lower()
+        if suffix and len(suffix) <= 6:
+            return suffix
+    return ""
+
+
+def make_thumbnail(data: bytes, size: tuple[int, int] = THUMBNAIL_SIZE) -> bytes | None:
+    """Zmniejsza obraz do PNG; zwraca ``None`` bez Pillow lub dla nie-obrazów."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail(size)
+            if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                converted = image.convert("RGBA")
+            else:
+                converted = image
+            output = io.BytesIO()
+            converted.save(output, format="PNG")
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return output.getvalue()
+
+
+class AssetStore:
+    """Magazyn plików adresowanych skrótem SHA-256 z indeksem kluczy źródeł."""
+
+    def __init__(self, root: Path = DEFAULT_ASSET_DIR) -> None:
+        self.root = Path(root)
+        self.index_path = self.root / INDEX_FILE_NAME
+        self._lock = threading.Lock()
+        self.index: dict[str, dict[str, Any]] = {}
+        if self.index_path.exists():
+            self.index = json.loads(self.index_path.read_text(encoding="utf-8"))
+
+    def save_index(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps(self.index, ensure_ascii=False, indent=2, sort_keys=True),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.index_path)
+
+    def object_path(self, sha256: str, extension: str = "") -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}{extension}"
+
+    def thumbnail_path(self, sha256: str) -> Path:
+        return self.root / "thumbs" / sha256[:2] / f"{sha256}.png"
+
+    def has(self, source_key: str) -> bool:
+        entry = self.index.get(source_key)
+        return entry is not None and (self.root / entry["path"]).exists()
+
+    def put(
+        self,
+        request: AssetRequest,
+        data: bytes,
+        content_type: str = "",
+        thumbnails: bool = True,
+    ) -> tuple[dict[str, Any], bool]:
+        """Zapisuje treść i wpis indeksu; zwraca wpis i informację, czy plik był nowy."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        content_type = content_type or request.content_type
+        extension = object_extension(content_type, request.url, request.file_name)
+        path = self.object_path(sha256, extension)
+        with self._lock:
+            is_new = not path.exists()
+            if is_new:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(data)
+            thumbnail = self.thumbnail_path(sha256)
+            if thumbnails and not thumbnail.exists():
+                thumbnail_data = make_thumbnail(data)
+                if thumbnail_data is not None:
+                    thumbnail.parent.mkdir(parents=True, exist_ok=True)
+                    thumbnail.write_bytes(thumbnail_data)
+            entry = {
+                "sha256": sha256,
+                "path": path.relative_to(self.root).as_posix(),
+                "thumbnail": (
+                    thumbnail.relative_to(self.root).as_posix()
+                    if thumbnail.exists()
+                    else ""
+                ),
+                "content_type": content_type,
+                "size": len(data),
+                "url": request.url,
+                "asset_kind": request.asset_kind,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.index[request.source_key] = entry
+        return entry, is_new
+
+    def local_path(self, source_key: str, prefer_thumbnail: bool = True) -> Path | None:
+        entry = self.index.get(source_key)
+        if not entry:
+            return None
+        candidates = [entry.get("thumbnail"), entry.get("path")]
+        if not prefer_thumbnail:
+            candidates.reverse()
+        for relative in candidates:
+            if relative and (self.root / relative).exists():
+                return self.root / relative
+        return None
+
+    def logo_path(self, logo_hash: Any) -> Path | None:
+        """Lokalna miniatura (lub oryginał) logo szkoły o podanym hashu PZO."""
+        if logo_hash is None or pd.isna(logo_hash) or not str(logo_hash).strip():
+            return None
+        return self.local_path(f"hash:{str(logo_hash).strip()}")
+
+
+def _download(
+    session: requests.Session, request: AssetRequest, timeout: int
+) -> tuple[bytes, str]:
+    response = session.get(request.url, timeout=timeout)
+    response.raise_for_status()
+    return response.content, response.headers.get("Content-Type", "")
+
+
+def sync_assets(
+    manifest: pd.DataFrame,
+    store: AssetStore,
+    hash_url_template: str | None = None,
+    base_url: str = "",
+    session: requests.Session | None = None,
+    max_workers: int = DEFAULT_WORKERS,
+    timeout: int = DEFAULT_TIMEOUT,
+    thumbnails: bool = True,
+    kinds: set[str] | None = None,
+) -> AssetSyncReport:
+    """Pobiera brakujące zasoby z manifestu do magazynu adresowanego treścią."""
+    pending, missing_url = asset_requests(manifest, hash_url_template, base_url, kinds)
+    report = AssetSyncReport(missing_url=missing_url)
+    to_fetch = []
+    for request in pending:
+        if store.has(request.source_key):
+            report.skipped_existing += 1
+        else:
+            to_fetch.append(request)
+
+    session = session or requests.Session()
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {
+                executor.submit(_download, session, request, timeout): request
+                for request in to_fetch
+            }
+            for future in as_completed(futures):
+                request = futures[future]
+                try:
+                    data, content_type = future.result()
+                except requests.RequestException as exc:
+                    report.failed[request.source_key] = str(exc)
+                    continue
+                entry, is_new = store.put(request, data, content_type, thumbnails)
+                if is_new:
+                    report.downloaded += 1
+                else:
+                    report.deduplicated += 1
+                if entry["thumbnail"]:
+                    report.thumbnails += 1
+        store.save_index()
+
+    if report.missing_url:
+        logger.info(
+            "Pominięto %s zasobów bez adresu (pusty --hash-url-template).",
+            len(report.missing_url),
+        )
+    if report.failed:
+        logger.warning("Nie pobrano %s zasobów.", len(report.failed))
+    return report
+
+
+def load_assets_manifest(
+    raw_dir: Path, parquet_dir: Path | None = None
+) -> pd.DataFrame:
+    from scripts.data_processing.get_data_pzo_omikron import (
+        build_tables,
+        has_parquet_tables,
+        load_snapshot_files,
+        read_parquet_tables,
+    )
+
+    if parquet_dir is not None and has_parquet_tables(parquet_dir):
+        return read_parquet_tables(parquet_dir).get("assets_manifest", pd.DataFrame())
+    return build_tables(load_snapshot_files(raw_dir))["assets_manifest"]
+
+
+def parse_args() -> argparse.Namespace:
+    from scripts.data_processing.get_data_pzo_omikron import (
+        DEFAULT_BASE_URL,
+        DEFAULT_SCHOOL_YEAR,
+    )
+
+    parser = argparse.ArgumentParser(
+        description="Synchronizuje zasoby z assets_manifest PZO do lokalnego magazynu."
+    )
+    parser.add_argument("--year", type=int, default=2026)
+    parser.add_argument("--school-year", default=DEFAULT_SCHOOL_YEAR)
+    parser.add_argument("--raw-dir", type=Path)
+    parser.add_argument(
+        "--parquet-dir",
+        type=Path,
+        help="Katalog tabel Parquet; gdy brak, manifest jest budowany z raw JSON.",
+    )
+    parser.add_argument("--asset-dir", type=Path, default=DEFAULT_ASSET_DIR)
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument(
+        "--hash-url-template",
+        required=True,
+        help=(
+            "Szablon adresu dla wpisów z samym hashem ({base_url}, {hash}); "
+            "pusty wyłącza ich pobieranie."
+        ),
+    )
+    parser.add_argument(
+        "--kind",
+        action="append",
+        dest="kinds",
+        help="Pobieraj tylko wskazane asset_kind (można podać kilka razy).",
+    )
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--no-thumbnails", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from scripts.data_processing.get_data_pzo_omikron import default_raw_dir
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    args = parse_args()
+    raw_dir = args.raw_dir or default_raw_dir(args.year, args.school_year)
+    manifest = load_assets_manifest(raw_dir, args.parquet_dir)
+    report = sync_assets(
+        manifest,
+        AssetStore(args.asset_dir),
+        hash_url_template=args.hash_url_template or None,
+        base_url=args.base_url,
+        max_workers=args.workers,
+        timeout=args.timeout,
+        thumbnails=not args.no_thumbnails,
+        kinds=set(args.kinds) if args.kinds else None,
+    )
+    print(f"Pobrane: {report.downloaded}")
+    print(f"Duplikaty treści: {report.deduplicated}")
+    print(f"Już w magazynie: {report.skipped_existing}")
+    print(f"Miniatury: {report.thumbnails}")
+    print(f"Bez adresu: {len(report.missing_url)}")
+    print(f"Błędy: {len(report.failed)}")
+
+
+if __name__ == "__main__":
+    main()
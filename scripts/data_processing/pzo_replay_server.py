@@ -0,0 +1,280 @@
+"""Lokalny serwer odtwarzający publiczne API oferty PZO/Omikron ze snapshotu.
+
+Serwuje ``/api/offer/search``, ``/api/offer/searchSubmit`` i
+``/api/offer/schoolDetails`` z katalogu raw zapisanego przez
+``get_data_pzo_omikron.py``. Opóźnienie, odsetek błędów i limit zapytań na
+sekundę (odpowiedzi 429) są konfigurowalne, więc pobieranie można mierzyć
+i testować bez sieci:
+
+    python scripts/data_processing/pzo_replay_server.py --port 8765 --latency 0.05
+    python scripts/data_processing/get_data_pzo_omikron.py --base-url http://127.0.0.1:8765
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator
+
+if __name__ == "__main__" and __package__ is None:
+    project_root = Path(__file__).resolve().parents[2]
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+
+from scripts.data_processing.get_data_pzo_omikron import (  # noqa: E402
+    DEFAULT_PUBLIC_CONTEXT,
+    DEFAULT_SCHOOL_YEAR,
+    SCHOOL_DETAILS_PATH,
+    SEARCH_METADATA_PATH,
+    SEARCH_SUBMIT_PATH,
+    default_raw_dir,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_id(value: Any) -> int | None:
+    """Identyfikator z zapytania jako liczba; inne wartości nie trafiają do ścieżki."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdecimal():
+        return int(value)
+    return None
+
+
+@dataclass(frozen=True)
+class ReplayConfig:
+    """Parametry symulacji zachowania serwera."""
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    max_requests_per_second: float | None = None
+    retry_after: int = 1
+    require_csrf_header: bool = True
+    seed: int | None = None
+
+
+class PzoReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        raw_dir: Path,
+        config: ReplayConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        public_context: str = DEFAULT_PUBLIC_CONTEXT,
+    ) -> None:
+        super().__init__((host, port), _ReplayHandler)
+        self.raw_dir = Path(raw_dir)
+        self.config = config or ReplayConfig()
+        self.public_context = "/" + public_context.strip("/")
+        self.stats: Counter[tuple[str, int]] = Counter()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._recent_requests: deque[float] = deque()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}"
+
+    def is_throttled(self) -> bool:
+        limit = self.config.max_requests_per_second
+        if not limit:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent_requests and now - self._recent_requests[0] >= 1.0:
+                self._recent_requests.popleft()
+            if len(self._recent_requests) >= limit:
+                return True
+            self._recent_requests.append(now)
+            return False
+
+    def simulated_delay(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(0, self.config.latency_jitter)
+        return self.config.latency + jitter
+
+    def should_fail(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.config.error_rate
+
+    def record(self, route: str, status: int) -> None:
+        with self._lock:
+            self.stats[(route, status)] += 1
+
+    def resolve(self, route: str, payload: dict[str, Any]) -> Path | None:
+        if route == SEARCH_METADATA_PATH:
+            return self.raw_dir / "search_metadata.json"
+        if route == SEARCH_SUBMIT_PATH:
+            type_id = _snapshot_id(payload.get("schoolTypeId"))
+            if type_id is None:
+                return None
+            return self.raw_dir / "search_results" / f"school_type_{type_id}.json"
+        if route == SCHOOL_DETAILS_PATH:
+            school_id = _snapshot_id(payload.get("schoolId"))
+            if school_id is None:
+                return None
+            return self.raw_dir / "school_details" / f"{school_id}.json"
+        return None
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    server: PzoReplayServer
+    routes = {
+        "GET": {SEARCH_METADATA_PATH},
+        "POST": {SEARCH_SUBMIT_PATH, SCHOOL_DETAILS_PATH},
+    }
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, route: str, status: int, body: bytes, **headers: str) -> None:
+        self.server.record(route, status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, route: str, status: int, message: str, **headers: str):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self._send_json(route, status, body, **headers)
+
+    def _handle(self, method: str) -> None:
+        path = self.path.split("?", 1)[0]
+        context = self.server.public_context
+        route = path[len(context) :] if path.startswith(context + "/") else path
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+
+        if route not in self.routes.get(method, set()):
+            self._send_error_json(route, 404, f"Nieznany endpoint: {method} {path}")
+            return
+        if self.server.is_throttled():
+            self._send_error_json(
+                route,
+                429,
+                "Too Many Requests",
+                Retry_After=str(self.server.config.retry_after),
+            )
+            return
+        delay = self.server.simulated_delay()
+        if delay > 0:
+            time.sleep(delay)
+        if self.server.config.require_csrf_header and not self.headers.get(
+            "x-csrf-protection"
+        ):
+            self._send_error_json(route, 403, "Brak nagłówka x-csrf-protection")
+            return
+        if self.server.should_fail():
+            self._send_error_json(route, 500, "Symulowany błąd serwera")
+            return
+
+        try:
+            payload = json.loads(raw_body) if raw_body else {}
+        except json.JSONDecodeError:
+            self._send_error_json(route, 400, "Niepoprawny JSON")
+            return
+        source = self.server.resolve(
+            route, payload if isinstance(payload, dict) else {}
+        )
+        if source is None or not source.exists():
+            self._send_error_json(route, 404, "Brak danych w snapshocie")
+            return
+        self._send_json(route, 200, source.read_bytes())
+
+
+@contextmanager
+def serve_snapshot(
+    raw_dir: Path,
+    config: ReplayConfig | None = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Iterator[PzoReplayServer]:
+    """Uruchamia serwer w wątku tła na czas bloku ``with``."""
+    server = PzoReplayServer(raw_dir, config=config, host=host, port=port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Lokalny serwer odtwarzający API oferty PZO z katalogu raw."
+    )
+    parser.add_argument("--raw-dir", type=Path)
+    parser.add_argument("--year", type=int, default=2026)
+    parser.add_argument("--school-year", default=DEFAULT_SCHOOL_YEAR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        help="Limit zapytań na sekundę; nadmiarowe dostają HTTP 429.",
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
+    args = parse_args()
+    raw_dir = args.raw_dir or default_raw_dir(args.year, args.school_year)
+    config = ReplayConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        max_requests_per_second=args.max_rps,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = PzoReplayServer(raw_dir, config=config, host=args.host, port=args.port)
+    logger.info("Serwer PZO z %s: %s", raw_dir, server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info("Statystyki odpowiedzi: %s", dict(server.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Magazyn plików źródłowych pipeline'u z warunkowym odświeżaniem.
+
+Każdy pobrany plik trafia do ``objects/<sha256[:2]>/<sha256>`` (adresowanie
+treścią), a robocza kopia - pod ścieżkę z ``data_sources.yml``. Manifest
+(``manifest.json``) zapisuje dla każdej ścieżki URL, ETag, Last-Modified,
+sha256 i czas pobrania, więc odświeżenie to równoległe zapytania
+``If-None-Match``/``If-Modified-Since``: niezmienione źródła kończą się
+odpowiedzią 304, a zmiana treści zmienia sha256, którym kluczowane są cache
+parserów (progi, ranking PDF). Brakująca lub uszkodzona kopia robocza jest
+odtwarzana z obiektu (``SourceStore.restore``), także w trybie offline.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_STORE_DIR = BASE_DIR / "data" / "sources"
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_SCHEMA_VERSION = "1.0"
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+class OfflineSourceError(FileNotFoundError):
+    """Brak lokalnego pliku źródłowego w trybie offline."""
+
+
+@dataclass(frozen=True)
+class SourceResult:
+    path: Path
+    status: str  # downloaded | updated | unchanged | local | failed
+    sha256: str = ""
+    error: str = ""
+
+    @property
+    def changed(self) -> bool:
+        return self.status in ("downloaded", "updated")
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(path)
+
+
+def _file_sha256(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class SourceStore:
+    """Manifest i obiekty adresowane treścią dla plików źródłowych."""
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR, base_dir: Path = BASE_DIR):
+        self.root = Path(root)
+        self.base_dir = Path(base_dir)
+        self.manifest_path = self.root / MANIFEST_FILE_NAME
+        self._lock = threading.Lock()
+        self.entries: dict[str, dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("sources", {})
+
+    def key(self, path: Path) -> str:
+        path = Path(path)
+        try:
+            return path.resolve().relative_to(self.base_dir.resolve()).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def entry(self, path: Path) -> dict[str, Any] | None:
+        return self.entries.get(self.key(path))
+
+    def object_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def restore(self, path: Path) -> bool:
+        """Odtwarza kopię roboczą z obiektu, gdy jej brak lub sha256 się nie zgadza.
+
+        Zwraca True, gdy plik został odtworzony.
+        """
+        entry = self.entry(path)
+        sha256 = (entry or {}).get("sha256")
+        if not sha256:
+            return False
+        object_path = self.object_path(sha256)
+        if not object_path.exists():
+            return False
+        path = Path(path)
+        if path.exists():
+            if _file_sha256(path) == sha256:
+                return False
+            logger.warning("Kopia robocza %s różni się od manifestu; odtwarzam.", path)
+        _write_atomic(path, object_path.read_bytes())
+        return True
+
+    def conditional_headers(self, path: Path) -> dict[str, str]:
+        entry = self.entry(path)
+        if not entry or not Path(path).exists():
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(
+        self, path: Path, url: str, content: bytes, headers: Any
+    ) -> tuple[str, bool]:
+        """Zapisuje pobraną treść; zwraca (sha256, czy treść się zmieniła)."""
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_path = self.object_path(sha256)
+        if not object_path.exists():
+            _write_atomic(object_path, content)
+        _write_atomic(Path(path), content)
+        with self._lock:
+            previous = self.entries.get(self.key(path), {})
+            self.entries[self.key(path)] = {
+                "url": url,
+                "etag": headers.get("ETag", ""),
+                "last_modified": headers.get("Last-Modified", ""),
+                "sha256": sha256,
+                "size": len(content),
+                "fetched_at": _utc_now(),
+                "checked_at": _utc_now(),
+            }
+        return sha256, previous.get("sha256") != sha256
+
+    def touch(self, path: Path) -> None:
+        with self._lock:
+            entry = self.entries.get(self.key(path))
+            if entry is not None:
+                entry["checked_at"] = _utc_now()
+
+    def write_manifest(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "schema_version": MANIFEST_SCHEMA_VERSION,
+            "written_at": _utc_now(),
+            "sources": dict(sorted(self.entries.items())),
+        }
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        tmp_path.replace(self.manifest_path)
+
+
+def fetch_source(
+    store: SourceStore,
+    path: Path,
+    url: str,
+    session: requests.Session | Any | None = None,
+    timeout: float = 60,
+) -> SourceResult:
+    """Pobiera źródło warunkowo; 304 oznacza brak zmian."""
+    session = session or requests
+    headers = DEFAULT_HEADERS | store.conditional_headers(path)
+    response = session.get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304:
+        store.touch(path)
+        entry = store.entry(path) or {}
+        return SourceResult(Path(path), "unchanged", entry.get("sha256", ""))
+    response.raise_for_status()
+    existed = Path(path).exists()
+    known = store.entry(path)
+    if existed and known is None:
+        # Kopia robocza sprzed manifestu: porównujemy z jej treścią.
+        previous = _file_sha256(path)
+    else:
+        previous = (known or {}).get("sha256", "")
+    sha256, _changed = store.record(path, url, response.content, response.headers)
+    if not existed:
+        status = "downloaded"
+    else:
+        status = "updated" if sha256 != previous else "unchanged"
+    return SourceResult(Path(path), status, sha256)
+
+
+def refresh_sources(
+    sources: list[dict[str, Any]],
+    store: SourceStore,
+    session: requests.Session | Any | None = None,
+    max_workers: int = 8,
+    timeout: float = 60,
+) -> list[SourceResult]:
+    """
+    Odświeża równolegle wszystkie źródła z ``source_url``.
+
+    ``sources`` to słowniki z kluczami ``path`` (ścieżka absolutna) i
+    opcjonalnie ``source_url``. Źródła bez URL są tylko raportowane jako
+    ``local``. Błąd jednego źródła nie przerywa pozostałych.
+    """
+    session = session or requests.Session()
+
+    def refresh(source: dict[str, Any]) -> SourceResult:
+        path = Path(source["path"])
+        url = source.get("source_url")
+        if not url:
+            return SourceResult(path, "local")
+        try:
+            return fetch_source(store, path, url, session=session, timeout=timeout)
+        except requests.RequestException as exc:
+            logger.warning("Nie udało się odświeżyć %s: %s", url, exc)
+            return SourceResult(path, "failed", error=str(exc))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(refresh, sources))
+    store.write_manifest()
+    return results
@@ -0,0 +1,37 @@
+"""Wspólne klucze tekstowe do porównywania nazw i adresów."""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any
+
+import pandas as pd
+
+# NFKD w ascii_key nie rozkłada "ł", więc bez tego "Marszałkowska" != "marszalkowska".
+STROKE_LETTERS = str.maketrans("łŁ", "lL")
+
+
+def safe_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def ascii_key(value: Any) -> str:
+    text = safe_text(value).lower()
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def folded_key(value: Any) -> str:
+    """``ascii_key`` z "ł" zamienionym na "l" (nazwy ulic i dzielnic)."""
+    return ascii_key(safe_text(value).translate(STROKE_LETTERS))
@@ -6,22 +6,44 @@ import json
 import logging
 import os
 import re
-import time
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 from urllib.parse import quote
 
 import pandas as pd
-import requests
 import yaml
 
+from scripts.api_clients.distance_matrix import compute_travel_matrix
 from scripts.api_clients.googlemaps_api import (
     get_coordinates_for_addresses_batch,
     get_next_weekday_time,
-    get_travel_times_batch,
+)
+from scripts.api_clients.googlemaps_cache import (
+    DEFAULT_CACHE_FILE as DEFAULT_MAPS_CACHE_FILE,
+    DEFAULT_GEOCODE_TTL_DAYS,
+    DEFAULT_TRAVEL_TIME_TTL_DAYS,
+    GoogleMapsCache,
+    cached_coordinates,
+    cached_travel_times,
+)
+from scripts.api_clients.googlemaps_replay import (
+    DEFAULT_REPLAY_FILE,
+    build_replay_client,
+)
+from scripts.api_clients.rate_limit import (
+    DEFAULT_QPS,
+    DEFAULT_RETRIES,
+    DEFAULT_WORKERS,
+    RateLimitedExecutor,
 )
 from scripts.config.constants import ALL_SUBJECTS
+from scripts.data_processing.district_resolver import (
+    DistrictResolver,
+    assign_districts,
+    load_district_resolver,
+)
 from scripts.data_processing.load_minimum_points import load_min_points
 from scripts.data_processing.get_data_pzo_omikron import (
     DEFAULT_BASE_URL as PZO_BASE_URL,
@@ -29,13 +51,26 @@ from scripts.data_processing.get_data_pzo_omikron import (
     PzoOmikronClient,
     build_tables as build_pzo_tables,
     fetch_offer_snapshot,
+    has_parquet_tables,
     load_snapshot_files as load_pzo_snapshot_files,
+    parquet_dir_for_xlsx,
+    read_parquet_tables,
     write_snapshot_files,
 )
 from scripts.data_processing.parser_perspektywy import (
+    DEFAULT_PDF_CACHE_DIR,
+    file_sha256,
+    load_ranking_perspektywy_pdf,
     parse_ranking_perspektywy_html,
-    parse_ranking_perspektywy_pdf,
 )
+from scripts.data_processing.source_store import (
+    OfflineSourceError,
+    SourceResult,
+    SourceStore,
+    fetch_source,
+    refresh_sources,
+)
+from scripts.data_processing.text_keys import ascii_key, safe_text
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +83,10 @@ PROJECT_CONFIG_FILE = SCRIPTS_DIR / "config" / "config.yml"
 KODY_FILE = DATA_DIR / "reference" / "waw_kod_dzielnica.csv"
 CZASY_DOJAZDU_FILE = RESULTS_DIR / "czasy_dojazdu.xlsx"
 LEGACY_APP_FILE = RESULTS_DIR / "LO_Warszawa_2025_Warszawa_SL.xlsx"
+SOURCE_STORE_DIR = DATA_DIR / "sources"
+THRESHOLD_CACHE_DIR = RESULTS_DIR / "processed" / "threshold_cache"
+# Podnieś przy zmianie load_min_points lub normalize_name - unieważnia cache.
+THRESHOLD_CACHE_VERSION = "1"
 THRESHOLD_COLUMNS = [
     "NazwaSzkoly",
     "OddzialNazwa",
@@ -257,26 +296,6 @@ ORDINAL_TO_COLUMN = {
 }
 
 
-def safe_text(value: Any) -> str:
-    if value is None:
-        return ""
-    if isinstance(value, str):
-        return value
-    try:
-        if pd.isna(value):
-            return ""
-    except (TypeError, ValueError):
-        pass
-    return str(value)
-
-
-def ascii_key(value: Any) -> str:
-    text = safe_text(value).lower()
-    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
-    text = re.sub(r"[^a-z0-9]+", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
-
-
 def compact_code(value: Any) -> str:
     text = safe_text(value).upper()
     text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
@@ -634,54 +653,246 @@ def pzo_search_url(school_type_ids: Any = "") -> str:
     return f"{PZO_BASE_URL}{PZO_PUBLIC_CONTEXT}/offer/search/results?q={query}"
 
 
-def ensure_source_file(source: dict[str, Any]) -> Path:
+_source_store: SourceStore | None = None
+
+
+def source_store() -> SourceStore:
+    global _source_store
+    if _source_store is None:
+        _source_store = SourceStore(SOURCE_STORE_DIR, base_dir=BASE_DIR)
+    return _source_store
+
+
+def ensure_source_file(source: dict[str, Any], offline: bool = False) -> Path:
     path = resolve_path(source["path"])
+    if source_store().restore(path):
+        logger.info("Odtworzono zrodlo z magazynu: %s", path)
     if path.exists():
         return path
     url = source.get("source_url")
+    if offline:
+        raise OfflineSourceError(f"Tryb offline: brak lokalnego pliku {path}")
     if not url:
         raise FileNotFoundError(f"Brak lokalnego pliku i URL zrodla: {path}")
     logger.info("Pobieranie zrodla: %s", url)
-    response = requests.get(url, timeout=60, headers={"User-Agent": "Mozilla/5.0"})
-    response.raise_for_status()
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_bytes(response.content)
+    store = source_store()
+    fetch_source(store, path, url)
+    store.write_manifest()
     logger.info("Zapisano zrodlo do %s", path)
     return path
 
 
+def configured_sources(year_configs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Plikowe źródła (progi, ranking) wszystkich lat, bez powtórzeń ścieżek."""
+    sources: dict[Path, dict[str, Any]] = {}
+    for year_cfg in year_configs:
+        candidates = list(threshold_sources(year_cfg))
+        if year_cfg.get("ranking"):
+            candidates.append(year_cfg["ranking"])
+        for source in candidates:
+            path = resolve_path(source["path"]).resolve()
+            entry = sources.setdefault(path, {"path": path})
+            if source.get("source_url") and not entry.get("source_url"):
+                entry["source_url"] = source["source_url"]
+    return list(sources.values())
+
+
+def offer_available_offline(offer_cfg: dict[str, Any]) -> bool:
+    if resolve_path(offer_cfg["path"]).exists():
+        return True
+    raw_dir = offer_cfg.get("raw_dir")
+    if not raw_dir:
+        return False
+    from scripts.data_processing.get_data_vulcan_async import VulcanRawStore
+
+    return bool(VulcanRawStore(resolve_path(raw_dir)).page_ids())
+
+
+def missing_offline_inputs(year_configs: list[dict[str, Any]]) -> list[str]:
+    """Lista brakujących lokalnie wejść, które bez sieci nie powstaną."""
+    store = source_store()
+    missing = [
+        str(source["path"])
+        for source in configured_sources(year_configs)
+        if not store.restore(source["path"]) and not Path(source["path"]).exists()
+    ]
+    for year_cfg in year_configs:
+        offer_cfg = year_cfg["offer"]
+        if not offer_available_offline(offer_cfg):
+            missing.append(f"{year_cfg['year']}: oferta {offer_cfg['path']}")
+    return missing
+
+
+def refresh_configured_sources(
+    year_configs: list[dict[str, Any]], max_workers: int = 8
+) -> list[SourceResult]:
+    """Warunkowo odświeża wszystkie źródła z ``source_url`` (ETag/Last-Modified)."""
+    results = refresh_sources(
+        configured_sources(year_configs), source_store(), max_workers=max_workers
+    )
+    for result in results:
+        logger.info("Źródło %s: %s", result.path, result.status)
+    failed = [result for result in results if result.status == "failed"]
+    if failed:
+        logger.warning("Nie odświeżono %s źródeł; używam kopii lokalnych.", len(failed))
+    return results
+
+
+THRESHOLD_FILE_YEAR = re.compile(r"(20\d{2})(?!.*20\d{2})")
+
+
+def discover_history_sources(
+    history_cfg: dict[str, Any],
+    known_paths: set[Path],
+    base_priority: int,
+    before_year: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Dodaje źródła progów z plików pasujących do ``history.pattern``.
+
+    Rok progów jest brany z nazwy pliku (ostatnie ``20xx``); historyczne są
+    tylko lata wcześniejsze niż ``before_year``. Pliki już wymienione w
+    ``sources`` są pomijane, a nowsze lata dostają niższy (ważniejszy)
+    priorytet.
+    """
+    found = []
+    for path in sorted(BASE_DIR.glob(history_cfg["pattern"])):
+        year_match = THRESHOLD_FILE_YEAR.search(path.name)
+        if year_match is None or path.resolve() in known_paths:
+            continue
+        threshold_year = int(year_match.group(1))
+        if before_year is not None and threshold_year >= before_year:
+            continue
+        found.append((threshold_year, path))
+
+    kind = history_cfg.get("threshold_kind", "historical")
+    sources = []
+    for offset, (threshold_year, path) in enumerate(sorted(found, reverse=True)):
+        sources.append(
+            {
+                "type": "minimum_points",
+                "path": str(path.relative_to(BASE_DIR)),
+                "threshold_year": threshold_year,
+                "threshold_kind": kind,
+                "threshold_label": f"historyczne progi {threshold_year}",
+                "priority": base_priority + offset,
+            }
+        )
+    return sources
+
+
 def threshold_sources(year_cfg: dict[str, Any]) -> list[dict[str, Any]]:
     threshold_cfg = year_cfg.get("thresholds")
     if not threshold_cfg:
         return []
+    history_cfg = threshold_cfg.get("history")
     if "sources" not in threshold_cfg:
-        source = threshold_cfg.copy()
+        source = {
+            key: value for key, value in threshold_cfg.items() if key != "history"
+        }
         source.setdefault("priority", 1)
-        return [source]
-
-    inherited = {key: value for key, value in threshold_cfg.items() if key != "sources"}
-    sources = []
-    for index, source in enumerate(threshold_cfg["sources"], start=1):
-        merged = inherited | source
-        merged.setdefault("priority", index)
-        sources.append(merged)
+        sources = [source] if "path" in source else []
+    else:
+        inherited = {
+            key: value
+            for key, value in threshold_cfg.items()
+            if key not in ("sources", "history")
+        }
+        sources = []
+        for index, source in enumerate(threshold_cfg["sources"], start=1):
+            merged = inherited | source
+            merged.setdefault("priority", index)
+            sources.append(merged)
+
+    if history_cfg:
+        known_paths = {resolve_path(source["path"]).resolve() for source in sources}
+        base_priority = history_cfg.get(
+            "priority",
+            max((int(source["priority"]) for source in sources), default=0) + 1,
+        )
+        sources.extend(
+            discover_history_sources(
+                history_cfg, known_paths, int(base_priority), year_cfg.get("year")
+            )
+        )
     return sources
 
 
+_threshold_source_frames: dict[str, pd.DataFrame] = {}
+
+
+def _threshold_cache_path(digest: str, cache_dir: Path | None) -> Path | None:
+    if cache_dir is None:
+        return None
+    return cache_dir / f"min_points_{digest}_v{THRESHOLD_CACHE_VERSION}.parquet"
+
+
+def load_threshold_sources(
+    paths: list[Path], cache_dir: Path | None = None, workers: int | None = None
+) -> dict[Path, pd.DataFrame]:
+    """
+    Zwraca znormalizowane progi (z ``SzkolaIdentyfikator``) dla każdego pliku.
+
+    Każdy plik jest parsowany raz na skrót SHA-256 treści: w obrębie
+    procesu ramka jest współdzielona między konfiguracjami lat, a między
+    uruchomieniami trzymana jako Parquet w ``cache_dir`` (jeśli podano).
+    Pliki spoza cache są parsowane równolegle w puli procesów.
+    """
+    digests = {path: file_sha256(path) for path in paths}
+    missing: dict[str, Path] = {}
+    for path, digest in digests.items():
+        if digest in _threshold_source_frames or digest in missing:
+            continue
+        cache_path = _threshold_cache_path(digest, cache_dir)
+        if cache_path is not None and cache_path.exists():
+            _threshold_source_frames[digest] = pd.read_parquet(cache_path)
+        else:
+            missing[digest] = path
+
+    if len(missing) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = dict(zip(missing, executor.map(load_min_points, missing.values())))
+    else:
+        parsed = {digest: load_min_points(path) for digest, path in missing.items()}
+
+    for digest, frame in parsed.items():
+        frame["SzkolaIdentyfikator"] = frame["NazwaSzkoly"].apply(normalize_name)
+        cache_path = _threshold_cache_path(digest, cache_dir)
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(".parquet.tmp")
+            frame.to_parquet(tmp_path, index=False)
+            tmp_path.replace(cache_path)
+        _threshold_source_frames[digest] = frame
+    return {
+        path: _threshold_source_frames[digest].copy()
+        for path, digest in digests.items()
+    }
+
+
+def load_threshold_source(path: Path, cache_dir: Path | None = None) -> pd.DataFrame:
+    """Wariant ``load_threshold_sources`` dla jednego pliku."""
+    return load_threshold_sources([path], cache_dir=cache_dir)[path]
+
+
 def load_thresholds(year_cfg: dict[str, Any]) -> pd.DataFrame:
     sources = threshold_sources(year_cfg)
     if not sources:
         return pd.DataFrame(columns=THRESHOLD_COLUMNS)
 
+    offline = bool(year_cfg.get("offline"))
+    paths = [ensure_source_file(source, offline=offline) for source in sources]
+    source_frames = load_threshold_sources(
+        paths,
+        cache_dir=THRESHOLD_CACHE_DIR,
+        workers=(year_cfg.get("thresholds") or {}).get("workers"),
+    )
     frames = []
-    for source in sources:
-        path = ensure_source_file(source)
+    for source, path in zip(sources, paths):
         threshold_year = source.get("threshold_year", year_cfg.get("admission_year"))
-        df_source = load_min_points(path, admission_year=threshold_year)
-        if "admission_year" in df_source.columns:
-            df_source = df_source.rename(columns={"admission_year": "threshold_year"})
-        else:
-            df_source["threshold_year"] = threshold_year
+        df_source = source_frames[path].copy()
+        identifiers = df_source.pop("SzkolaIdentyfikator")
+        df_source["threshold_year"] = threshold_year
         df_source["threshold_kind"] = source.get(
             "threshold_kind", year_cfg.get("threshold_mode", "actual")
         )
@@ -690,9 +901,7 @@ def load_thresholds(year_cfg: dict[str, Any]) -> pd.DataFrame:
             "threshold_label", f"progi {threshold_year}"
         )
         df_source["threshold_source"] = source.get("source_url", str(path))
-        df_source["SzkolaIdentyfikator"] = df_source["NazwaSzkoly"].apply(
-            normalize_name
-        )
+        df_source["SzkolaIdentyfikator"] = identifiers
         df_source["year"] = year_cfg["year"]
         df_source["admission_year"] = year_cfg.get("admission_year")
         df_source["school_year"] = year_cfg.get("school_year")
@@ -731,35 +940,33 @@ def school_threshold_summary(df_thresholds: pd.DataFrame) -> pd.DataFrame:
     if df_thresholds.empty:
         return pd.DataFrame(columns=columns)
 
-    school_source_cols = [
-        "SzkolaIdentyfikator",
-        "threshold_priority",
-        "threshold_year",
-        "threshold_kind",
-        "threshold_label",
-    ]
-    best_school_sources = best_thresholds_for_keys(
-        df_thresholds[school_source_cols].drop_duplicates(),
-        ["SzkolaIdentyfikator"],
-    )
-    selected = df_thresholds.merge(
-        best_school_sources[
-            ["SzkolaIdentyfikator", "threshold_priority", "threshold_year"]
-        ],
-        how="inner",
-        on=["SzkolaIdentyfikator", "threshold_priority", "threshold_year"],
-    )
-    return (
-        selected.groupby("SzkolaIdentyfikator")
+    # Jeden wiersz na (szkoła, priorytet, rok); wybór najlepszego źródła
+    # odbywa się na tej małej ramce zamiast na pełnej liście klas.
+    per_source = (
+        df_thresholds.groupby(
+            ["SzkolaIdentyfikator", "threshold_priority", "threshold_year"],
+            sort=False,
+            dropna=False,
+        )
         .agg(
             Prog_min_szkola=("Prog_min_klasa", "min"),
             Prog_max_szkola=("Prog_min_klasa", "max"),
-            Prog_szkola_threshold_year=("threshold_year", "first"),
             Prog_szkola_threshold_kind=("threshold_kind", "first"),
             Prog_szkola_threshold_label=("threshold_label", "first"),
         )
         .reset_index()
     )
+    best = (
+        per_source.dropna(subset=["SzkolaIdentyfikator"])
+        .sort_values(
+            ["SzkolaIdentyfikator", "threshold_priority"],
+            na_position="last",
+            kind="stable",
+        )
+        .drop_duplicates("SzkolaIdentyfikator", keep="first")
+        .rename(columns={"threshold_year": "Prog_szkola_threshold_year"})
+    )
+    return best[columns].reset_index(drop=True)
 
 
 def format_threshold_value(value: Any) -> str:
@@ -821,23 +1028,22 @@ def historical_school_thresholds(df_thresholds: pd.DataFrame) -> pd.DataFrame:
         .sort_values(["SzkolaIdentyfikator", "threshold_year"], ascending=[True, False])
     )
 
-    rows = []
-    for school_id, group in ranges.groupby("SzkolaIdentyfikator", sort=False):
-        parts = [
-            f"{int(row.threshold_year)}: "
-            f"{format_threshold_range(row.Prog_min, row.Prog_max)}"
-            for row in group.itertuples(index=False)
-        ]
-        rows.append(
-            {
-                "SzkolaIdentyfikator": school_id,
-                "Progi_historyczne_szkola": "; ".join(parts),
-                "Progi_historyczne_lata": "/".join(
-                    str(int(year)) for year in group["threshold_year"].tolist()
-                ),
-            }
+    min_text = ranges["Prog_min"].map(format_threshold_value)
+    max_text = ranges["Prog_max"].map(format_threshold_value)
+    ranges["year_text"] = ranges["threshold_year"].astype(int).astype(str)
+    ranges["part"] = (
+        ranges["year_text"]
+        + ": "
+        + min_text.where(min_text == max_text, min_text + "-" + max_text)
+    )
+    return (
+        ranges.groupby("SzkolaIdentyfikator", sort=False)
+        .agg(
+            Progi_historyczne_szkola=("part", "; ".join),
+            Progi_historyczne_lata=("year_text", "/".join),
         )
-    return pd.DataFrame(rows, columns=columns)
+        .reset_index()[columns]
+    )
 
 
 def school_ranking_summary(df_rankings: pd.DataFrame) -> pd.DataFrame:
@@ -1037,25 +1243,37 @@ def load_ranking(year_cfg: dict[str, Any]) -> pd.DataFrame:
     if not ranking_cfg:
         return pd.DataFrame(columns=["RankingPoz", "NazwaSzkoly", "Dzielnica"])
 
+    source_type = ranking_cfg["type"]
     cache_path = (
         resolve_path(ranking_cfg["cache_path"])
         if ranking_cfg.get("cache_path")
         else None
     )
-    if cache_path and cache_path.exists():
-        df = pd.read_excel(cache_path)
-    else:
-        source_type = ranking_cfg["type"]
-        path = ensure_source_file(ranking_cfg)
-        if source_type == "perspektywy_pdf":
-            df = parse_ranking_perspektywy_pdf(path)
-        elif source_type == "perspektywy_html":
-            df = parse_ranking_perspektywy_html(path, year=year_cfg["year"])
+    offline = bool(year_cfg.get("offline"))
+    if source_type == "perspektywy_pdf":
+        # PDF ma własny cache kluczowany treścią pliku (cache_dir).
+        df = load_ranking_perspektywy_pdf(
+            ensure_source_file(ranking_cfg, offline=offline),
+            cache_dir=(
+                resolve_path(ranking_cfg["cache_dir"])
+                if ranking_cfg.get("cache_dir")
+                else DEFAULT_PDF_CACHE_DIR
+            ),
+            workers=ranking_cfg.get("workers"),
+        )
+    elif source_type == "perspektywy_html":
+        if cache_path and cache_path.exists():
+            df = pd.read_excel(cache_path)
         else:
-            raise ValueError(f"Nieznany typ rankingu: {source_type}")
-        if cache_path:
-            cache_path.parent.mkdir(parents=True, exist_ok=True)
-            df.to_excel(cache_path, index=False)
+            df = parse_ranking_perspektywy_html(
+                ensure_source_file(ranking_cfg, offline=offline),
+                year=year_cfg["year"],
+            )
+            if cache_path:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                df.to_excel(cache_path, index=False)
+    else:
+        raise ValueError(f"Nieznany typ rankingu: {source_type}")
 
     if "RankingPozTekst" not in df.columns and "RankingPoz" in df.columns:
         df["RankingPozTekst"] = df["RankingPoz"].astype(str)
@@ -1123,16 +1341,63 @@ def load_vulcan_offer(year_cfg: dict[str, Any]) -> pd.DataFrame:
     if path.exists():
         return pd.read_excel(path)
 
-    from scripts.data_processing.get_data_vulcan_async import download_all_async
+    from scripts.data_processing.get_data_vulcan_async import (
+        VulcanRawStore,
+        discover_all_async,
+        download_all_async,
+        load_known_ids,
+        rebuild_from_raw,
+        save_known_ids,
+    )
 
     start_id = offer_cfg.get("start_id", 1)
     end_id = offer_cfg.get("end_id", 400)
-    df = asyncio.run(download_all_async(start_id, end_id, verbose=True))
+    crawl_options: dict[str, Any] = {
+        key: offer_cfg[key]
+        for key in ("concurrency", "timeout", "retries", "parse_workers")
+        if key in offer_cfg
+    }
+    raw_dir = resolve_path(offer_cfg["raw_dir"]) if offer_cfg.get("raw_dir") else None
+    if raw_dir is not None:
+        crawl_options["raw_dir"] = raw_dir
+    if raw_dir is not None and VulcanRawStore(raw_dir).page_ids():
+        logger.info("Odtwarzanie oferty Vulcan z zapisanych stron: %s", raw_dir)
+        df = rebuild_from_raw(raw_dir, parse_workers=offer_cfg.get("parse_workers"))
+    elif year_cfg.get("offline"):
+        raise OfflineSourceError(f"Tryb offline: brak oferty Vulcan {path}")
+    elif offer_cfg.get("discovery") == "adaptive":
+        known_ids_path = resolve_path(
+            offer_cfg.get("known_ids_path", "results/vulcan_known_school_ids.json")
+        )
+        discovery_options = {
+            key: offer_cfg[key]
+            for key in ("probe_step", "miss_limit", "max_id")
+            if key in offer_cfg
+        }
+        df, stats = asyncio.run(
+            discover_all_async(
+                start_id,
+                known_ids=load_known_ids(known_ids_path),
+                verbose=True,
+                **discovery_options,
+                **crawl_options,
+            )
+        )
+        save_known_ids(known_ids_path, stats["valid_ids"])
+    else:
+        df = asyncio.run(
+            download_all_async(start_id, end_id, verbose=True, **crawl_options)
+        )
     path.parent.mkdir(parents=True, exist_ok=True)
     df.to_excel(path, index=False)
     return df
 
 
+def district_resolver(cfg: dict[str, Any]) -> DistrictResolver | None:
+    path = cfg.get("granice_dzielnic")
+    return load_district_resolver(resolve_path(path) if path else None)
+
+
 def prepare_vulcan_offer(df_vulcan: pd.DataFrame, cfg: dict[str, Any]) -> pd.DataFrame:
     df_vulcan = df_vulcan.copy()
     df_vulcan["TypSzkoly"] = df_vulcan["NazwaSzkoly"].apply(get_school_type)
@@ -1159,6 +1424,134 @@ def prepare_vulcan_offer(df_vulcan: pd.DataFrame, cfg: dict[str, Any]) -> pd.Dat
     return df_vulcan
 
 
+def googlemaps_cache(cfg: dict[str, Any]) -> GoogleMapsCache:
+    """Cache SQLite Google Maps ze ścieżką i TTL z ``config.yml``."""
+    return GoogleMapsCache(
+        resolve_path(cfg.get("cache_google_maps", DEFAULT_MAPS_CACHE_FILE)),
+        geocode_ttl_days=cfg.get("cache_geokodowania_dni", DEFAULT_GEOCODE_TTL_DAYS),
+        travel_time_ttl_days=cfg.get(
+            "cache_czasow_dojazdu_dni", DEFAULT_TRAVEL_TIME_TTL_DAYS
+        ),
+    )
+
+
+def googlemaps_executor(cfg: dict[str, Any]) -> RateLimitedExecutor:
+    """Wspólny limit QPS i pula wątków dla zapytań Google Maps z ``config.yml``."""
+    return RateLimitedExecutor(
+        qps=float(cfg.get("googlemaps_qps", DEFAULT_QPS)),
+        max_workers=int(cfg.get("googlemaps_workers", DEFAULT_WORKERS)),
+        retries=int(cfg.get("googlemaps_retries", DEFAULT_RETRIES)),
+    )
+
+
+def googlemaps_client(cfg: dict[str, Any], api_key: str | None) -> Any:
+    """
+    Klient Google Maps; ``googlemaps_replay: record|replay`` w ``config.yml``
+    nagrywa albo odtwarza ruch HTTP z pliku ``googlemaps_replay_file``.
+    """
+    mode = cfg.get("googlemaps_replay")
+    if not mode:
+        import googlemaps
+
+        return googlemaps.Client(key=api_key)
+    path = resolve_path(cfg.get("googlemaps_replay_file") or DEFAULT_REPLAY_FILE)
+    logger.info("Google Maps w trybie %s (%s)", mode, path)
+    return build_replay_client(mode, path, api_key=api_key)
+
+
+LOCATION_COLUMNS = ["CzasDojazdu", "SzkolaLat", "SzkolaLon"]
+COORDINATE_COLUMNS = ["SzkolaLat", "SzkolaLon"]
+
+
+def stored_locations(
+    location_cache: pd.DataFrame | None,
+    home_address: str,
+    table_path: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Znane lokalizacje szkół po znormalizowanym adresie (indeks tabeli).
+
+    Łączy ``czasy_dojazdu.xlsx`` (pierwszeństwo) z ``location_cache``. Czas
+    dojazdu zostaje tylko w wierszach z ``AdresDomowy`` równym bieżącemu
+    adresowi domowemu; tabela bez tej kolumny wnosi same współrzędne.
+    """
+    table_path = table_path or CZASY_DOJAZDU_FILE
+    frames = []
+    if table_path.exists():
+        frames.append(pd.read_excel(table_path))
+    if location_cache is not None and not location_cache.empty:
+        frames.append(location_cache.copy())
+    frames = [df for df in frames if {"AdresSzkoly", "SzkolaLat"} <= set(df.columns)]
+    if not frames:
+        return pd.DataFrame(columns=LOCATION_COLUMNS)
+    home_key = normalize_address(home_address)
+    for frame in frames:
+        if "AdresDomowy" in frame.columns:
+            same_home = frame["AdresDomowy"].map(normalize_address) == home_key
+        else:
+            same_home = pd.Series(False, index=frame.index)
+        times = frame["CzasDojazdu"] if "CzasDojazdu" in frame else None
+        frame["CzasDojazdu"] = pd.to_numeric(
+            pd.Series(times, index=frame.index), errors="coerce"
+        ).where(same_home & (home_key != ""))
+    table = pd.concat(frames, ignore_index=True)
+    for col in LOCATION_COLUMNS:
+        if col not in table.columns:
+            table[col] = None
+        table[col] = pd.to_numeric(table[col], errors="coerce")
+    table["AdresKlucz"] = table["AdresSzkoly"].map(normalize_address)
+    table = table.dropna(subset=["SzkolaLat", "SzkolaLon"])
+    table = table[table["AdresKlucz"] != ""]
+    table = table.sort_values(
+        "CzasDojazdu", key=lambda values: values.isna(), kind="stable"
+    )
+    return table.drop_duplicates("AdresKlucz").set_index("AdresKlucz")[LOCATION_COLUMNS]
+
+
+def plan_location_refresh(
+    df_schools: pd.DataFrame, stored: pd.DataFrame
+) -> tuple[pd.Series, list[str]]:
+    """
+    Dzieli szkoły na znane i wymagające geokodowania.
+
+    Zwraca maskę szkół, których adres (po ``normalize_address``) ma już
+    współrzędne, oraz listę ``PelenAdres`` nowych lub zmienionych adresów do
+    pobrania. Czasy dojazdu idą zawsze przez ``GoogleMapsCache``, który
+    pilnuje ich ważności i godziny wyjazdu.
+    """
+    keys = df_schools["AdresSzkoly"].map(normalize_address)
+    complete = stored.dropna(subset=COORDINATE_COLUMNS)
+    known = keys.isin(complete.index) & (keys != "")
+    changed = df_schools.loc[~known, "PelenAdres"].dropna().unique().tolist()
+    logger.info(
+        "Lokalizacje przyrostowo: %s adresów bez zmian (pominięte geokodowanie), "
+        "%s nowych lub zmienionych do pobrania",
+        keys[known].nunique(),
+        len(changed),
+    )
+    return known, changed
+
+
+def fill_known_locations(
+    df_schools: pd.DataFrame,
+    stored: pd.DataFrame,
+    mask: pd.Series | None = None,
+    columns: list[str] = LOCATION_COLUMNS,
+) -> pd.DataFrame:
+    """Uzupełnia ``columns`` z ``stored`` po adresie (dla ``mask``)."""
+    df_schools = df_schools.copy()
+    if mask is None:
+        mask = df_schools["SzkolaLat"].isna() | df_schools["SzkolaLon"].isna()
+    if stored.empty or not mask.any():
+        return df_schools
+    keys = df_schools.loc[mask, "AdresSzkoly"].map(normalize_address)
+    for col in columns:
+        values = keys.map(stored[col])
+        df_schools[col] = pd.to_numeric(df_schools[col], errors="coerce")
+        df_schools.loc[mask, col] = values.combine_first(df_schools.loc[mask, col])
+    return df_schools
+
+
 def attach_location_data(
     df_schools: pd.DataFrame,
     cfg: dict[str, Any],
@@ -1166,11 +1559,12 @@ def attach_location_data(
 ) -> pd.DataFrame:
     df_schools = df_schools.copy()
     api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-    should_fetch = bool(cfg.get("pobierz_nowe_czasy", True) and api_key)
+    replaying = cfg.get("googlemaps_replay") == "replay"
+    should_fetch = bool(cfg.get("pobierz_nowe_czasy", True) and (api_key or replaying))
 
     if should_fetch:
         try:
-            import googlemaps
+            import googlemaps  # noqa: F401 (sprawdzenie, czy pakiet jest dostępny)
         except ImportError:
             logger.warning("Brak pakietu googlemaps; używam cache lokalizacji.")
         else:
@@ -1180,34 +1574,83 @@ def attach_location_data(
                     + ", "
                     + df_schools["AdresSzkoly"].str.strip()
                 )
-                addresses = df_schools["PelenAdres"].dropna().unique().tolist()
-                client = googlemaps.Client(key=api_key)
+                incremental = bool(cfg.get("lokalizacje_przyrostowo", True))
+                stored = stored_locations(location_cache, cfg["adres_domowy"])
+                if incremental:
+                    known, addresses = plan_location_refresh(df_schools, stored)
+                else:
+                    known = pd.Series(False, index=df_schools.index)
+                    addresses = df_schools["PelenAdres"].dropna().unique().tolist()
+                executor = googlemaps_executor(cfg)
+                gmaps = googlemaps_client(cfg, api_key)
+                client = executor.wrap(gmaps)
                 departure_timestamp = get_next_weekday_time(
                     cfg.get("departure_hour", 7), cfg.get("departure_minute", 30)
                 )
-                travel_times = {}
                 batch_size = cfg.get("googlemaps_batch_size", 25)
-                for i in range(0, len(addresses), batch_size):
-                    batch = addresses[i : i + batch_size]
-                    travel_times.update(
-                        get_travel_times_batch(
-                            gmaps=client,
-                            origin_address=cfg["adres_domowy"],
-                            destination_addresses=batch,
-                            mode="transit",
-                            departure_time=departure_timestamp,
-                        )
+                fetched = {"routes": 0, "geocodes": 0}
+
+                def fetch_travel_times(missing: list[str]) -> dict[str, Any]:
+                    fetched["routes"] += len(missing)
+                    minutes = compute_travel_matrix(
+                        client,
+                        [cfg["adres_domowy"]],
+                        missing,
+                        mode="transit",
+                        departure_time=departure_timestamp,
+                        executor=executor,
+                        max_destinations=batch_size,
+                    )[0]
+                    return {
+                        address: None if pd.isna(value) else float(value)
+                        for address, value in zip(missing, minutes)
+                    }
+
+                def fetch_coordinates(missing: list[str]) -> dict[str, Any]:
+                    fetched["geocodes"] += len(missing)
+                    return get_coordinates_for_addresses_batch(
+                        client, missing, executor=executor
                     )
-                    time.sleep(0.25)
-                coordinates = get_coordinates_for_addresses_batch(client, addresses)
+
+                all_addresses = df_schools["PelenAdres"].dropna().unique().tolist()
+                maps_cache = googlemaps_cache(cfg)
+                try:
+                    travel_times = cached_travel_times(
+                        maps_cache,
+                        cfg["adres_domowy"],
+                        all_addresses,
+                        fetch_travel_times,
+                        mode="transit",
+                        departure_time=departure_timestamp,
+                    )
+                    coordinates: dict[str, Any] = {}
+                    if addresses:
+                        coordinates = cached_coordinates(
+                            maps_cache, addresses, fetch_coordinates
+                        )
+                finally:
+                    maps_cache.close()
+                logger.info(
+                    "Odświeżenie lokalizacji (%s adresów): czasy dojazdu %s z cache, "
+                    "%s pobranych; geokodowanie %s pominiętych, %s pobranych",
+                    len(all_addresses),
+                    len(all_addresses) - fetched["routes"],
+                    fetched["routes"],
+                    len(all_addresses) - fetched["geocodes"],
+                    fetched["geocodes"],
+                )
+                gmaps.session.close()  # zapisuje nagranie w trybie record
                 df_schools["CzasDojazdu"] = df_schools["PelenAdres"].map(travel_times)
                 df_schools["SzkolaLat"] = df_schools["PelenAdres"].map(
-                    lambda addr: coordinates.get(addr, (None, None))[0]
+                    lambda addr: (coordinates.get(addr) or (None, None))[0]
                 )
                 df_schools["SzkolaLon"] = df_schools["PelenAdres"].map(
-                    lambda addr: coordinates.get(addr, (None, None))[1]
+                    lambda addr: (coordinates.get(addr) or (None, None))[1]
                 )
                 df_schools.drop(columns=["PelenAdres"], inplace=True)
+                df_schools = fill_known_locations(
+                    df_schools, stored, known, columns=COORDINATE_COLUMNS
+                )
                 df_schools[
                     [
                         "SzkolaIdentyfikator",
@@ -1216,7 +1659,9 @@ def attach_location_data(
                         "SzkolaLat",
                         "SzkolaLon",
                     ]
-                ].drop_duplicates().to_excel(CZASY_DOJAZDU_FILE, index=False)
+                ].drop_duplicates().assign(AdresDomowy=cfg["adres_domowy"]).to_excel(
+                    CZASY_DOJAZDU_FILE, index=False
+                )
                 return df_schools
             except Exception as exc:
                 logger.warning(
@@ -1262,6 +1707,10 @@ def attach_location_data(
     for col in ["CzasDojazdu", "SzkolaLat", "SzkolaLon"]:
         if col not in df_schools.columns:
             df_schools[col] = None
+    if cfg.get("lokalizacje_przyrostowo", True) and "AdresSzkoly" in df_schools:
+        # Szkoły bez dopasowania po identyfikatorze: lokalizacja po adresie.
+        stored = stored_locations(location_cache, cfg.get("adres_domowy", ""))
+        df_schools = fill_known_locations(df_schools, stored)
     return df_schools
 
 
@@ -1314,14 +1763,24 @@ def add_common_class_columns(df_classes: pd.DataFrame) -> pd.DataFrame:
 def load_pzo_offer_tables(year_cfg: dict[str, Any]) -> dict[str, pd.DataFrame]:
     offer_cfg = year_cfg["offer"]
     path = resolve_path(offer_cfg["path"])
+    if has_parquet_tables(path):
+        return read_parquet_tables(path)
     if path.is_dir():
         return build_pzo_tables(load_pzo_snapshot_files(path))
     if path.suffix.lower() in {".xlsx", ".xlsm", ".xls"} and path.exists():
+        parquet_dir = parquet_dir_for_xlsx(path)
+        if (
+            has_parquet_tables(parquet_dir)
+            and (parquet_dir / "schools.parquet").stat().st_mtime
+            >= path.stat().st_mtime
+        ):
+            logger.info("Wczytywanie tabel PZO z Parquet: %s", parquet_dir)
+            return read_parquet_tables(parquet_dir)
         excel = pd.ExcelFile(path)
         return {
             sheet: pd.read_excel(excel, sheet_name=sheet) for sheet in excel.sheet_names
         }
-    if offer_cfg.get("auto_download", True):
+    if offer_cfg.get("auto_download", True) and not year_cfg.get("offline"):
         raw_dir = path if not path.suffix else path.with_suffix("")
         logger.info(
             "Brak lokalnego snapshotu PZO w %s; pobieram publiczny snapshot.",
@@ -1915,6 +2374,7 @@ def build_school_details(df_schools: pd.DataFrame) -> pd.DataFrame:
         "Email",
         "WWW",
         "OfertaPzoUrl",
+        "LogoHash",
         "OpisSzkolyPreview",
         "OpisSzkolyMarkdown",
         "year",
@@ -2078,12 +2538,15 @@ def build_vulcan_year(
         historical_thresholds, how="left", on="SzkolaIdentyfikator"
     )
     df_schools = attach_location_data(df_schools, cfg, location_cache)
+    # Dzielnica z granic wg współrzędnych; kod pocztowy tylko przy ich braku.
+    df_schools = assign_districts(df_schools, district_resolver(cfg))
     df_schools["url"] = (
         "https://warszawa.edu.com.pl/kandydat/app/offer_school_details.xhtml?schoolId="
         + df_schools["IdSzkoly"].astype(str)
     )
 
     school_metric_cols = [
+        "Dzielnica",
         "CzasDojazdu",
         "SzkolaLat",
         "SzkolaLon",
@@ -2104,6 +2567,7 @@ def build_vulcan_year(
     school_metrics = df_schools[
         school_metric_keys + school_metric_cols
     ].drop_duplicates(school_metric_keys)
+    df_classes = df_classes.drop(columns=["Dzielnica"], errors="ignore")
     df_classes = df_classes.merge(
         school_metrics,
         how="left",
@@ -2140,7 +2604,6 @@ def _append_duplicate_suffix(df: pd.DataFrame) -> pd.DataFrame:
 def build_pzo_year(
     year_cfg: dict[str, Any], cfg: dict[str, Any], location_cache: pd.DataFrame
 ) -> dict[str, pd.DataFrame]:
-    _ = cfg
     pzo_tables = load_pzo_offer_tables(year_cfg)
     df_schools = pzo_tables.get("schools", pd.DataFrame()).copy()
     df_classes = pzo_tables.get("classes", pd.DataFrame()).copy()
@@ -2168,6 +2631,7 @@ def build_pzo_year(
         else ""
     )
     df_schools = attach_pzo_cached_travel_time(df_schools, location_cache)
+    df_schools = assign_districts(df_schools, district_resolver(cfg), overwrite=False)
 
     ranking_cols = ["SzkolaIdentyfikator", "RankingPoz", "RankingPozTekst"]
     if not df_ranking.empty and set(ranking_cols).issubset(df_ranking.columns):
@@ -2406,7 +2870,18 @@ def export_app_workbook(
     logger.info("Zapisano plik aplikacyjny: %s", output_path)
 
 
-def run_pipeline(year: int | None = None) -> Path:
+def run_pipeline(
+    year: int | None = None, offline: bool = False, refresh: bool = False
+) -> Path:
+    """
+    Buduje dane aplikacji dla wskazanego roku (albo wszystkich lat).
+
+    ``refresh`` odpytuje warunkowo wszystkie źródła z ``source_url`` przed
+    przetwarzaniem; ``offline`` sprawdza od razu, czy wszystkie wejścia są
+    lokalnie, i wyłącza pobieranie (także czasów dojazdu).
+    """
+    if offline and refresh:
+        raise ValueError("Nie można łączyć trybu offline z odświeżaniem źródeł.")
     cfg = project_config()
     sources = source_config()
     years_config = sources["years"]
@@ -2419,6 +2894,17 @@ def run_pipeline(year: int | None = None) -> Path:
             selected_configs.append(value)
     if not selected_configs:
         raise ValueError(f"Nie znaleziono konfiguracji dla roku {year}")
+    if offline:
+        missing = missing_offline_inputs(selected_configs)
+        if missing:
+            raise OfflineSourceError(
+                "Tryb offline: brak lokalnych wejść:\n" + "\n".join(missing)
+            )
+        if cfg.get("googlemaps_replay") != "replay":
+            cfg = cfg | {"pobierz_nowe_czasy": False}
+        selected_configs = [value | {"offline": True} for value in selected_configs]
+    elif refresh:
+        refresh_configured_sources(selected_configs)
 
     location_cache = load_location_cache()
     datasets = []
@@ -2451,12 +2937,24 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Rok danych do zbudowania. Brak wartosci buduje wszystkie lata z konfiguracji.",
     )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Bez sieci: przerwij od razu, jesli brakuje lokalnego wejscia.",
+    )
+    parser.add_argument(
+        "--refresh-sources",
+        action="store_true",
+        help="Sprawdz zrodla warunkowo (ETag/Last-Modified) i pobierz zmienione.",
+    )
     return parser.parse_args(argv)
 
 
 def main(argv: list[str] | None = None) -> Path:
     args = parse_args(argv)
-    return run_pipeline(year=args.year)
+    return run_pipeline(
+        year=args.year, offline=args.offline, refresh=args.refresh_sources
+    )
 
 
 if __name__ == "__main__":
@@ -1,8 +1,10 @@
+import base64
 import html
 import folium
 from folium.plugins import MarkerCluster, Fullscreen, LocateControl, HeatMap
 import logging
 import math
+import mimetypes
 import os
 from pathlib import Path
 import pandas as pd
@@ -17,6 +19,7 @@ logger = logging.getLogger(__name__)
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+from scripts.analysis.spatial_index import KM_PER_DEGREE_LAT, SpatialIndex
 from scripts.pipeline import extract_class_type
 from scripts.pipeline import language_options_for_row
 
@@ -25,6 +28,7 @@ APP_DATA_FILE = RESULTS_DIR / "app" / "licea_warszawa.xlsx"
 DATA_PATTERN = "LO_Warszawa_2025_*.xlsx"
 MAP_OUTPUT_FILENAME = "mapa_licea_warszawa.html"
 WARSAW_CENTER_COORDS = [52.2297, 21.0122]  # Współrzędne centrum Warszawy
+LOGO_EMBED_MAX_BYTES = 32 * 1024  # Większe logo nie trafia do HTML mapy
 
 
 def get_latest_xls_file(directory: Path, pattern: str) -> Path | None:
@@ -187,6 +191,44 @@ def _safe_popup_text(value: Any, fallback: str = "") -> str:
     return html.escape(text, quote=False)
 
 
+def _logo_css_class(path: Path | None, embedded: dict[Path, tuple[str, str]]) -> str:
+    """
+    Rejestruje lokalne logo jako klasę CSS i zwraca jej nazwę.
+
+    Każdy plik trafia do mapy raz (data URI w ``<style>``), a popupy tylko
+    odwołują się do klasy; pliki większe niż ``LOGO_EMBED_MAX_BYTES`` są
+    pomijane, żeby nie powiększać HTML mapy.
+    """
+    if path is None:
+        return ""
+    if path in embedded:
+        return embedded[path][0]
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return ""
+    if len(data) > LOGO_EMBED_MAX_BYTES:
+        logger.info("Pomijam logo %s (%s B) w mapie.", path.name, len(data))
+        return ""
+    mime_type = mimetypes.guess_type(path.name)[0] or "image/png"
+    encoded = base64.b64encode(data).decode("ascii")
+    css_class = f"pzo-logo-{len(embedded)}"
+    embedded[path] = (css_class, f"data:{mime_type};base64,{encoded}")
+    return css_class
+
+
+def _logo_style_html(embedded: dict[Path, tuple[str, str]]) -> str:
+    rules = [
+        ".pzo-logo{display:block; float:right; width:96px; height:48px; "
+        "margin-left:6px; background:no-repeat right top/contain}"
+    ]
+    rules += [
+        f".{css_class}{{background-image:url('{uri}')}}"
+        for css_class, uri in embedded.values()
+    ]
+    return "<style>" + "".join(rules) + "</style>"
+
+
 def _safe_map_coordinate(value: Any) -> float | None:
     try:
         number = float(value)
@@ -236,8 +278,13 @@ def find_school_by_map_point(
     tooltip: Any = None,
     popup: Any = None,
     max_distance_degrees: float = 0.0008,
+    spatial_index: SpatialIndex | None = None,
 ) -> str | None:
-    """Zwraca identyfikator szkoły najbliższej klikniętemu znacznikowi mapy."""
+    """Zwraca identyfikator szkoły najbliższej klikniętemu znacznikowi mapy.
+
+    `spatial_index` to indeks zbudowany z `df_schools` (etykiety = jej indeks);
+    bez niego budujemy go na potrzeby jednego zapytania.
+    """
     if df_schools.empty or {"SzkolaLat", "SzkolaLon"}.difference(df_schools.columns):
         return None
 
@@ -246,16 +293,14 @@ def find_school_by_map_point(
         return None
     lat, lon = lat_lon
 
-    school_lat = pd.to_numeric(df_schools["SzkolaLat"], errors="coerce")
-    school_lon = pd.to_numeric(df_schools["SzkolaLon"], errors="coerce")
-    distance_sq = (school_lat - lat) ** 2 + (school_lon - lon) ** 2
-    distance_sq = distance_sq.dropna()
-    if distance_sq.empty:
-        return None
-
-    nearby_indices = distance_sq[distance_sq.le(max_distance_degrees**2)].index
-    if nearby_indices.empty:
+    if spatial_index is None:
+        spatial_index = SpatialIndex.from_frame(df_schools)
+    nearby = spatial_index.query_radius(
+        lat, lon, max_distance_degrees * KM_PER_DEGREE_LAT
+    )
+    if nearby.empty:
         return None
+    nearby_indices = nearby.index
 
     popup_school_id = _school_id_from_popup(popup)
     if popup_school_id:
@@ -269,8 +314,7 @@ def find_school_by_map_point(
     if tooltip_school_id:
         return tooltip_school_id
 
-    closest_idx = distance_sq.idxmin()
-    return _row_school_id(df_schools.loc[closest_idx])
+    return _row_school_id(df_schools.loc[nearby_indices[0]])
 
 
 def display_cell(value: Any, fallback: str = "—") -> str:
@@ -836,6 +880,7 @@ def add_school_markers_to_map(
     origin_lat: float | None = None,
     origin_lon: float | None = None,
     show_details_hint: bool = False,
+    logo_lookup: Callable[[Any], Path | None] | None = None,
 ) -> None:
     """
     Dodaje markery szkół do obiektu mapy Folium.
@@ -844,6 +889,10 @@ def add_school_markers_to_map(
     Gdy podane origin_lat/origin_lon, do popupu każdej szkoły dodawany jest
     link „🚌 Sprawdź dojazd z Twojego punktu" prowadzący do Google Maps z trasą
     transit od punktu startowego użytkownika. Nie wymaga klucza API.
+
+    ``logo_lookup`` zamienia ``LogoHash`` na lokalny plik logo (np.
+    ``AssetStore.logo_path``); każde logo jest osadzane w mapie raz, jako
+    klasa CSS używana przez popupy.
     """
     if df_schools_to_display.empty:
         # print("Brak szkół do wyświetlenia na mapie po zastosowaniu filtrów.") # Handled by caller
@@ -851,6 +900,7 @@ def add_school_markers_to_map(
 
     cluster = MarkerCluster()
     cluster.add_to(folium_map_object)
+    logos: dict[Path, tuple[str, str]] = {}
 
     for _, row in df_schools_to_display.iterrows():
         school_lat = _safe_map_coordinate(row.get("SzkolaLat"))
@@ -875,6 +925,10 @@ def add_school_markers_to_map(
             "style='display:none'></span>"
             f"<b>{school_name}</b><br>"
         )
+        if logo_lookup is not None:
+            logo_class = _logo_css_class(logo_lookup(row.get("LogoHash")), logos)
+            if logo_class:
+                popup_html = f"<span class='pzo-logo {logo_class}'></span>" + popup_html
         nav_url = "https://www.google.com/maps/dir/?api=1&destination=" f"{destination}"
         popup_html += (
             f"Adres: <a href='{nav_url}' target='_blank' "
@@ -1007,6 +1061,10 @@ def add_school_markers_to_map(
             tooltip=tooltip_text,
         ).add_to(cluster)
 
+    if logos:
+        root = folium_map_object.get_root()
+        root.header.add_child(folium.Element(_logo_style_html(logos)))  # type: ignore[attr-defined]
+
 
 def _add_heatmap_toggle(map_obj: folium.Map, heat_layer: HeatMap) -> None:
     """Dodaje prosty przycisk do włączania i wyłączania warstwy HeatMap."""
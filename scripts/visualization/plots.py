@@ -21,6 +21,7 @@ from config.constants import (
     WARSAW_CENTER_LAT,
     WARSAW_CENTER_LON,
 )
+from analysis.spatial_index import SpatialIndex
 
 # ---------------------------------------------------------------------------
 # Helpery
@@ -509,16 +510,8 @@ def scatter_density_vs_rank(df_szkoly_param: pd.DataFrame, radius_km: float = 1.
         print("Brak współrzędnych – pomijam scatter density vs rank.")
         return None
     df = df_szkoly_param.copy()
-    lat = np.radians(df["SzkolaLat"].values)
-    lon = np.radians(df["SzkolaLon"].values)
-    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
-    dlon = lon[:, None] - lon
-    cos_val = (sin_lat[:, None] * sin_lat) + (cos_lat[:, None] * cos_lat) * np.cos(dlon)
-    cos_val = np.clip(cos_val, -1.0, 1.0)
-    d = np.arccos(cos_val)
-    dist_km = 6371.0 * d
-    np.fill_diagonal(dist_km, np.inf)
-    df["Nearby1km"] = (dist_km <= radius_km).sum(axis=1)
+    counts = SpatialIndex.from_frame(df).neighbour_counts(radius_km)
+    df["Nearby1km"] = counts.to_numpy()
     fig, ax = plt.subplots(figsize=(8, 6))
     ax.scatter(df["Nearby1km"], df["RankingPoz"], s=60, alpha=0.7, edgecolor="k")
     ax.set_xlabel(f"Liczba liceów w promieniu {radius_km} km")
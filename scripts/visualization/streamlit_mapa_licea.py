@@ -9,6 +9,7 @@ st.set_page_config(
 import logging
 import sys
 import os
+import sqlite3
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -116,13 +117,21 @@ from visualization.generate_map import (
 from visualization import plots
 from visualization.release_notes import load_latest_release_notes
 from analysis.score import (
-    add_distance_from_point,
+    add_travel_time_from_grid,
     haversine_km,
     score_personalized_classes,
     select_start_point,
     shortlist_schools_by_distance,
 )
+from analysis.spatial_index import SpatialIndex
+from analysis.travel_time_grid import TravelTimeGrid, load_travel_time_grid
 from api_clients.googlemaps_api import build_gmaps_client, geocode_address
+from api_clients.googlemaps_cache import (
+    DEFAULT_CACHE_FILE as DEFAULT_MAPS_CACHE_FILE,
+    GoogleMapsCache,
+)
+from data_processing.address_index import AddressIndex, load_address_index
+from data_processing.pzo_assets import DEFAULT_ASSET_DIR, INDEX_FILE_NAME, AssetStore
 
 RELEASE_NOTES_URL = (
     "https://github.com/pszanser/licea-warszawa/blob/main/HISTORIA_ZMIAN.md"
@@ -139,6 +148,7 @@ FIT_DISPLAY_COLUMNS = {
     "NazwaSzkoly": "Szkoła",
     "OddzialNazwa": "Klasa",
     "OdlegloscKm": "Odległość km",
+    "CzasDojazduMin": "Czas dojazdu min",
     "AdmitMargin": "Margines pkt",
     "RyzykoProgu": "Ryzyko progu",
     "RankingPoz": "Ranking",
@@ -167,6 +177,7 @@ FIT_START_POINT_KEY = "fit_start_point"
 FIT_START_POINT_HINT_KEY = "fit_start_point_hint_shown"
 FIT_LAST_MAP_CLICK_KEY = "fit_last_map_click"
 FIT_START_POINT_FEEDBACK_KEY = "fit_start_point_feedback"
+FIT_ADDRESS_SUGGESTIONS_KEY = "fit_address_suggestions"
 PZO_MAP_SELECTED_SCHOOL_KEY = "pzo_map_selected_school_id"
 FIT_SCHOOL_SUMMARY_COLUMNS = [
     "FitScore",
@@ -175,6 +186,7 @@ FIT_SCHOOL_SUMMARY_COLUMNS = [
     "OddzialNazwa",
     "Liczba pasujących klas",
     "OdlegloscKm",
+    "CzasDojazduMin",
     "RankingScore",
     "AdmissionScore",
     "DistanceScore",
@@ -288,18 +300,69 @@ def _format_start_point(lat: float, lon: float) -> str:
     return f"{lat:.5f}, {lon:.5f}"
 
 
+@st.cache_resource(show_spinner=False)
+def _maps_cache() -> GoogleMapsCache | None:
+    """Trwały cache geokodowania (SQLite); None, gdy katalog jest tylko do odczytu."""
+    try:
+        return GoogleMapsCache(DEFAULT_MAPS_CACHE_FILE)
+    except sqlite3.Error:
+        return None
+
+
+@st.cache_resource(show_spinner=False)
+def _travel_time_grid() -> TravelTimeGrid | None:
+    """Siatka czasów dojazdu (``travel_time_grid.py``); None, gdy jej nie zbudowano."""
+    return load_travel_time_grid()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def _school_spatial_index(_df_schools: pd.DataFrame, fingerprint: int) -> SpatialIndex:
+    """Indeks współrzędnych szkół; ``fingerprint`` identyfikuje zestaw wierszy."""
+    return SpatialIndex.from_frame(_df_schools)
+
+
+def _spatial_index_for(df_schools: pd.DataFrame) -> SpatialIndex:
+    columns = [
+        col
+        for col in ("SzkolaIdentyfikator", "SzkolaLat", "SzkolaLon")
+        if col in df_schools.columns
+    ]
+    fingerprint = int(pd.util.hash_pandas_object(df_schools[columns]).sum())
+    return _school_spatial_index(df_schools, fingerprint)
+
+
+@st.cache_resource(show_spinner=False)
+def _address_index() -> AddressIndex | None:
+    """Lokalne punkty adresowe Warszawy; None, gdy brak pliku."""
+    return load_address_index()
+
+
 @st.cache_data(ttl=24 * 3600, show_spinner=False)
 def _geocode_address_cached(address: str) -> tuple[float, float] | None:
-    """Geokoduje adres przez Google Maps z cache 24h. Zwraca None gdy brak klucza/wyniku."""
+    """Geokoduje adres przez Google Maps z cache 24h i trwałym cache SQLite.
+
+    Zwraca None gdy brak klucza/wyniku.
+    """
+    maps_cache = _maps_cache()
+    if maps_cache is not None:
+        cached = maps_cache.get_coordinates([address]).get(address)
+        if cached is not None:
+            return cached
     gmaps = build_gmaps_client()
     if gmaps is None:
         return None
-    return geocode_address(
+    coords = geocode_address(
         gmaps,
         address,
         region="pl",
         components={"administrative_area": "mazowieckie"},
     )
+    if maps_cache is not None and coords is not None:
+        try:
+            maps_cache.put_coordinates({address: coords})
+        except sqlite3.Error:
+            pass
+    return coords
 
 
 def _normalize_address(address: str) -> str:
@@ -348,6 +411,23 @@ def _summarize_best_schools_for_display(fit_results: pd.DataFrame) -> pd.DataFra
     return best_schools[summary_cols].copy()
 
 
+@st.cache_resource(ttl=3600, show_spinner=False)
+def _pzo_asset_store() -> AssetStore | None:
+    """Lokalny magazyn logo PZO (``pzo_assets.py``), jeśli został zsynchronizowany."""
+    if not (DEFAULT_ASSET_DIR / INDEX_FILE_NAME).exists():
+        return None
+    return AssetStore(DEFAULT_ASSET_DIR)
+
+
+def _render_school_logo(source: pd.Series) -> None:
+    asset_store = _pzo_asset_store()
+    if asset_store is None:
+        return
+    logo_path = asset_store.logo_path(source.get("LogoHash"))
+    if logo_path is not None:
+        st.image(str(logo_path), width=96)
+
+
 def create_schools_map_streamlit(
     df_schools_to_display: pd.DataFrame,
     class_count_per_school: dict,
@@ -376,6 +456,7 @@ def create_schools_map_streamlit(
         except (TypeError, ValueError, IndexError):
             origin_lat = origin_lon = None
 
+    asset_store = _pzo_asset_store()
     if df_schools_to_display.empty:
         st.warning("Brak szkół do wyświetlenia na mapie po zastosowaniu filtrów.")
         # Return empty map
@@ -389,6 +470,7 @@ def create_schools_map_streamlit(
             origin_lat=origin_lat,
             origin_lon=origin_lon,
             show_details_hint=True,
+            logo_lookup=asset_store.logo_path if asset_store is not None else None,
         )
 
     if show_heatmap and not df_schools_to_display.empty:
@@ -529,6 +611,11 @@ def _build_fit_dataframe_column_config() -> dict:
             "Odległość km",
             format="%.1f km",
         ),
+        "Czas dojazdu min": st.column_config.NumberColumn(
+            "Czas dojazdu min",
+            help="Szacowany czas dojazdu z siatki czasów (komórki 250 m).",
+            format="%.0f min",
+        ),
         "Próg": st.column_config.NumberColumn(
             "Próg",
             help="Próg punktowy klasy z poprzedniego roku.",
@@ -606,6 +693,7 @@ def _school_id_from_map_state(
         map_state.get("last_object_clicked"),
         tooltip=map_state.get("last_object_clicked_tooltip"),
         popup=map_state.get("last_object_clicked_popup"),
+        spatial_index=_spatial_index_for(df_schools_to_display),
     )
 
 
@@ -844,6 +932,7 @@ def _render_pzo_class_details(
 
     with tab_school:
         source = school_detail if school_detail is not None else detail
+        _render_school_logo(source)
         _detail_metric_grid(
             [
                 ("Nazwa", source.get("NazwaSzkoly")),
@@ -892,6 +981,7 @@ def _render_pzo_map_school_details(
     )
 
     st.markdown("**Szczegóły szkoły z mapy**")
+    _render_school_logo(school_source)
     st.markdown(f"### {_display_value(school_source.get('NazwaSzkoly'))}")
     st.caption(
         f"{display_cell(school_source.get('Dzielnica'))} · "
@@ -1111,6 +1201,7 @@ Ocena to mieszanka **trzech rzeczy** (proporcja zależy od suwaków po prawej):
   - Twoje 145 pkt, klasa wymagała 160 → zapas −15 pkt → ocena ok. 10 (raczej za nisko).
 - **Bliskość** — odległość w linii prostej od Twojego punktu startowego.
   - 0 km → 100, 7 km → ok. 50, 15 km i dalej → 0.
+  - gdy dostępna jest siatka czasów dojazdu, liczy się szacowany czas: 0 min → 100, 30 min → 50, 60 min i dłużej → 0.
   - żeby sprawdzić **rzeczywisty czas dojazdu** komunikacją miejską, kliknij kolumnę **🚌 Dojazd** przy danej klasie — otworzy Google Maps z gotową trasą.
 
 **Ryzyko progu** w tabeli wynika ze wspomnianego zapasu punktów:
@@ -1152,13 +1243,17 @@ Jeśli brakuje danych dla ważonej składowej (np. rankingu albo progu), ta skł
     st.caption("Aktywne wagi: " + ", ".join(weight_parts))
     if wanted_subjects_filter:
         st.caption("Profil traktowany jako filtr: " + ", ".join(wanted_subjects_filter))
-    schools_with_distance = add_distance_from_point(
-        df_schools_to_display, start_lat, start_lon
-    )
-    shortlisted_schools = shortlist_schools_by_distance(
-        schools_with_distance,
-        limit=shortlist_limit,
-        max_distance_km=max_distance_km,
+    shortlisted_schools = add_travel_time_from_grid(
+        shortlist_schools_by_distance(
+            df_schools_to_display,
+            limit=shortlist_limit,
+            max_distance_km=max_distance_km,
+            spatial_index=_spatial_index_for(df_schools_to_display),
+            start_point=(start_lat, start_lon),
+        ),
+        _travel_time_grid(),
+        start_lat,
+        start_lon,
     )
 
     if shortlisted_schools.empty:
@@ -1170,13 +1265,13 @@ Jeśli brakuje danych dla ważonej składowej (np. rankingu albo progu), ta skł
 
     shortlisted_ids = shortlisted_schools["SzkolaIdentyfikator"].tolist()
     distance_cols = shortlisted_schools[
-        ["SzkolaIdentyfikator", "OdlegloscKm"]
+        ["SzkolaIdentyfikator", "OdlegloscKm", "CzasDojazduMin"]
     ].drop_duplicates("SzkolaIdentyfikator")
     classes_for_fit = df_filtered_classes[
         df_filtered_classes["SzkolaIdentyfikator"].isin(shortlisted_ids)
     ].copy()
     classes_for_fit = classes_for_fit.drop(
-        columns=["OdlegloscKm"], errors="ignore"
+        columns=["OdlegloscKm", "CzasDojazduMin"], errors="ignore"
     ).merge(
         distance_cols,
         on="SzkolaIdentyfikator",
@@ -1297,6 +1392,7 @@ Jeśli brakuje danych dla ważonej składowej (np. rankingu albo progu), ta skł
                 "OddzialNazwa": "Najlepsza klasa",
                 "Liczba pasujących klas": "Pasujące klasy",
                 "OdlegloscKm": "Odległość km",
+                "CzasDojazduMin": "Czas dojazdu min",
                 "RankingScore": "Ranking pkt",
                 "AdmissionScore": "Próg pkt",
                 "DistanceScore": "Bliskość pkt",
@@ -2064,7 +2160,10 @@ dopasowania).
                 allow_center=True,
             )
 
-            geocoding_available = bool(os.environ.get("GOOGLE_MAPS_API_KEY"))
+            address_index = _address_index()
+            geocoding_available = (
+                bool(os.environ.get("GOOGLE_MAPS_API_KEY")) or address_index is not None
+            )
             center_source_label = "Moja lokalizacja / środek mapy"
             source_options = ["Klik na mapie", center_source_label, "Adres"]
             start_source = st.segmented_control(
@@ -2150,14 +2249,30 @@ dopasowania).
                     _clear_start_point()
                     st.rerun()
                 if geocode_clicked and address_input.strip():
-                    normalized = _normalize_address(address_input)
-                    with st.spinner("Szukam adresu…"):
-                        coords = _geocode_address_cached(normalized)
+                    st.session_state.pop(FIT_ADDRESS_SUGGESTIONS_KEY, None)
+                    local_match = (
+                        address_index.resolve(address_input)
+                        if address_index is not None
+                        else None
+                    )
+                    if local_match is not None:
+                        coords = local_match.coordinates
+                    else:
+                        normalized = _normalize_address(address_input)
+                        with st.spinner("Szukam adresu…"):
+                            coords = _geocode_address_cached(normalized)
                     if coords is None:
                         st.error(
                             "Nie udało się znaleźć adresu. Sprawdź pisownię "
                             "lub kliknij punkt na mapie."
                         )
+                        if address_index is not None:
+                            st.session_state[FIT_ADDRESS_SUGGESTIONS_KEY] = [
+                                (match.label, match.lat, match.lon)
+                                for match in address_index.complete(
+                                    address_input, limit=6
+                                )
+                            ]
                     else:
                         distance_to_center = float(
                             haversine_km(
@@ -2184,6 +2299,22 @@ dopasowania).
                             f"Znaleziono: {_format_start_point(coords[0], coords[1])}",
                         )
                         st.rerun()
+                suggestions = st.session_state.get(FIT_ADDRESS_SUGGESTIONS_KEY) or []
+                if suggestions:
+                    st.caption("Podobne adresy:")
+                    suggestion_cols = st.columns(min(len(suggestions), 3))
+                    for i, (label, lat, lon) in enumerate(suggestions):
+                        with suggestion_cols[i % len(suggestion_cols)]:
+                            if st.button(
+                                label,
+                                key=f"fit_address_suggestion_{i}",
+                                width="stretch",
+                            ):
+                                st.session_state.pop(FIT_ADDRESS_SUGGESTIONS_KEY, None)
+                                _remember_start_point(
+                                    (lat, lon), source="adres", label=label
+                                )
+                                st.rerun()
             else:  # Klik na mapie
                 col_clear, _ = st.columns([2, 5])
                 with col_clear:
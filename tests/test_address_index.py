@@ -0,0 +1,98 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+from scripts.data_processing.address_index import (
+    AddressIndex,
+    address_key,
+    load_address_index,
+)
+
+POINTS = pd.DataFrame(
+    {
+        "ulica": ["Marszałkowska", "Marszałkowska", "Marszałkowska", "Żelazna"],
+        "numer": ["10", "2", "1A", "5"],
+        "lat": ["52.2301", "52.2302", "52.2303", "52.2304"],
+        "lon": ["21.01", "21.02", "21.03", "21.04"],
+    }
+)
+
+
+@pytest.fixture
+def tmp_dir(tmp_path):
+    return tmp_path
+
+
+def test_address_key_folds_diacritics_prefixes_city_and_postcode():
+    assert address_key("ul. Żelazna 5, 00-807 Warszawa") == "zelazna 5"
+    assert address_key("Al. Jerozolimskie 44 m. 12") == "jerozolimskie 44"
+    assert address_key("MARSZAŁKOWSKA 1a") == "marszalkowska 1a"
+    assert address_key("Marszałkowska 10/5") == "marszalkowska 10"
+    assert address_key("ul. 3 Maja 7A / 12, Warszawa") == "3 maja 7a"
+    assert address_key(None) == ""
+
+
+def test_resolve_and_complete_from_csv(tmp_dir):
+    path = tmp_dir / "adresy.csv"
+    POINTS.to_csv(path, sep=";", index=False)
+
+    index = load_address_index(path)
+
+    assert len(index) == 4
+    match = index.resolve("ul. Zelazna 5, Warszawa")
+    assert match.label == "Żelazna 5" and match.coordinates == (52.2304, 21.04)
+    assert index.resolve("Żelazna 7") is None
+    assert index.resolve("") is None
+    labels = [match.label for match in index.complete("marszałk")]
+    assert labels == ["Marszałkowska 1A", "Marszałkowska 2", "Marszałkowska 10"]
+    assert [m.label for m in index.complete("ul. Marszalkowska 1")] == [
+        "Marszałkowska 1A",
+        "Marszałkowska 10",
+    ]
+    assert index.complete("Zelazna", limit=0) == []
+    assert load_address_index(tmp_dir / "brak.csv") is None
+
+
+def test_geojson_points_with_osm_tags(tmp_dir):
+    path = tmp_dir / "adresy.geojson"
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [21.0, 52.2]},
+            "properties": {"addr:street": "Plac Defilad", "addr:housenumber": "1"},
+        },
+        {"type": "Feature", "geometry": {"type": "LineString", "coordinates": []}},
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+
+    index = load_address_index(path)
+
+    assert index.resolve("pl. Defilad 1").coordinates == (52.2, 21.0)
+
+
+def test_missing_columns_are_reported():
+    with pytest.raises(ValueError, match="ulica"):
+        AddressIndex.from_frame(POINTS.drop(columns=["ulica"]))
+
+
+def test_lookups_stay_fast_on_city_sized_index():
+    streets = [f"Testowa {i}" for i in range(1000)]
+    df = pd.DataFrame(
+        [
+            {"ulica": street, "numer": str(n), "lat": 52.2, "lon": 21.0}
+            for street in streets
+            for n in range(1, 51)
+        ]
+    )
+    index = AddressIndex.from_frame(df)
+    queries = [f"ul. {street} {n}" for street in streets[:200] for n in (1, 25)]
+
+    started = time.perf_counter()
+    found = sum(index.resolve(query) is not None for query in queries)
+    per_lookup = (time.perf_counter() - started) / len(queries)
+
+    assert found == len(queries)
+    assert per_lookup < 1e-3
+    assert len(index.complete("testowa 199", limit=3)) == 3
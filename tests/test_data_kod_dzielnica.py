@@ -1,9 +1,15 @@
+import threading
 from io import StringIO
 
 import pytest
 import pandas as pd
-from unittest.mock import patch, MagicMock
-from scripts.data_processing.get_data_kod_dzielnica import _rows_from_page, build_csv
+import requests
+from scripts.data_processing.get_data_kod_dzielnica import (
+    BASE_URL,
+    PageCache,
+    build_csv,
+    parse_rows,
+)
 
 
 @pytest.fixture
@@ -44,32 +50,60 @@ def mock_html_response():
     """
 
 
-def test_rows_from_page(mock_html_response):
-    """Test funkcji _rows_from_page przetwarzającej pojedynczą stronę."""
-    with patch("requests.get") as mock_get:
-        # Konfiguracja mocka dla requests.get
-        mock_response = MagicMock()
-        mock_response.text = mock_html_response
-        mock_get.return_value = mock_response
+def test_parse_rows(mock_html_response):
+    """Test funkcji parse_rows przetwarzającej pojedynczą stronę."""
+    expected = [
+        ("00-001", "Śródmieście"),
+        ("00-002", "Mokotów"),
+        ("01-001", "Wola"),
+    ]
+    assert parse_rows(mock_html_response) == expected
 
-        # Wywołanie funkcji i sprawdzenie wyników
-        result = _rows_from_page(1)
 
-        # Weryfikacja czy mock był wywołany z poprawnymi argumentami
-        mock_get.assert_called_once_with(
-            "https://www.kodypocztowe.info/warszawa", timeout=10
-        )
+def page_html(*rows):
+    cells = "".join(
+        f'<tr class="_data"><td class="code-row">{kod}</td><td>ul</td><td>{dzielnica}</td></tr>'
+        for kod, dzielnica in rows
+    )
+    return f"<html><body><table>{cells}</table></body></html>"
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    """Serwuje podstrony z pamięci; ``failures`` to kolejne błędy dla danego URL."""
 
-        # Sprawdzenie wyników
-        expected = [
-            ("00-001", "Śródmieście"),
-            ("00-002", "Mokotów"),
-            ("01-001", "Wola"),
-        ]
-        assert result == expected
+    def __init__(self, pages, failures=None):
+        self.pages = pages
+        self.failures = failures or {}
+        self.calls = []
+        self._lock = threading.Lock()
 
+    def get(self, url, timeout=None):
+        with self._lock:
+            self.calls.append(url)
+            pending = self.failures.get(url)
+            status = pending.pop(0) if pending else 200
+        if status == "timeout":
+            raise requests.Timeout(url)
+        page = 1 if url == BASE_URL else int(url.rsplit(":", 1)[1])
+        return FakeResponse(self.pages.get(page, ""), status_code=status)
 
-def test_build_csv(monkeypatch):
+
+@pytest.fixture
+def kody_cache_dir(tmp_path):
+    return tmp_path / "kody_cache"
+
+
+def test_build_csv(monkeypatch, kody_cache_dir):
     """
     Testuje funkcję build_csv pod kątem agregacji danych z wielu stron, usuwania duplikatów,
     sortowania oraz poprawnego zapisu do pliku CSV.
@@ -77,32 +111,13 @@ def test_build_csv(monkeypatch):
     Test sprawdza, czy plik CSV jest tworzony, zawiera oczekiwaną liczbę wierszy i kolumn,
     dane są posortowane według kodów pocztowych, a duplikaty zostały usunięte.
     """
-    # Przykładowe dane do zwrócenia przez _rows_from_page dla różnych stron
-    page_data = {
-        1: [("00-001", "Śródmieście"), ("00-002", "Mokotów")],
-        2: [
-            ("00-002", "Mokotów"),
-            ("01-001", "Wola"),
-        ],  # Duplikat kodu 00-002, powinien być usunięty
-        3: [("02-003", "Praga")],
-    }
-
-    # Mockowanie funkcji _rows_from_page
-    def mock_rows_from_page(page):
-        """
-        Zwraca dane wierszy dla podanej strony na podstawie zdefiniowanego słownika testowego.
-
-        Args:
-                page: Numer strony, dla której mają zostać zwrócone dane.
-
-        Returns:
-                Lista krotek z danymi odpowiadającymi podanej stronie lub pusta lista, jeśli brak danych.
-        """
-        return page_data.get(page, [])
-
-    monkeypatch.setattr(
-        "scripts.data_processing.get_data_kod_dzielnica._rows_from_page",
-        mock_rows_from_page,
+    # Przykładowe strony; kod 00-002 występuje na dwóch stronach
+    session = FakeSession(
+        {
+            1: page_html(("00-001", "Śródmieście"), ("00-002", "Mokotów")),
+            2: page_html(("00-002", "Mokotów"), ("01-001", "Wola")),
+            3: page_html(("02-003", "Praga")),
+        }
     )
 
     # Mockowanie stałej LAST_PAGE
@@ -122,7 +137,7 @@ def test_build_csv(monkeypatch):
     csv_path = "test_output.csv"
 
     # Wywołanie funkcji
-    df = build_csv(out_path=csv_path)
+    df = build_csv(out_path=csv_path, cache_dir=kody_cache_dir, session=session)
 
     # Sprawdzenie czy CSV został zapisany pod oczekiwaną ścieżką
     assert zapisany_csv["path"] == csv_path
@@ -140,3 +155,55 @@ def test_build_csv(monkeypatch):
 
     # Sprawdzenie czy duplikaty zostały usunięte (kod 00-002 występuje tylko raz)
     assert len(df[df["Kod"] == "00-002"]) == 1
+
+    # Drugie uruchomienie bez sieci korzysta wyłącznie z cache stron
+    offline = build_csv(out_path=csv_path, cache_dir=kody_cache_dir, offline=True)
+    assert offline.equals(df)
+
+
+def test_build_csv_retries_and_resumes_after_failure(monkeypatch, kody_cache_dir):
+    monkeypatch.setattr("scripts.data_processing.get_data_kod_dzielnica.LAST_PAGE", 4)
+    monkeypatch.setattr(pd.DataFrame, "to_csv", lambda self, *args, **kwargs: None)
+    pages = {page: page_html((f"0{page}-000", "Wola")) for page in range(1, 5)}
+    session = FakeSession(
+        pages,
+        failures={
+            f"{BASE_URL}/page:2": ["timeout", 503],
+            f"{BASE_URL}/page:3": [404],
+        },
+    )
+
+    with pytest.raises(RuntimeError, match="Nie pobrano 1 stron"):
+        build_csv(cache_dir=kody_cache_dir, session=session, retries=2, retry_backoff=0)
+    assert PageCache(kody_cache_dir).missing(range(1, 5)) == [3]
+    assert session.calls.count(f"{BASE_URL}/page:2") == 3
+
+    session.calls.clear()
+    df = build_csv(cache_dir=kody_cache_dir, session=session, retry_backoff=0)
+
+    assert session.calls == [f"{BASE_URL}/page:3"]
+    assert list(df["Kod"]) == ["01-000", "02-000", "03-000", "04-000"]
+
+
+def test_build_csv_offline_requires_complete_cache(monkeypatch, kody_cache_dir):
+    monkeypatch.setattr("scripts.data_processing.get_data_kod_dzielnica.LAST_PAGE", 2)
+    PageCache(kody_cache_dir).write(1, page_html(("00-001", "Śródmieście")))
+
+    with pytest.raises(RuntimeError, match="Nie pobrano 1 stron"):
+        build_csv(cache_dir=kody_cache_dir, offline=True)
+
+
+def test_empty_page_is_retried_and_never_cached(monkeypatch, kody_cache_dir):
+    monkeypatch.setattr("scripts.data_processing.get_data_kod_dzielnica.LAST_PAGE", 2)
+    monkeypatch.setattr(pd.DataFrame, "to_csv", lambda self, *args, **kwargs: None)
+    captcha = "<html><body><form>captcha</form></body></html>"
+    session = FakeSession({1: page_html(("00-001", "Śródmieście")), 2: captcha})
+
+    with pytest.raises(RuntimeError, match="Nie pobrano 1 stron"):
+        build_csv(cache_dir=kody_cache_dir, session=session, retries=1, retry_backoff=0)
+    assert PageCache(kody_cache_dir).missing(range(1, 3)) == [2]
+    assert session.calls.count(f"{BASE_URL}/page:2") == 2
+
+    session.pages[2] = page_html(("01-001", "Wola"))
+    df = build_csv(cache_dir=kody_cache_dir, session=session, retry_backoff=0)
+    assert list(df["Kod"]) == ["00-001", "01-001"]
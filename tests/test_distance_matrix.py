@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+
+from scripts.api_clients.distance_matrix import (
+    block_shape,
+    compute_travel_matrix,
+    plan_distance_matrix,
+)
+from scripts.api_clients.rate_limit import RateLimitedExecutor
+
+
+class FakeMatrixClient:
+    """Czas = 10 min * (numer startu) + numer celu; cel "brak" bez trasy."""
+
+    def __init__(self, fail_on=None):
+        self.requests = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def distance_matrix(self, origins, destinations, **kwargs):
+        with self._lock:
+            self.requests.append((list(origins), list(destinations), kwargs))
+        if self.fail_on and self.fail_on in destinations:
+            raise RuntimeError("INVALID_REQUEST")
+        rows = []
+        for origin in origins:
+            elements = []
+            for destination in destinations:
+                if destination == "brak":
+                    elements.append({"status": "ZERO_RESULTS"})
+                    continue
+                minutes = 10 * number(origin) + number(destination)
+                elements.append({"status": "OK", "duration": {"value": minutes * 60}})
+            rows.append({"elements": elements})
+        return {"rows": rows}
+
+
+def number(point):
+    if isinstance(point, tuple):
+        return int(point[0])
+    return int(point.split()[-1])
+
+
+def test_block_shape_minimizes_requests_within_limits():
+    assert block_shape(1, 60) == (1, 25)
+    assert block_shape(4, 25) == (4, 25)
+    assert block_shape(10, 10) == (10, 10)
+    rows, cols = block_shape(30, 40)
+    assert rows <= 25 and cols <= 25 and rows * cols <= 100
+    assert block_shape(3, 120, max_destinations=25, max_elements=100) == (3, 25)
+
+
+def test_plan_dedupes_addresses_and_coordinates():
+    plan = plan_distance_matrix(
+        ["Dom 1", " dom  1", (52.123451, 21.0), (52.123449, 21.0)],
+        ["LO 1", "lo 1, ", "LO 2"],
+    )
+
+    assert plan.origins == ["Dom 1", (52.123451, 21.0)]
+    assert plan.origin_index.tolist() == [0, 0, 1, 1]
+    assert plan.destinations == ["LO 1", "LO 2"]
+    assert plan.destination_index.tolist() == [0, 0, 1]
+    assert len(plan.blocks) == 1
+
+
+def test_compute_travel_matrix_tiles_requests_and_assembles_dense_array():
+    client = FakeMatrixClient()
+    origins = [f"Dom {i}" for i in range(1, 6)] + ["dom 1"]
+    destinations = [f"LO {j}" for j in range(1, 31)] + ["brak", "LO 1"]
+    executor = RateLimitedExecutor(qps=1000, max_workers=3)
+
+    minutes = compute_travel_matrix(
+        client, origins, destinations, departure_time=123, executor=executor
+    )
+
+    assert minutes.shape == (6, 32)
+    assert minutes[0, 0] == 11 and minutes[4, 29] == 80
+    np.testing.assert_array_equal(minutes[5], minutes[0])
+    np.testing.assert_array_equal(minutes[:, 31], minutes[:, 0])
+    assert np.isnan(minutes[:, 30]).all()
+    # 5 unikalnych startów x 31 celów: bloki 5x20 -> 2 zapytania (4x25 dałoby 4).
+    assert len(client.requests) == 2
+    for request_origins, request_destinations, kwargs in client.requests:
+        assert len(request_origins) * len(request_destinations) <= 100
+        assert kwargs["departure_time"] == 123
+
+
+def test_failed_block_leaves_nan_and_other_blocks_filled():
+    client = FakeMatrixClient(fail_on="LO 30")
+    destinations = [f"LO {j}" for j in range(1, 31)]
+
+    minutes = compute_travel_matrix(
+        client,
+        ["Dom 1"],
+        destinations,
+        executor=RateLimitedExecutor(qps=1000, max_workers=1),
+    )
+
+    assert len(client.requests) == 2
+    assert not np.isnan(minutes[0, :25]).any()
+    assert np.isnan(minutes[0, 25:]).all()
@@ -0,0 +1,127 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from scripts.data_processing.district_resolver import (
+    WARSAW_DISTRICTS,
+    DistrictResolver,
+    assign_districts,
+    load_district_resolver,
+)
+
+
+def square(lon, lat, size):
+    return [
+        [lon, lat],
+        [lon + size, lat],
+        [lon + size, lat + size],
+        [lon, lat + size],
+        [lon, lat],
+    ]
+
+
+def districts_geojson():
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"nazwa": "Mokotów"},
+                "geometry": {
+                    "type": "Polygon",
+                    # Kwadrat z dziurą, w której leży "Ochota".
+                    "coordinates": [
+                        square(21.00, 52.15, 0.06),
+                        square(21.02, 52.17, 0.02),
+                    ],
+                },
+            },
+            {
+                "type": "Feature",
+                "properties": {"nazwa": "Ochota"},
+                "geometry": {
+                    "type": "MultiPolygon",
+                    "coordinates": [
+                        [square(21.02, 52.17, 0.02)],
+                        [square(21.10, 52.30, 0.01)],
+                    ],
+                },
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def districts_file(tmp_path):
+    path = tmp_path / "dzielnice.geojson"
+    path.write_text(json.dumps(districts_geojson()), encoding="utf-8")
+    return path
+
+
+def test_resolver_handles_holes_multipolygons_and_missing_points(districts_file):
+    resolver = DistrictResolver.from_geojson(districts_file, band_height=0.01)
+
+    result = resolver.resolve(
+        [52.155, 52.18, 52.305, 52.50, None, 52.155],
+        [21.005, 21.03, 21.105, 21.00, 21.00, 20.90],
+    )
+
+    assert result.tolist() == ["Mokotów", "Ochota", "Ochota", None, None, None]
+
+
+def test_assign_districts_prefers_coordinates_and_falls_back_to_postal_code(
+    districts_file,
+):
+    resolver = load_district_resolver(districts_file)
+    schools = pd.DataFrame(
+        {
+            "Dzielnica": ["Ursynów", "Wola", None],
+            "SzkolaLat": [52.155, None, 52.18],
+            "SzkolaLon": [21.005, None, 21.03],
+        }
+    )
+
+    assigned = assign_districts(schools, resolver)
+    assert assigned["Dzielnica"].tolist() == ["Mokotów", "Wola", "Ochota"]
+
+    filled = assign_districts(schools, resolver, overwrite=False)
+    assert filled["Dzielnica"].tolist() == ["Ursynów", "Wola", "Ochota"]
+
+
+def test_load_district_resolver_without_file_keeps_postal_districts():
+    resolver = load_district_resolver(Path("tests") / "brak_granic.geojson")
+    schools = pd.DataFrame({"Dzielnica": ["Wola"], "SzkolaLat": [52.2]})
+
+    assert resolver is None
+    assert assign_districts(schools, resolver)["Dzielnica"].tolist() == ["Wola"]
+
+
+def test_geojson_names_are_mapped_to_canonical_districts(tmp_path):
+    geojson = districts_geojson()
+    geojson["features"][0]["properties"] = {"nazwa": "Praga Polnoc"}
+    geojson["features"][1]["properties"] = {"nazwa": " BIAŁOŁĘKA "}
+    path = tmp_path / "dzielnice.geojson"
+    path.write_text(json.dumps(geojson), encoding="utf-8")
+
+    resolver = DistrictResolver.from_geojson(path)
+
+    assert resolver.names.tolist() == ["Praga-Północ", "Białołęka"]
+
+    geojson["features"][1]["properties"] = {"nazwa": "Piaseczno"}
+    path.write_text(json.dumps(geojson), encoding="utf-8")
+    with pytest.raises(ValueError, match="Piaseczno"):
+        DistrictResolver.from_geojson(path)
+
+
+def test_canonical_districts_match_postal_code_reference():
+    reference = pd.read_csv(
+        Path(__file__).resolve().parents[1]
+        / "data"
+        / "reference"
+        / "waw_kod_dzielnica.csv",
+        dtype=str,
+    )
+
+    assert set(WARSAW_DISTRICTS) == set(reference["Dzielnica"].dropna())
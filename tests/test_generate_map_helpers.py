@@ -14,6 +14,7 @@ from scripts.visualization.generate_map import (
     get_default_year,
     get_language_filter_options_from_dataframe,
     get_subjects_from_dataframe,
+    LOGO_EMBED_MAX_BYTES,
     select_school_classes_for_year,
 )
 
@@ -529,3 +530,31 @@ def test_find_school_by_map_point_falls_back_to_school_identifier():
     )
 
     assert find_school_by_map_point(schools, (52.23, 21.01)) == "legacy_1"
+
+
+def test_popup_embeds_each_local_logo_once(tmp_path):
+    logo_path = tmp_path / "logo.png"
+    logo_path.write_bytes(b"\x89PNG\r\n\x1a\n")
+    big_logo = tmp_path / "big.png"
+    big_logo.write_bytes(b"\x89PNG" + b"\0" * (LOGO_EMBED_MAX_BYTES + 1))
+    logos = {"abc": logo_path, "big": big_logo}
+    df = pd.DataFrame(
+        [
+            {**_SCHOOL_ROW, "SzkolaIdentyfikator": f"lo_{i}", "LogoHash": logo}
+            for i, logo in enumerate(["abc", "abc", "abc", "big"])
+        ]
+    )
+    m = folium.Map(location=[52.23, 21.01], zoom_start=11)
+    add_school_markers_to_map(
+        folium_map_object=m,
+        df_schools_to_display=df,
+        class_count_per_school={},
+        filtered_class_details_per_school={},
+        school_summary_from_filtered={},
+        logo_lookup=logos.get,
+    )
+
+    rendered = m.get_root().render()
+    assert rendered.count("data:image/png;base64,iVBORw0KGgo") == 1
+    assert rendered.count("pzo-logo pzo-logo-0") == 3
+    assert "pzo-logo-1" not in rendered
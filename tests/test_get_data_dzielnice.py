@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from scripts.data_processing.district_resolver import DistrictResolver
+from scripts.data_processing.get_data_dzielnice import (
+    OVERPASS_URL,
+    assemble_rings,
+    districts_geojson,
+    fetch_districts,
+)
+
+
+def way(role, *points):
+    return {
+        "type": "way",
+        "role": role,
+        "geometry": [{"lon": lon, "lat": lat} for lon, lat in points],
+    }
+
+
+def overpass_response():
+    return {
+        "elements": [
+            {
+                "type": "relation",
+                "id": 1,
+                "tags": {"name": "Mokotów"},
+                "members": [
+                    # Zewnętrzny kwadrat z dwóch dróg, druga w odwrotnym kierunku.
+                    way("outer", (21.00, 52.15), (21.06, 52.15), (21.06, 52.21)),
+                    way("outer", (21.00, 52.15), (21.00, 52.21), (21.06, 52.21)),
+                    way(
+                        "inner",
+                        (21.02, 52.17),
+                        (21.04, 52.17),
+                        (21.04, 52.19),
+                        (21.02, 52.19),
+                        (21.02, 52.17),
+                    ),
+                    {"type": "node", "role": "admin_centre", "lat": 52.2, "lon": 21.0},
+                ],
+            },
+            {
+                "type": "relation",
+                "id": 2,
+                "tags": {"name": "Praga Polnoc"},
+                "members": [
+                    way(
+                        "outer",
+                        (21.02, 52.25),
+                        (21.05, 52.25),
+                        (21.05, 52.27),
+                        (21.02, 52.27),
+                        (21.02, 52.25),
+                    )
+                ],
+            },
+            {"type": "relation", "id": 3, "tags": {"name": "Piaseczno"}},
+        ]
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = []
+
+    def post(self, url, data=None, timeout=None):
+        self.calls.append((url, data))
+        return FakeResponse(self.payload)
+
+
+def test_assemble_rings_joins_ways_and_rejects_open_rings():
+    rings = assemble_rings([[(0, 0), (1, 0)], [(1, 1), (1, 0)], [(1, 1), (0, 0)]])
+
+    assert rings == [[(0, 0), (1, 0), (1, 1), (0, 0)]]
+    with pytest.raises(ValueError, match="Niedomknięty"):
+        assemble_rings([[(0, 0), (1, 0)], [(2, 2), (3, 3)]])
+
+
+def test_districts_geojson_keeps_canonical_names_and_holes():
+    geojson = districts_geojson(overpass_response())
+
+    names = [feature["properties"]["nazwa"] for feature in geojson["features"]]
+    assert names == ["Mokotów", "Praga-Północ"]
+    mokotow = geojson["features"][0]["geometry"]["coordinates"]
+    assert len(mokotow) == 1 and len(mokotow[0]) == 2
+    with pytest.raises(ValueError):
+        districts_geojson({"elements": []})
+
+
+def test_fetch_districts_writes_file_readable_by_resolver(tmp_path):
+    session = FakeSession(overpass_response())
+    output = tmp_path / "dzielnice.geojson"
+
+    fetch_districts(output, session=session)
+
+    assert session.calls[0][0] == OVERPASS_URL
+    assert "admin_level" in session.calls[0][1]["data"]
+    assert json.loads(output.read_text(encoding="utf-8"))["type"] == (
+        "FeatureCollection"
+    )
+    resolver = DistrictResolver.from_geojson(output)
+    result = resolver.resolve([52.155, 52.18, 52.26], [21.005, 21.03, 21.03])
+    assert result.tolist() == ["Mokotów", None, "Praga-Północ"]
@@ -3,10 +3,13 @@ import shutil
 import uuid
 from pathlib import Path
 
+import pandas as pd
 import pytest
 import requests
 
+from scripts.data_processing import get_data_pzo_omikron
 from scripts.data_processing.get_data_pzo_omikron import (
+    EXCEL_CELL_LIMIT,
     LABEL_CLASS_COUNT,
     LABEL_CLASS_DESCRIPTION,
     LABEL_CLASS_IDENTIFIER,
@@ -16,10 +19,17 @@ from scripts.data_processing.get_data_pzo_omikron import (
     LABEL_SECOND_LANGUAGE,
     PzoOmikronClient,
     build_tables,
+    dataframe_for_parquet,
     fetch_offer_snapshot,
+    iter_raw_school_details,
+    iter_table_batches,
     load_snapshot_files,
+    load_snapshot_index,
     parse_int_or_none,
+    read_parquet_tables,
     write_snapshot_files,
+    write_tables,
+    write_tables_streaming,
 )
 
 
@@ -355,3 +365,137 @@ def test_fetch_offer_snapshot_fails_when_school_details_fails():
 
     with pytest.raises(RuntimeError, match="schoolDetails"):
         fetch_offer_snapshot(client=client)
+
+
+def test_write_tables_parquet_keeps_full_json_without_excel_truncation(
+    raw_output_dir: Path,
+):
+    client, _session = client_with_fake_session()
+    snapshot = fetch_offer_snapshot(client=client)
+    long_value = "x" * (EXCEL_CELL_LIMIT + 100)
+    offers = snapshot["school_details"]["123"]["admissionPointList"][0][
+        "admissionPointOffersForPublic"
+    ]
+    offers[6]["offerValue"] = long_value
+    tables = build_tables(snapshot)
+
+    write_tables(tables, None, parquet_dir=raw_output_dir)
+    loaded = read_parquet_tables(raw_output_dir)
+
+    assert set(loaded) == set(tables)
+    offer_rows = loaded["offer_values_long"]
+    long_row = offer_rows[offer_rows["label"] == "Pole jeszcze niewykorzystywane"]
+    assert long_row.iloc[0]["value_raw"] == long_value
+    assert json.loads(long_row.iloc[0]["raw_json"])["offerValue"] == long_value
+    attachment = loaded["assets_manifest"][
+        loaded["assets_manifest"]["asset_kind"] == "class_attachment"
+    ].iloc[0]
+    assert json.loads(attachment["raw_json"])["hash"] == "PDF_HASH"
+    klass = loaded["classes"].iloc[0]
+    assert klass["LiczbaMiejsc"] == 30
+    assert bool(klass["HasCriteria"]) is True
+
+
+def test_dataframe_for_parquet_keeps_missing_text_values(tmp_path: Path):
+    df = pd.DataFrame(
+        {
+            "NazwaSzkoly": ["LO I", None],
+            "source_school_id": pd.Series([101, None], dtype=object),
+            "SzkolaLat": ["52.2", None],
+        }
+    )
+
+    output = dataframe_for_parquet("schools", df)
+
+    assert output["NazwaSzkoly"].dtype == "string"
+    assert output["NazwaSzkoly"].isna().tolist() == [False, True]
+    assert output["source_school_id"].tolist()[0] == "101"
+    assert output["source_school_id"].isna().tolist() == [False, True]
+    assert output["SzkolaLat"].dtype == "float64"
+    output.to_parquet(tmp_path / "schools.parquet", index=False)
+    loaded = pd.read_parquet(tmp_path / "schools.parquet")
+    assert loaded["NazwaSzkoly"].isna().tolist() == [False, True]
+
+
+def multi_school_snapshot(school_count=3):
+    client, _session = client_with_fake_session()
+    snapshot = fetch_offer_snapshot(client=client)
+    template = snapshot["school_details"]["123"]
+    for offset in range(1, school_count):
+        school_id = str(123 + offset)
+        detail = json.loads(json.dumps(template))
+        detail["schoolOffer"]["schoolLong"]["id"] = int(school_id)
+        detail["schoolOffer"]["logo"] = ""
+        detail["admissionPointCounts"] = {}
+        detail["admissionPointList"][0]["blockApply"] = None
+        snapshot["school_details"][school_id] = detail
+    return snapshot
+
+
+def test_iter_table_batches_splits_rows_per_school_batch():
+    snapshot = multi_school_snapshot(3)
+
+    batches = list(iter_table_batches(snapshot, batch_size=2))
+
+    assert [len(batch["schools"]) for batch in batches] == [2, 1]
+    assert [len(batch["classes"]) for batch in batches] == [2, 1]
+    full = build_tables(snapshot)
+    assert sum(len(batch["offer_values_long"]) for batch in batches) == len(
+        full["offer_values_long"]
+    )
+
+
+def test_write_tables_streaming_matches_in_memory_tables(raw_output_dir: Path):
+    snapshot = multi_school_snapshot(3)
+    write_snapshot_files(snapshot, raw_output_dir / "raw")
+    write_tables(build_tables(snapshot), None, parquet_dir=raw_output_dir / "full")
+
+    index = load_snapshot_index(raw_output_dir / "raw")
+    row_counts = write_tables_streaming(
+        index,
+        school_details=iter_raw_school_details(raw_output_dir / "raw"),
+        parquet_dir=raw_output_dir / "stream",
+        csv_dir=raw_output_dir / "csv",
+        batch_size=1,
+    )
+
+    assert "school_details" not in index
+    full = read_parquet_tables(raw_output_dir / "full")
+    streamed = read_parquet_tables(raw_output_dir / "stream")
+    assert row_counts["schools"] == 3
+    for name in ["schools", "classes", "offer_values_long", "assets_manifest"]:
+        assert streamed[name].equals(full[name]), name
+    assert (raw_output_dir / "csv" / "classes.csv").read_text(
+        encoding="utf-8-sig"
+    ).count("pzo:") >= 3
+
+
+def test_main_stream_after_download_reads_schools_from_raw(
+    monkeypatch, raw_output_dir: Path
+):
+    streamed = {}
+
+    def fake_write_tables_streaming(snapshot, school_details=None, **kwargs):
+        streamed["snapshot"] = snapshot
+        streamed["school_ids"] = [school_id for school_id, _ in school_details]
+        return {}
+
+    monkeypatch.setattr(
+        get_data_pzo_omikron,
+        "fetch_offer_snapshot",
+        lambda **kwargs: multi_school_snapshot(3),
+    )
+    monkeypatch.setattr(
+        get_data_pzo_omikron, "write_tables_streaming", fake_write_tables_streaming
+    )
+    monkeypatch.setattr(
+        "sys.argv",
+        ["get_data_pzo_omikron.py", "--stream", "--raw-dir", str(raw_output_dir)],
+    )
+
+    get_data_pzo_omikron.main()
+
+    assert "school_details" not in streamed["snapshot"]
+    assert streamed["school_ids"] == sorted(
+        multi_school_snapshot(3)["school_details"], key=int
+    )
@@ -1,5 +1,20 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
 import pytest
-from scripts.data_processing.get_data_vulcan_async import parse_school_html
+from aiohttp import web
+
+from scripts.data_processing.get_data_vulcan_async import (
+    VulcanRawStore,
+    benchmark_parsers,
+    discover_all_async,
+    download_all_async,
+    parse_school_html,
+    parse_school_html_fast,
+    parse_school_html_soup,
+    rebuild_from_raw,
+)
 from tests.fixtures.sample_school_html import (
     VALID_SCHOOL_HTML,
     ERROR_SCHOOL_HTML,
@@ -195,3 +210,159 @@ def test_parse_real_school_html(real_school_data):
     # Sprawdź wspólne dane dla pierwszego oddziału
     assert expected_data[0]["nazwa_szkoly_match"] in results[0][1]
     assert expected_data[0]["adres_szkoly_match"] in results[0][2]
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        VALID_SCHOOL_HTML,
+        ERROR_SCHOOL_HTML,
+        NO_GROUPS_SCHOOL_HTML,
+        HEADER_NO_TABLE_HTML,
+        INCOMPLETE_DATA_HTML,
+        REAL_SCHOOL_HTML,
+        # Encje, komentarze, puste elementy i <pre> w komórkach tabeli.
+        VALID_SCHOOL_HTML.replace("</td>", "&amp; &#260;&nbsp;&bogus x</td>", 2),
+        VALID_SCHOOL_HTML.replace("<td>", "<td><!-- uwaga -->", 3),
+        REAL_SCHOOL_HTML.replace("</td>", "a<br>b</br>c</td>", 4),
+        REAL_SCHOOL_HTML.replace("<td>", "<td><pre> \n </pre>", 4),
+    ],
+)
+def test_fast_parser_matches_beautifulsoup(html):
+    fast = parse_school_html_fast(html, 7)
+
+    assert fast is not None
+    assert fast == parse_school_html_soup(html, 7)
+
+
+def test_parse_school_html_falls_back_on_unsupported_structure():
+    # Niezamknięte komórki zagnieżdżają się w drzewie BeautifulSoup.
+    html = VALID_SCHOOL_HTML.replace("</td>", "")
+
+    assert parse_school_html_fast(html, 7) is None
+    assert parse_school_html(html, 7) == parse_school_html_soup(html, 7)
+
+
+def test_benchmark_parsers_reports_speedup_and_parity():
+    report = benchmark_parsers({1: VALID_SCHOOL_HTML, 2: REAL_SCHOOL_HTML}, repeat=1)
+
+    assert report["pages"] == 2
+    assert report["mismatches"] == []
+    assert report["fallbacks"] == []
+    assert report["fast_per_page"] > 0 and report["soup_per_page"] > 0
+
+
+@asynccontextmanager
+async def vulcan_test_server(pages, flaky_ids=()):
+    """Lokalny serwer zwracający strony szkół; ``flaky_ids`` najpierw dostają 503."""
+    hits = {}
+
+    async def school_details(request):
+        school_id = int(request.query["schoolId"])
+        hits[school_id] = hits.get(school_id, 0) + 1
+        if school_id in flaky_ids and hits[school_id] == 1:
+            return web.Response(status=503)
+        if school_id not in pages:
+            return web.Response(text=ERROR_SCHOOL_HTML, content_type="text/html")
+        return web.Response(text=pages[school_id], content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/offer_school_details.xhtml", school_details)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"http://127.0.0.1:{port}/offer_school_details.xhtml?schoolId={{school_id}}", hits
+    finally:
+        await runner.cleanup()
+
+
+def test_download_all_async_parses_off_loop_and_retries_transient_errors():
+    async def crawl():
+        pages = {2: VALID_SCHOOL_HTML, 4: REAL_SCHOOL_HTML}
+        async with vulcan_test_server(pages, flaky_ids={4}) as (url_template, hits):
+            df = await download_all_async(
+                1,
+                5,
+                verbose=False,
+                concurrency=2,
+                timeout=10,
+                retries=1,
+                retry_backoff=0,
+                parse_workers=1,
+                url_template=url_template,
+            )
+        return df, hits
+
+    df, hits = asyncio.run(crawl())
+
+    assert df["IdSzkoly"].tolist() == [2, 2, 4, 4]
+    assert df["OddzialNazwa"].iloc[0] == "1A - klasa matematyczna"
+    assert hits[4] == 2
+    assert hits[1] == 1
+
+
+def test_discover_all_async_finds_clusters_with_fewer_requests():
+    valid_ids = {3, 4, 5, 40, 41, 90}
+    pages = {school_id: VALID_SCHOOL_HTML for school_id in valid_ids}
+
+    async def crawl():
+        async with vulcan_test_server(pages) as (url_template, hits):
+            df, stats = await discover_all_async(
+                1,
+                known_ids=[90],
+                probe_step=4,
+                miss_limit=4,
+                verbose=False,
+                concurrency=4,
+                timeout=10,
+                retries=0,
+                parse_workers=1,
+                url_template=url_template,
+            )
+        return df, stats, hits
+
+    df, stats, hits = asyncio.run(crawl())
+
+    assert set(df["IdSzkoly"]) == valid_ids
+    assert stats["valid_ids"] == sorted(valid_ids)
+    assert stats["requests"] == sum(hits.values())
+    assert stats["requests"] < max(valid_ids)
+    assert max(hits) < max(valid_ids) + 4 * 4 + 4
+
+
+@pytest.fixture
+def vulcan_raw_dir(tmp_path):
+    return tmp_path / "vulcan_raw"
+
+
+def test_crawl_writes_raw_pages_and_rebuild_from_raw_matches(vulcan_raw_dir):
+    pages = {2: VALID_SCHOOL_HTML, 4: REAL_SCHOOL_HTML}
+
+    async def crawl():
+        async with vulcan_test_server(pages, flaky_ids={3}) as (url_template, _):
+            return await download_all_async(
+                1,
+                4,
+                verbose=False,
+                timeout=10,
+                retries=0,
+                parse_workers=1,
+                url_template=url_template,
+                raw_dir=vulcan_raw_dir,
+            )
+
+    crawled = asyncio.run(crawl())
+    manifest = json.loads((vulcan_raw_dir / "manifest.json").read_text("utf-8"))
+
+    assert manifest["pages"]["3"]["status"] == 503
+    assert "file" not in manifest["pages"]["3"]
+    assert manifest["pages"]["4"]["file"] == "pages/4.html.gz"
+    assert VulcanRawStore(vulcan_raw_dir).read_page(2) == VALID_SCHOOL_HTML
+    assert VulcanRawStore(vulcan_raw_dir).page_ids() == [1, 2, 4]
+
+    rebuilt = rebuild_from_raw(vulcan_raw_dir, parse_workers=1)
+
+    assert rebuilt.equals(crawled)
@@ -0,0 +1,97 @@
+import datetime
+
+import pytest
+
+from scripts.api_clients.googlemaps_cache import (
+    GoogleMapsCache,
+    cached_coordinates,
+    cached_travel_times,
+    departure_bucket,
+    normalize_address,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1_750_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "gmaps_cache"
+
+
+def timestamp(value):
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def test_normalize_address_and_departure_bucket():
+    assert normalize_address("  LO  im. Reja ,Warszawa ") == "lo im. reja, warszawa"
+    assert departure_bucket(timestamp("2025-09-01 07:30")) == "weekday-07:30"
+    assert departure_bucket(timestamp("2025-09-02 07:44")) == "weekday-07:30"
+    assert departure_bucket(timestamp("2025-09-06 07:30")) == "weekend-07:30"
+    assert departure_bucket(None) == "now"
+
+
+def test_cached_coordinates_only_fetches_misses_and_persists(cache_dir):
+    path = cache_dir / "maps.sqlite"
+    calls = []
+
+    def fetch(addresses):
+        calls.append(list(addresses))
+        return {
+            address: (52.0 + i, 21.0) if "brak" not in address else (None, None)
+            for i, address in enumerate(addresses)
+        }
+
+    cache = GoogleMapsCache(path)
+    first = cached_coordinates(cache, ["A 1, Warszawa", "brak adresu"], fetch)
+    assert first["A 1, Warszawa"] == (52.0, 21.0)
+    assert first["brak adresu"] == (None, None)
+    cache.close()
+
+    reopened = GoogleMapsCache(path)
+    second = cached_coordinates(
+        reopened, ["a  1 , warszawa", "brak adresu", "B 2"], fetch
+    )
+    assert calls == [["A 1, Warszawa", "brak adresu"], ["brak adresu", "B 2"]]
+    assert second["a  1 , warszawa"] == (52.0, 21.0)
+    reopened.close()
+
+
+def test_travel_times_are_keyed_by_origin_mode_bucket_and_expire(cache_dir):
+    clock = FakeClock()
+    cache = GoogleMapsCache(
+        cache_dir / "maps.sqlite", travel_time_ttl_days=1, clock=clock
+    )
+    calls = []
+
+    def fetch(destinations):
+        calls.append(list(destinations))
+        return {address: 30 for address in destinations}
+
+    morning = timestamp("2025-09-01 07:30")
+    cached_travel_times(cache, "Dom", ["LO 1", "LO 2"], fetch, departure_time=morning)
+    next_day = timestamp("2025-09-02 07:35")
+    hits = cached_travel_times(
+        cache, "dom", ["LO 1", "LO 2"], fetch, departure_time=next_day
+    )
+    assert hits == {"LO 1": 30, "LO 2": 30}
+    assert len(calls) == 1
+
+    cached_travel_times(cache, "Praca", ["LO 1"], fetch, departure_time=morning)
+    cached_travel_times(
+        cache, "Dom", ["LO 1"], fetch, mode="walking", departure_time=morning
+    )
+    cached_travel_times(
+        cache, "Dom", ["LO 1"], fetch, departure_time=timestamp("2025-09-01 16:00")
+    )
+    assert len(calls) == 4
+
+    clock.now += 2 * 24 * 3600
+    cached_travel_times(cache, "Dom", ["LO 1"], fetch, departure_time=morning)
+    assert calls[-1] == ["LO 1"] and len(calls) == 5
+    cache.close()
@@ -0,0 +1,153 @@
+import json
+
+import googlemaps
+import pytest
+
+from scripts.api_clients.googlemaps_api import geocode_address
+from scripts.api_clients.googlemaps_replay import (
+    RecordingSession,
+    ReplayConfig,
+    ReplayFile,
+    ReplaySession,
+    build_replay_client,
+    make_response,
+    normalize_request,
+    recorded_addresses,
+)
+from scripts.api_clients.rate_limit import RateLimitedExecutor
+from scripts.pipeline import googlemaps_client
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+
+class FakeNetwork:
+    """Geokoduje "LO N" na (52.N, 21.0); "limit" zwraca OVER_QUERY_LIMIT."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        address = url.split("address=")[1].split("&")[0].replace("+", " ")
+        if address == "limit":
+            return make_response(200, {"status": "OVER_QUERY_LIMIT"}, url)
+        number = int(address.split()[-1])
+        location = {"lat": 52 + number / 100, "lng": 21.0}
+        body = {"status": "OK", "results": [{"geometry": {"location": location}}]}
+        return make_response(200, body, url)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def replay_path(tmp_path):
+    return tmp_path / "replay" / "googlemaps_replay.json"
+
+
+def record(path, addresses):
+    session = RecordingSession(ReplayFile(path), session=FakeNetwork())
+    client = googlemaps.Client(
+        key="AIza-test", requests_session=session, retry_over_query_limit=False
+    )
+    for address in addresses:
+        geocode_address(client, address)
+    session.close()
+    return session
+
+
+def test_normalize_request_ignores_credentials_and_volatile_times():
+    first = normalize_request(
+        "get",
+        "https://maps.googleapis.com/maps/api/distancematrix/json"
+        "?origins=Dom&departure_time=1700000000&key=AIza-1&destinations=LO",
+    )
+    second = normalize_request(
+        "GET",
+        "https://other.host/maps/api/distancematrix/json"
+        "?destinations=LO&departure_time=1800000000&origins=Dom&key=AIza-2",
+    )
+
+    assert first == second
+    assert "key=" not in first and "departure_time=%2A" in first
+    assert normalize_request("POST", GEOCODE_URL, {"b": 1, "a": 2}).endswith(
+        '{"a": 2, "b": 1}'
+    )
+
+
+def test_record_then_replay_without_network(replay_path):
+    session = record(replay_path, ["LO 1", "LO 2", "limit"])
+
+    assert session.stats == {"recorded": 2, "skipped": 1}
+    saved = json.loads(replay_path.read_text(encoding="utf-8"))
+    assert saved["schema_version"] == 1
+    assert "AIza-test" not in replay_path.read_text(encoding="utf-8")
+    assert sorted(recorded_addresses(ReplayFile(replay_path))) == ["LO 1", "LO 2"]
+
+    client = build_replay_client("replay", replay_path)
+    assert geocode_address(client, "LO 2") == (52.02, 21.0)
+    assert geocode_address(client, "LO 9") is None
+    assert client.session.stats == {"served": 1, "miss": 1}
+
+
+def test_replay_simulates_latency_and_quota_errors(replay_path):
+    record(replay_path, ["LO 1"])
+    sleeps = []
+    session = ReplaySession(
+        ReplayFile(replay_path),
+        ReplayConfig(latency=0.2, over_query_limit_rate=0.5, seed=7),
+        sleep=sleeps.append,
+    )
+    url = f"{GEOCODE_URL}?address=LO+1&region=pl&key=AIza-x"
+
+    statuses = [session.get(url).json()["status"] for _ in range(40)]
+
+    assert sleeps == [0.2] * 40
+    assert session.stats["over_query_limit"] == statuses.count("OVER_QUERY_LIMIT")
+    assert 10 < statuses.count("OVER_QUERY_LIMIT") < 30
+    assert session.stats["served"] == statuses.count("OK")
+    repeat = ReplaySession(
+        ReplayFile(replay_path),
+        ReplayConfig(over_query_limit_rate=0.5, seed=7),
+        sleep=lambda _: None,
+    )
+    assert [repeat.get(url).json()["status"] for _ in range(40)] == statuses
+
+
+def test_replay_throttles_per_second_and_executor_retries(replay_path):
+    record(replay_path, ["LO 1"])
+    now = [0.0]
+    session = ReplaySession(
+        ReplayFile(replay_path),
+        ReplayConfig(max_requests_per_second=2),
+        clock=lambda: now[0],
+    )
+    url = f"{GEOCODE_URL}?region=pl&address=LO+1"
+    assert [session.get(url).json()["status"] for _ in range(3)] == [
+        "OK",
+        "OK",
+        "OVER_QUERY_LIMIT",
+    ]
+
+    client = googlemaps.Client(
+        key="AIza-replay", requests_session=session, retry_over_query_limit=False
+    )
+    executor = RateLimitedExecutor(
+        qps=1000, max_workers=1, sleep=lambda delay: now.__setitem__(0, now[0] + 1)
+    )
+    # Trzecie zapytanie w tej samej sekundzie dostaje limit; executor czeka i ponawia.
+    result = executor.wrap(client).geocode("LO 1", region="pl")
+    assert result[0]["geometry"]["location"]["lat"] == 52.01
+    assert session.stats == {"served": 3, "over_query_limit": 2}
+
+
+def test_pipeline_builds_replay_client_from_config(replay_path):
+    record(replay_path, ["LO 3"])
+    cfg = {"googlemaps_replay": "replay", "googlemaps_replay_file": str(replay_path)}
+
+    client = googlemaps_client(cfg, api_key=None)
+
+    assert isinstance(client.session, ReplaySession)
+    assert geocode_address(client, "LO 3") == (52.03, 21.0)
+    with pytest.raises(ValueError):
+        googlemaps_client(cfg | {"googlemaps_replay": "record"}, api_key=None)
@@ -0,0 +1,66 @@
+import pytest
+
+from scripts.data_processing.html_extract import (
+    benchmark,
+    clear_cache,
+    extract_html,
+    html_image_sources,
+    html_text,
+    soup_extract,
+)
+from scripts.data_processing.get_data_pzo_omikron import (
+    extract_image_sources,
+    html_to_text,
+)
+
+HTML_SAMPLES = [
+    "",
+    "zwykły tekst bez znaczników",
+    '<p>Opis szkoły <img src="https://example.edu.pl/school.jpg"></p>',
+    "<p>Opis&nbsp;oddziału &amp; <b>profil</b>\n\n<i>mat-fiz</i></p>",
+    "<div>a<script>var x = '<p>nie</p>';</script><style>.c{}</style>b</div>",
+    "<p>jeden<!-- komentarz -->dwa<![CDATA[trzy]]></p>",
+    "<template><p>ukryty</p></template><p>widoczny</p>",
+    '<img src="a.png"/><img><img src=""><IMG SRC="b.png" src="c.png">',
+    "<ul><li>pierwszy<li>drugi</ul><p>niezamknięty",
+    "&#150; &#8211; &lt;tag&gt; &unknown; &amp",
+    '<p class="Text-editor">Text-editor treść</p>',
+]
+
+
+@pytest.mark.parametrize("html", HTML_SAMPLES)
+def test_extract_html_matches_beautifulsoup(html):
+    assert extract_html(html, use_cache=False) == soup_extract(html)
+
+
+def test_extract_html_handles_none_and_non_strings():
+    assert html_text(None) == ""
+    assert html_image_sources(None) == []
+    assert html_text(123) == "123"
+
+
+def test_extract_html_memoizes_by_content():
+    clear_cache()
+    html = "<p>Opis <img src='x.png'></p>"
+
+    first = extract_html(html)
+    second = extract_html("".join(["<p>Opis ", "<img src='x.png'></p>"]))
+
+    assert first is second
+    assert first.image_sources == ("x.png",)
+
+
+def test_pzo_helpers_keep_text_editor_cleanup():
+    html = '<div class="Text-editor"><p>Opis   klasy</p>Text-editor</div>'
+
+    assert html_to_text(html) == "Opis klasy"
+    assert extract_image_sources('<p><img src="a.png"></p>') == ["a.png"]
+    assert extract_image_sources("") == []
+
+
+def test_benchmark_reports_timings_without_mismatches():
+    timings = benchmark(HTML_SAMPLES[1:], repeat=1)
+
+    assert timings["fragments"] == len(HTML_SAMPLES) - 1
+    assert timings["mismatches"] == 0
+    assert timings["beautifulsoup_s"] > 0
@@ -12,18 +12,23 @@ def test_load_min_points(monkeypatch):
         }
     )
 
+    raw_sheet = pd.DataFrame(
+        [["opis", None, None], [None, None, None], list(mock_excel_data.columns)]
+        + mock_excel_data.values.tolist()
+    )
+    calls = []
+
     # Mockowanie funkcji pd.read_excel
     def mock_read_excel(*args, **kwargs):
         """
         Symuluje funkcję pandas.read_excel dla testów, zwracając przygotowany DataFrame.
 
-        Funkcja sprawdza, czy ścieżka pliku to "test_path.xlsx" oraz czy nagłówek ustawiony jest na 2, po czym zwraca wcześniej zdefiniowany obiekt mock_excel_data.
+        Funkcja sprawdza, czy ścieżka pliku to "test_path.xlsx" oraz czy arkusz jest czytany bez nagłówka, po czym zwraca surowy arkusz z nagłówkiem w trzecim wierszu.
         """
         assert args[0] == "test_path.xlsx"
-        if kwargs.get("header") is None:
-            return pd.DataFrame([["opis"], ["opis"], list(mock_excel_data.columns)])
-        assert kwargs.get("header") == 2
-        return mock_excel_data
+        assert kwargs.get("header") is None
+        calls.append(args[0])
+        return raw_sheet
 
     monkeypatch.setattr(pd, "read_excel", mock_read_excel)
 
@@ -31,6 +36,7 @@ def test_load_min_points(monkeypatch):
     result = load_min_points("test_path.xlsx")
 
     # Sprawdzenie rezultatów
+    assert calls == ["test_path.xlsx"]
     assert list(result.columns) == ["Prog_min_klasa", "NazwaSzkoly", "OddzialNazwa"]
     assert result["Prog_min_klasa"].tolist() == [150, 160, 170]
     assert result["NazwaSzkoly"].tolist() == ["LO nr 1", "LO nr 2", "LO nr 3"]
@@ -52,12 +58,14 @@ def test_load_min_points_new_2025_layout(monkeypatch):
         }
     )
 
+    raw_sheet = pd.DataFrame(
+        [list(mock_excel_data.columns)] + mock_excel_data.values.tolist()
+    )
+
     def mock_read_excel(*args, **kwargs):
         assert args[0] == "test_2025.xlsx"
-        if kwargs.get("header") is None:
-            return pd.DataFrame([list(mock_excel_data.columns)])
-        assert kwargs.get("header") == 0
-        return mock_excel_data
+        assert kwargs.get("header") is None
+        return raw_sheet
 
     monkeypatch.setattr(pd, "read_excel", mock_read_excel)
 
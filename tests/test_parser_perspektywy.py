@@ -1,8 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from scripts.data_processing import parser_perspektywy
 from scripts.data_processing.parser_perspektywy import (
+    load_ranking_perspektywy_pdf,
+    parse_embedded_astro_rankings,
     parse_ranking_perspektywy_html_text,
     parse_ranking_perspektywy_pdf,
+    ranking_pdf_cache_path,
 )
 
+RANKING_PDF_2025 = Path("data/raw/2025/ranking_liceow_warszawskich_2025.pdf")
+RANKING_HTML_2026 = Path("data/raw/2026/ranking_liceow_warszawskich_2026.html")
+
+ASTRO_ISLAND_HTML = """
+<html><body>
+<astro-island uid="a" component-url="/_astro/Banners.js" props="{&quot;url&quot;:[0,&quot;x&quot;]}"></astro-island>
+<astro-island uid="b" component-url="/_astro/Ranking.js" props="{&quot;ranking&quot;:[0,{
+&quot;name&quot;:[0,&quot;Ranking Liceów Warszawskich 2026&quot;],
+&quot;rank&quot;:[1,[
+[0,{&quot;2025&quot;:[0,&quot;2&quot;],&quot;2026&quot;:[0,&quot;1&quot;],
+&quot;name&quot;:[0,&quot;&lt;a href=&#39;http://example.test&#39;&gt;LO \\&quot;Parasol\\&quot;&lt;/a&gt;&quot;],
+&quot;dzielnica&quot;:[0,&quot;Ursynów&quot;],&quot;wsk&quot;:[0,100]}],
+[0,{&quot;2025&quot;:[0,null],&quot;2026&quot;:[0,&quot;4=&quot;],
+&quot;name&quot;:[0,&quot;VIII LO im. Władysława IV&quot;],
+&quot;dzielnica&quot;:[0,&quot;Praga Płn.&quot;],&quot;wsk&quot;:[0,&quot;70.5&quot;]}]
+]]}]}"></astro-island>
+</body></html>
+"""
+
 
 def test_parse_ranking_perspektywy_html():
     """
@@ -126,3 +153,122 @@ def test_parse_ranking_perspektywy_html_embedded_payload():
     ]
     assert df["Dzielnica"].tolist() == ["Ochota", "Praga Płn."]
     assert df["year"].tolist() == [2026, 2026]
+
+
+def test_parse_ranking_perspektywy_pdf_parallel_keeps_page_order():
+    df = parse_ranking_perspektywy_pdf(RANKING_PDF_2025, workers=2)
+
+    assert df.shape == (100, 3)
+    assert df["RankingPoz"].tolist() == sorted(df["RankingPoz"].tolist())
+    assert df["RankingPoz"].iloc[0] == 1 and df["RankingPoz"].iloc[-1] == 100
+    assert df["NazwaSzkoly"].iloc[0] == "XIV LO im. Stanisława Staszica"
+
+
+@pytest.fixture
+def ranking_cache_dir(tmp_path):
+    return tmp_path
+
+
+def test_load_ranking_perspektywy_pdf_cache_keyed_on_content_and_version(
+    monkeypatch, ranking_cache_dir
+):
+    calls = []
+
+    def fake_parse(pdf_file_path, workers=None):
+        calls.append(pdf_file_path)
+        return parser_perspektywy.pd.DataFrame(
+            [[1, f"LO {len(calls)}", "Wola"]],
+            columns=["RankingPoz", "NazwaSzkoly", "Dzielnica"],
+        )
+
+    monkeypatch.setattr(parser_perspektywy, "parse_ranking_perspektywy_pdf", fake_parse)
+    pdf_path = ranking_cache_dir / "ranking.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 v1")
+
+    first = load_ranking_perspektywy_pdf(pdf_path, cache_dir=ranking_cache_dir)
+    second = load_ranking_perspektywy_pdf(pdf_path, cache_dir=ranking_cache_dir)
+    assert len(calls) == 1
+    assert second.equals(first)
+    assert ranking_pdf_cache_path(pdf_path, ranking_cache_dir).suffix == ".parquet"
+
+    pdf_path.write_bytes(b"%PDF-1.4 v2")
+    changed = load_ranking_perspektywy_pdf(pdf_path, cache_dir=ranking_cache_dir)
+    assert len(calls) == 2
+    assert changed["NazwaSzkoly"].tolist() == ["LO 2"]
+
+    monkeypatch.setattr(parser_perspektywy, "PDF_PARSER_VERSION", "test")
+    load_ranking_perspektywy_pdf(pdf_path, cache_dir=ranking_cache_dir)
+    assert len(calls) == 3
+
+
+def test_parse_embedded_astro_rankings_reads_all_years_from_island_props():
+    df = parse_embedded_astro_rankings(ASTRO_ISLAND_HTML)
+
+    assert df[["year", "RankingPozTekst"]].values.tolist() == [
+        [2025, "2"],
+        [2026, "1"],
+        [2026, "4="],
+    ]
+    assert df["NazwaSzkoly"].iloc[0] == 'LO "Parasol"'
+    # WSK dotyczy bieżącej edycji (2026); starsze lata nie dziedziczą wartości.
+    assert df["WSK"].isna().tolist() == [True, False, False]
+    assert df["WSK"].iloc[1:].tolist() == [100, 70.5]
+
+    single = parse_ranking_perspektywy_html_text(ASTRO_ISLAND_HTML, year=2026)
+    assert single["RankingPoz"].tolist() == [1, 4]
+    assert single["Dzielnica"].tolist() == ["Ursynów", "Praga Płn."]
+    assert single["year"].tolist() == [2026, 2026]
+
+
+def test_parse_embedded_astro_rankings_real_page_has_every_edition():
+    df = parse_embedded_astro_rankings(RANKING_HTML_2026.read_text(encoding="utf-8"))
+
+    assert df.groupby("year").size().to_dict() == {
+        2023: 101,
+        2024: 101,
+        2025: 101,
+        2026: 101,
+    }
+    top = df[(df["year"] == 2026) & (df["RankingPoz"] == 1)]
+    assert top["NazwaSzkoly"].tolist() == ["XIV LO im. Stanisława Staszica"]
+
+
+def test_parse_embedded_astro_rankings_falls_back_to_regex_per_year():
+    html = """
+    &quot;rank&quot;:[1,[[0,{&quot;2025&quot;:[0,&quot;3&quot;],&quot;2026&quot;:[0,&quot;1&quot;],
+    &quot;name&quot;:[0,&quot;LO A&quot;],&quot;dzielnica&quot;:[0,&quot;Wola&quot;],
+    &quot;wsk&quot;:[0,90]}]]]
+    """
+    df = parse_embedded_astro_rankings(html)
+
+    assert df[["year", "RankingPoz"]].values.tolist() == [[2025, 3], [2026, 1]]
+
+
+def test_load_ranking_reuses_html_cache_path(monkeypatch, ranking_cache_dir):
+    from scripts import pipeline
+
+    calls = []
+
+    def fake_parse(path, year=None):
+        calls.append(path)
+        return parser_perspektywy.pd.DataFrame(
+            [[1, "LO A", "Wola"]], columns=["RankingPoz", "NazwaSzkoly", "Dzielnica"]
+        )
+
+    html_path = ranking_cache_dir / "ranking.html"
+    html_path.write_text("<html></html>", encoding="utf-8")
+    monkeypatch.setattr(pipeline, "parse_ranking_perspektywy_html", fake_parse)
+    year_cfg = {
+        "year": 2026,
+        "ranking": {
+            "type": "perspektywy_html",
+            "path": str(html_path.resolve()),
+            "cache_path": str((ranking_cache_dir / "ranking.xlsx").resolve()),
+        },
+    }
+
+    first = pipeline.load_ranking(year_cfg)
+    second = pipeline.load_ranking(year_cfg)
+
+    assert len(calls) == 1
+    assert second["NazwaSzkoly"].tolist() == first["NazwaSzkoly"].tolist()
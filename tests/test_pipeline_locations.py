@@ -0,0 +1,186 @@
+import pandas as pd
+import pytest
+
+from scripts import pipeline
+from scripts.pipeline import (
+    attach_location_data,
+    plan_location_refresh,
+    stored_locations,
+)
+
+HOME = "Warszawa, Metro Wilanowska"
+
+
+class FakeMaps:
+    """Geokoduje i liczy trasy bez sieci, zapamiętując zapytania."""
+
+    class session:
+        @staticmethod
+        def close():
+            pass
+
+    def __init__(self):
+        self.geocoded = []
+        self.routed = []
+
+    def geocode(self, address, **kwargs):
+        self.geocoded.append(address)
+        return [{"geometry": {"location": {"lat": 52.3, "lng": 21.1}}}]
+
+    def distance_matrix(self, origins, destinations, **kwargs):
+        self.routed.extend(destinations)
+        element = {"status": "OK", "duration": {"value": 33 * 60}}
+        return {"rows": [{"elements": [element] * len(destinations)}]}
+
+
+@pytest.fixture
+def tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "CZASY_DOJAZDU_FILE", tmp_path / "czasy_dojazdu.xlsx")
+    return tmp_path
+
+
+def stored_table(home=HOME):
+    return pd.DataFrame(
+        {
+            "SzkolaIdentyfikator": ["lo_a", "lo_b"],
+            "AdresSzkoly": ["ul. Prosta 1, 00-850 Warszawa", "Długa 2"],
+            "CzasDojazdu": [20.0, 25.0],
+            "SzkolaLat": [52.23, 52.24],
+            "SzkolaLon": [21.0, 21.01],
+            "AdresDomowy": [home, home],
+        }
+    )
+
+
+def current_schools():
+    return pd.DataFrame(
+        {
+            "SzkolaIdentyfikator": ["lo_a", "lo_b", "lo_c"],
+            "NazwaSzkoly": ["LO A", "LO B", "LO C"],
+            # lo_a bez zmian (inny zapis), lo_b przeniesione, lo_c nowe.
+            "AdresSzkoly": ["Prosta 1", "Krótka 3", "Nowa 4"],
+        }
+    )
+
+
+def test_plan_skips_unchanged_addresses_and_home_change_invalidates_times(tmp_dir):
+    stored_table().to_excel(pipeline.CZASY_DOJAZDU_FILE, index=False)
+    schools = current_schools().assign(
+        PelenAdres=lambda df: df["NazwaSzkoly"] + ", " + df["AdresSzkoly"]
+    )
+
+    known, changed = plan_location_refresh(schools, stored_locations(None, HOME))
+    assert known.tolist() == [True, False, False]
+    assert changed == ["LO B, Krótka 3", "LO C, Nowa 4"]
+
+    moved_home = stored_locations(None, "Warszawa, Centrum")
+    assert moved_home["CzasDojazdu"].isna().all()
+    known, changed = plan_location_refresh(schools, moved_home)
+    assert known.tolist() == [True, False, False]
+
+
+def test_cache_without_home_address_never_supplies_travel_times(tmp_dir):
+    stored_table(home="Stary dom").to_excel(pipeline.CZASY_DOJAZDU_FILE, index=False)
+    cache = pd.DataFrame(
+        {
+            "SzkolaIdentyfikator": ["lo_a"],
+            "AdresSzkoly": ["Prosta 1"],
+            "CzasDojazdu": [30.0],
+            "SzkolaLat": [52.23],
+            "SzkolaLon": [21.0],
+        }
+    )
+
+    stored = stored_locations(cache, "Nowy dom")
+
+    assert stored["CzasDojazdu"].isna().all()
+    assert stored["SzkolaLat"].notna().all()
+    assert stored_locations(cache, "Stary dom")["CzasDojazdu"].tolist() == [
+        20.0,
+        25.0,
+    ]
+
+
+def test_attach_location_data_geocodes_only_new_or_changed(
+    tmp_dir, monkeypatch, caplog
+):
+    stored_table().to_excel(pipeline.CZASY_DOJAZDU_FILE, index=False)
+    fake = FakeMaps()
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "AIza-test")
+    monkeypatch.setattr(pipeline, "googlemaps_client", lambda cfg, key: fake)
+    cfg = {
+        "adres_domowy": HOME,
+        "cache_google_maps": str(tmp_dir / "cache.sqlite"),
+        "googlemaps_qps": 1000,
+    }
+
+    result = attach_location_data(current_schools(), cfg).set_index(
+        "SzkolaIdentyfikator"
+    )
+
+    assert sorted(fake.geocoded) == ["LO B, Krótka 3", "LO C, Nowa 4"]
+    # Czasy dojazdu idą przez cache Google Maps (ważność, godzina wyjazdu).
+    assert len(fake.routed) == 3
+    assert result.loc["lo_a", ["CzasDojazdu", "SzkolaLat"]].tolist() == [33.0, 52.23]
+    assert result.loc["lo_c", ["CzasDojazdu", "SzkolaLat"]].tolist() == [33.0, 52.3]
+    saved = pd.read_excel(pipeline.CZASY_DOJAZDU_FILE)
+    assert len(saved) == 3 and set(saved["AdresDomowy"]) == {HOME}
+
+    caplog.clear()
+    with caplog.at_level("INFO", logger=pipeline.logger.name):
+        attach_location_data(current_schools(), cfg)
+    assert len(fake.routed) == 3 and len(fake.geocoded) == 2
+    assert (
+        "Odświeżenie lokalizacji (3 adresów): czasy dojazdu 3 z cache, 0 pobranych; "
+        "geokodowanie 3 pominiętych, 0 pobranych"
+    ) in caplog.text
+
+
+def test_maps_cache_is_closed_when_google_maps_fails(tmp_dir, monkeypatch):
+    stored_table().to_excel(pipeline.CZASY_DOJAZDU_FILE, index=False)
+    closed = []
+
+    def tracked_cache(cfg):
+        cache = real_cache(cfg)
+        real_close = cache.close
+        cache.close = lambda: closed.append(True) or real_close()
+        return cache
+
+    def failing_matrix(*args, **kwargs):
+        raise RuntimeError("Distance Matrix niedostępne")
+
+    real_cache = pipeline.googlemaps_cache
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "AIza-test")
+    monkeypatch.setattr(pipeline, "googlemaps_client", lambda cfg, key: FakeMaps())
+    monkeypatch.setattr(pipeline, "googlemaps_cache", tracked_cache)
+    monkeypatch.setattr(pipeline, "compute_travel_matrix", failing_matrix)
+    cfg = {
+        "adres_domowy": HOME,
+        "cache_google_maps": str(tmp_dir / "cache.sqlite"),
+        "googlemaps_qps": 1000,
+    }
+
+    result = attach_location_data(current_schools(), cfg)
+
+    assert "PelenAdres" not in result.columns
+    assert closed == [True]
+
+
+def test_cached_fallback_fills_new_ids_by_address(tmp_dir):
+    stored_table().to_excel(pipeline.CZASY_DOJAZDU_FILE, index=False)
+    schools = pd.DataFrame(
+        {
+            "SzkolaIdentyfikator": ["lo_b_nowa_nazwa"],
+            "NazwaSzkoly": ["LO B"],
+            "AdresSzkoly": ["ul. Długa 2"],
+        }
+    )
+    cfg = {"adres_domowy": HOME, "pobierz_nowe_czasy": False}
+
+    result = attach_location_data(schools, cfg)
+
+    assert result[["CzasDojazdu", "SzkolaLat"]].iloc[0].tolist() == [25.0, 52.24]
+    without_incremental = attach_location_data(
+        schools, cfg | {"lokalizacje_przyrostowo": False}
+    )
+    assert without_incremental["SzkolaLat"].isna().all()
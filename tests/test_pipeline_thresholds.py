@@ -4,6 +4,7 @@ import uuid
 
 import pandas as pd
 
+from scripts import pipeline
 from scripts.pipeline import (
     add_common_class_columns,
     add_year_metadata,
@@ -14,6 +15,7 @@ from scripts.pipeline import (
     best_thresholds_for_keys,
     historical_school_thresholds,
     load_pzo_offer_tables,
+    load_threshold_sources,
     load_thresholds,
     language_options_for_row,
     match_reference_thresholds,
@@ -22,6 +24,7 @@ from scripts.pipeline import (
     school_threshold_summary,
     school_ranking_summary,
     summarize_criteria,
+    threshold_sources,
 )
 
 
@@ -107,6 +110,26 @@ def test_load_pzo_offer_tables_downloads_missing_raw_snapshot(monkeypatch):
     assert result["schools"]["source_school_id"].tolist() == ["pzo:1"]
 
 
+def test_load_pzo_offer_tables_prefers_parquet_next_to_xlsx(monkeypatch, tmp_path):
+    xlsx_path = tmp_path / "pzo_omikron_2026_2027.xlsx"
+    parquet_dir = tmp_path / "pzo_omikron_2026_2027"
+
+    def fail_excel(*args, **kwargs):
+        raise AssertionError("Excel nie powinien być czytany, gdy jest Parquet.")
+
+    xlsx_path.write_bytes(b"")
+    parquet_dir.mkdir()
+    for name in ["schools", "classes", "criteria_long"]:
+        pd.DataFrame({"source_school_id": ["pzo:1"], "table": [name]}).to_parquet(
+            parquet_dir / f"{name}.parquet", index=False
+        )
+    monkeypatch.setattr(pd, "ExcelFile", fail_excel)
+    result = load_pzo_offer_tables({"year": 2026, "offer": {"path": str(xlsx_path)}})
+
+    assert set(result) == {"schools", "classes", "criteria_long"}
+    assert result["classes"]["table"].tolist() == ["classes"]
+
+
 def test_attach_stable_school_ids_adds_score_column_without_reference_schools():
     schools = pd.DataFrame(
         {
@@ -365,6 +388,94 @@ def test_load_thresholds_without_sources_returns_merge_schema():
     }.issubset(result.columns)
 
 
+def test_load_thresholds_parses_each_source_file_once(monkeypatch, tmp_path):
+    source = tmp_path / "progi_2025.xlsx"
+    source.write_bytes(b"xlsx v1")
+    calls = []
+
+    def fake_load_min_points(path):
+        calls.append(path)
+        return pd.DataFrame(
+            {
+                "Prog_min_klasa": [150.5],
+                "NazwaSzkoly": ["XIV LO im. Stanisława Staszica"],
+                "OddzialNazwa": ["1A mat-fiz"],
+            }
+        )
+
+    monkeypatch.setattr(pipeline, "load_min_points", fake_load_min_points)
+    monkeypatch.setattr(pipeline, "THRESHOLD_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(pipeline, "_threshold_source_frames", {})
+
+    def year_cfg(year, threshold_year):
+        return {
+            "year": year,
+            "admission_year": year,
+            "thresholds": {"path": str(source), "threshold_year": threshold_year},
+        }
+
+    first = load_thresholds(year_cfg(2025, 2025))
+    second = load_thresholds(year_cfg(2026, 2025))
+    assert len(calls) == 1
+    assert (
+        first["SzkolaIdentyfikator"].tolist() == second["SzkolaIdentyfikator"].tolist()
+    )
+    assert second["year"].tolist() == [2026]
+    assert second["threshold_year"].tolist() == [2025]
+    assert len(list((tmp_path / "cache").glob("*.parquet"))) == 1
+
+    # Nowy proces: ramka z Parquet, bez ponownego parsowania.
+    monkeypatch.setattr(pipeline, "_threshold_source_frames", {})
+    from_disk = load_thresholds(year_cfg(2025, 2025))
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(from_disk, first)
+
+    source.write_bytes(b"xlsx v2")
+    load_thresholds(year_cfg(2025, 2025))
+    assert len(calls) == 2
+
+
+def test_threshold_sources_discovers_history_files(monkeypatch, tmp_path):
+    # Wzorzec historii jest względny wobec katalogu projektu.
+    monkeypatch.setattr(pipeline, "BASE_DIR", tmp_path)
+    tmp_dir = tmp_path / "progi"
+    for year in (2021, 2022, 2024, 2025, 2026):
+        (tmp_dir / str(year)).mkdir(parents=True)
+        (tmp_dir / str(year) / f"minimalna_liczba_punktow_{year}.xlsx").touch()
+    explicit = tmp_dir / "2024" / "minimalna_liczba_punktow_2024.xlsx"
+    year_cfg = {
+        "year": 2025,
+        "thresholds": {
+            "sources": [{"path": str(explicit.resolve()), "threshold_year": 2024}],
+            "history": {"pattern": "progi/*/minimalna_*.xlsx"},
+        },
+    }
+    sources = threshold_sources(year_cfg)
+
+    assert [
+        (source["threshold_year"], source["priority"], source.get("threshold_kind"))
+        for source in sources
+    ] == [(2024, 1, None), (2022, 2, "historical"), (2021, 3, "historical")]
+    assert sources[1]["threshold_label"] == "historyczne progi 2022"
+
+
+def test_load_threshold_sources_parses_files_in_parallel(monkeypatch):
+    paths = [
+        pipeline.resolve_path("data/raw/2024/minimalna_liczba_punktow_2024.xlsx"),
+        pipeline.resolve_path(
+            "data/raw/2025/minimalna_liczba_punktow_zakwalifikowani_2025.xlsx"
+        ),
+    ]
+    monkeypatch.setattr(pipeline, "_threshold_source_frames", {})
+    parallel = load_threshold_sources(paths, workers=2)
+    monkeypatch.setattr(pipeline, "_threshold_source_frames", {})
+    serial = load_threshold_sources(paths, workers=1)
+
+    for path in paths:
+        pd.testing.assert_frame_equal(parallel[path], serial[path])
+        assert "SzkolaIdentyfikator" in parallel[path].columns
+
+
 def test_match_reference_thresholds_marks_exact_match_as_trusted():
     classes = pd.DataFrame(
         {
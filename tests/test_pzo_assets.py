@@ -0,0 +1,159 @@
+import io
+import threading
+
+import pandas as pd
+import pytest
+import requests
+from PIL import Image
+
+from scripts.data_processing.pzo_assets import (
+    AssetStore,
+    asset_requests,
+    object_extension,
+    sync_assets,
+)
+
+
+def png_bytes(color="red", size=(400, 200)):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200, content_type="image/png"):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self._lock:
+            self.calls.append(url)
+        return self.responses.get(url, FakeResponse(b"", status_code=404))
+
+
+@pytest.fixture
+def asset_dir(tmp_path):
+    return tmp_path / "pzo_assets"
+
+
+def sample_manifest():
+    return pd.DataFrame(
+        [
+            {"asset_kind": "school_logo", "hash": "logo-1", "url": ""},
+            {"asset_kind": "school_logo", "hash": "logo-1", "url": ""},
+            {"asset_kind": "school_image", "hash": "img-copy", "url": ""},
+            {
+                "asset_kind": "description_image_url",
+                "hash": "",
+                "url": "https://example.edu.pl/a.png",
+            },
+            {
+                "asset_kind": "class_attachment",
+                "hash": "pdf-1",
+                "url": "https://example.edu.pl/regulamin.pdf",
+                "file_name": "regulamin.pdf",
+                "content_type": "application/pdf",
+            },
+        ]
+    )
+
+
+def test_asset_requests_dedupe_by_hash_and_report_missing_url():
+    pending, missing = asset_requests(sample_manifest())
+
+    assert [request.source_key for request in pending] == [
+        "url:https://example.edu.pl/a.png",
+        "hash:pdf-1",
+    ]
+    assert missing == ["hash:logo-1", "hash:img-copy"]
+
+    pending, missing = asset_requests(
+        sample_manifest(),
+        hash_url_template="{base_url}/file/{hash}",
+        base_url="https://pzo.test/",
+        kinds={"school_logo"},
+    )
+    assert [request.url for request in pending] == ["https://pzo.test/file/logo-1"]
+    assert missing == []
+
+
+def test_sync_assets_stores_content_addressed_objects_and_skips_existing(asset_dir):
+    logo = png_bytes()
+    session = FakeSession(
+        {
+            "https://pzo.test/file/logo-1": FakeResponse(logo),
+            "https://pzo.test/file/img-copy": FakeResponse(logo),
+            "https://example.edu.pl/a.png": FakeResponse(png_bytes("blue")),
+            "https://example.edu.pl/regulamin.pdf": FakeResponse(
+                b"%PDF-1.4", content_type="application/pdf"
+            ),
+        }
+    )
+    store = AssetStore(asset_dir)
+
+    report = sync_assets(
+        sample_manifest(),
+        store,
+        hash_url_template="{base_url}/file/{hash}",
+        base_url="https://pzo.test",
+        session=session,
+        max_workers=4,
+    )
+
+    assert report.downloaded == 3
+    assert report.deduplicated == 1
+    assert report.thumbnails == 3
+    assert not report.failed
+    assert len(list((asset_dir / "objects").rglob("*.*"))) == 3
+    assert (
+        store.index["hash:logo-1"]["sha256"] == store.index["hash:img-copy"]["sha256"]
+    )
+    assert store.index["hash:pdf-1"]["path"].endswith(".pdf")
+    assert store.index["hash:pdf-1"]["thumbnail"] == ""
+
+    thumbnail = store.logo_path("logo-1")
+    assert thumbnail is not None and thumbnail.parent.parent.name == "thumbs"
+    with Image.open(thumbnail) as image:
+        assert max(image.size) <= 160
+
+    reloaded = AssetStore(asset_dir)
+    session.calls.clear()
+    second = sync_assets(
+        sample_manifest(),
+        reloaded,
+        hash_url_template="{base_url}/file/{hash}",
+        base_url="https://pzo.test",
+        session=session,
+    )
+    assert session.calls == []
+    assert second.skipped_existing == 4
+
+
+def test_sync_assets_records_failed_downloads(asset_dir):
+    store = AssetStore(asset_dir)
+
+    report = sync_assets(sample_manifest(), store, session=FakeSession({}))
+
+    assert set(report.failed) == {"url:https://example.edu.pl/a.png", "hash:pdf-1"}
+    assert store.index == {}
+    assert store.logo_path("logo-1") is None
+    assert store.logo_path(None) is None
+
+
+def test_object_extension_prefers_content_type_then_name():
+    assert object_extension("image/png; charset=binary") == ".png"
+    assert object_extension("", "https://x.pl/logo.JPG?v=1") == ".jpg"
+    assert object_extension("", "", "plik.pdf") == ".pdf"
+    assert object_extension("", "https://x.pl/plik") == ""
@@ -0,0 +1,100 @@
+import time
+
+import pytest
+import requests
+
+from scripts.data_processing.get_data_pzo_omikron import (
+    PzoOmikronClient,
+    fetch_offer_snapshot,
+    write_snapshot_files,
+)
+from scripts.data_processing.pzo_replay_server import ReplayConfig, serve_snapshot
+from tests.test_get_data_pzo_omikron import client_with_fake_session
+
+
+@pytest.fixture
+def raw_snapshot_dir(tmp_path):
+    raw_dir = tmp_path / "pzo_raw"
+    client, _session = client_with_fake_session()
+    snapshot = fetch_offer_snapshot(client=client)
+    write_snapshot_files(snapshot, raw_dir)
+    return raw_dir, snapshot
+
+
+def test_replay_server_serves_snapshot_to_client(raw_snapshot_dir):
+    raw_dir, snapshot = raw_snapshot_dir
+
+    with serve_snapshot(raw_dir) as server:
+        client = PzoOmikronClient(base_url=server.base_url, timeout=5)
+        replayed = fetch_offer_snapshot(client=client)
+
+    for key in ("search_metadata", "search_results", "school_details"):
+        assert replayed[key] == snapshot[key]
+    assert server.stats[("/api/offer/schoolDetails", 200)] == 1
+
+
+def test_replay_server_returns_404_for_unknown_school(raw_snapshot_dir):
+    raw_dir, _snapshot = raw_snapshot_dir
+
+    with serve_snapshot(raw_dir) as server:
+        client = PzoOmikronClient(base_url=server.base_url, timeout=5)
+        with pytest.raises(requests.HTTPError):
+            client.school_details(999)
+
+
+def test_replay_server_rejects_non_integer_ids(raw_snapshot_dir):
+    raw_dir, _snapshot = raw_snapshot_dir
+
+    with serve_snapshot(raw_dir) as server:
+        assert (
+            server.resolve(
+                "/api/offer/schoolDetails", {"schoolId": "../search_metadata"}
+            )
+            is None
+        )
+        assert server.resolve("/api/offer/searchSubmit", {"schoolTypeId": 1.5}) is None
+        assert server.resolve("/api/offer/schoolDetails", {"schoolId": True}) is None
+        assert server.resolve("/api/offer/schoolDetails", {"schoolId": "12"}) == (
+            server.raw_dir / "school_details" / "12.json"
+        )
+
+
+def test_replay_server_requires_csrf_header(raw_snapshot_dir):
+    raw_dir, _snapshot = raw_snapshot_dir
+
+    with serve_snapshot(raw_dir) as server:
+        response = requests.get(
+            f"{server.base_url}/omikron-public/api/offer/search", timeout=5
+        )
+
+    assert response.status_code == 403
+
+
+def test_replay_server_simulates_errors_and_latency(raw_snapshot_dir):
+    raw_dir, _snapshot = raw_snapshot_dir
+
+    with serve_snapshot(raw_dir, ReplayConfig(error_rate=1.0, seed=1)) as server:
+        client = PzoOmikronClient(base_url=server.base_url, timeout=5)
+        with pytest.raises(requests.HTTPError):
+            client.get_search_metadata()
+
+    with serve_snapshot(raw_dir, ReplayConfig(latency=0.05)) as server:
+        client = PzoOmikronClient(base_url=server.base_url, timeout=5)
+        started = time.perf_counter()
+        client.get_search_metadata()
+        assert time.perf_counter() - started >= 0.05
+
+
+def test_replay_server_throttles_with_retry_after(raw_snapshot_dir):
+    raw_dir, _snapshot = raw_snapshot_dir
+    config = ReplayConfig(max_requests_per_second=2, retry_after=3)
+
+    with serve_snapshot(raw_dir, config) as server:
+        url = f"{server.base_url}/omikron-public/api/offer/search"
+        headers = {"x-csrf-protection": "1"}
+        responses = [requests.get(url, headers=headers, timeout=5) for _ in range(4)]
+
+    assert [response.status_code for response in responses[:2]] == [200, 200]
+    assert responses[2].status_code == 429
+    assert responses[2].headers["Retry-After"] == "3"
+    assert server.stats[("/api/offer/search", 429)] == 2
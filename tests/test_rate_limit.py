@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from scripts.api_clients.googlemaps_api import get_coordinates_for_addresses_batch
+from scripts.api_clients.rate_limit import (
+    RateLimitedExecutor,
+    TokenBucket,
+    is_over_query_limit,
+)
+
+
+class ApiError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class FakeGeocodeClient:
+    """Zapisuje czas (wg ``clock``) każdego zapytania; wybrane adresy zwracają OVER_QUERY_LIMIT."""
+
+    def __init__(self, over_limit=None, clock=time.monotonic, busy_workers=None):
+        self.over_limit = dict(over_limit or {})
+        self.clock = clock
+        self.calls = []
+        self._lock = threading.Lock()
+        # Przy ``busy_workers`` zapytanie czeka, aż tyle wątków będzie w kliencie.
+        self.busy_workers = busy_workers
+        self.active = 0
+        self.all_busy = threading.Event()
+
+    def geocode(self, address):
+        with self._lock:
+            self.calls.append((self.clock(), address))
+            if self.over_limit.get(address, 0) > 0:
+                self.over_limit[address] -= 1
+                raise ApiError("OVER_QUERY_LIMIT")
+            self.active += 1
+            if self.active == self.busy_workers:
+                self.all_busy.set()
+        if self.busy_workers:
+            self.all_busy.wait(timeout=5)
+        with self._lock:
+            self.active -= 1
+        if address.startswith("brak"):
+            return []
+        number = int(address.split()[-1])
+        return [{"geometry": {"location": {"lat": 52.0 + number, "lng": 21.0}}}]
+
+
+def test_token_bucket_spaces_acquisitions_with_fake_clock():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=4, capacity=2, clock=lambda: now[0], sleep=sleep)
+    stamps = []
+    for _ in range(6):
+        bucket.acquire()
+        stamps.append(now[0])
+
+    assert stamps == pytest.approx([0.0, 0.0, 0.25, 0.5, 0.75, 1.0])
+
+
+class FakeClock:
+    """Wspólny dla wątków zegar; ``sleep`` przesuwa czas zamiast czekać."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.now += seconds
+
+
+def test_executor_limits_qps_across_threads_and_keeps_input_order():
+    clock = FakeClock()
+    client = FakeGeocodeClient(clock=clock, busy_workers=4)
+    executor = RateLimitedExecutor(
+        qps=50, max_workers=4, clock=clock, sleep=clock.sleep
+    )
+    addresses = [f"Adres {i}" for i in range(12)] + ["brak wyniku"]
+
+    coordinates = get_coordinates_for_addresses_batch(
+        client, addresses, executor=executor
+    )
+
+    assert list(coordinates) == addresses
+    assert coordinates["Adres 3"] == (55.0, 21.0)
+    assert coordinates["brak wyniku"] == (None, None)
+    stamps = sorted(stamp for stamp, _ in client.calls)
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert min(gaps) >= 1 / 50 - 1e-9
+    # Cztery wątki naraz w kliencie: zapytania nie szły po kolei.
+    assert client.all_busy.is_set()
+
+
+def test_over_query_limit_is_retried_with_jittered_backoff():
+    client = FakeGeocodeClient(over_limit={"Adres 1": 2})
+    sleeps = []
+    executor = RateLimitedExecutor(
+        qps=1000, max_workers=1, backoff=0.5, jitter=0.5, rng=lambda: 0.5
+    )
+    executor.sleep = sleeps.append
+
+    coordinates = get_coordinates_for_addresses_batch(
+        client, ["Adres 1", "Adres 2"], executor=executor
+    )
+
+    assert coordinates == {"Adres 1": (53.0, 21.0), "Adres 2": (54.0, 21.0)}
+    assert [address for _, address in client.calls].count("Adres 1") == 3
+    assert sleeps == pytest.approx([0.625, 1.25])
+
+
+def test_over_query_limit_gives_up_after_retries_and_other_errors_are_not_retried():
+    executor = RateLimitedExecutor(qps=1000, retries=1, backoff=0)
+    calls = []
+
+    def always_over_limit():
+        calls.append(1)
+        raise ApiError("OVER_QUERY_LIMIT")
+
+    with pytest.raises(ApiError):
+        executor.call(always_over_limit)
+    assert len(calls) == 2
+
+    def broken():
+        calls.append(1)
+        raise ValueError("INVALID_REQUEST")
+
+    with pytest.raises(ValueError):
+        executor.call(broken)
+    assert len(calls) == 3
+    assert is_over_query_limit(ApiError("OVER_QUERY_LIMIT"))
+    assert not is_over_query_limit(ApiError("ZERO_RESULTS"))
@@ -0,0 +1,196 @@
+import json
+import threading
+
+import pytest
+import requests
+
+from scripts import pipeline
+from scripts.data_processing.get_data_vulcan_async import VulcanRawStore
+from scripts.data_processing.source_store import (
+    OfflineSourceError,
+    SourceStore,
+    fetch_source,
+    refresh_sources,
+)
+
+
+class FakeResponse:
+    def __init__(self, content=b"", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeServer:
+    """Odpowiada 304, gdy ETag z zapytania zgadza się z bieżącą treścią."""
+
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None, headers=None):
+        headers = headers or {}
+        with self._lock:
+            self.calls.append((url, headers))
+        if url not in self.files:
+            return FakeResponse(status_code=404)
+        content = self.files[url]
+        etag = f'"{len(content)}-{content[:4].hex()}"'
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(status_code=304)
+        return FakeResponse(
+            content,
+            headers={"ETag": etag, "Last-Modified": "Mon, 07 Jul 2025 10:00:00 GMT"},
+        )
+
+
+@pytest.fixture
+def tmp_dir(tmp_path):
+    return tmp_path
+
+
+def test_fetch_source_uses_conditional_requests_and_tracks_hash(tmp_dir):
+    server = FakeServer({"https://x.pl/progi.xlsx": b"v1 content"})
+    store = SourceStore(tmp_dir / "store", base_dir=tmp_dir)
+    target = tmp_dir / "raw" / "progi.xlsx"
+
+    first = fetch_source(store, target, "https://x.pl/progi.xlsx", session=server)
+    assert first.status == "downloaded" and first.changed
+    assert target.read_bytes() == b"v1 content"
+    assert store.object_path(first.sha256).read_bytes() == b"v1 content"
+    entry = store.entry(target)
+    assert entry["url"] == "https://x.pl/progi.xlsx"
+    assert entry["etag"] and entry["last_modified"] and entry["fetched_at"]
+
+    second = fetch_source(store, target, "https://x.pl/progi.xlsx", session=server)
+    assert second.status == "unchanged" and second.sha256 == first.sha256
+    assert server.calls[-1][1]["If-None-Match"] == entry["etag"]
+    assert server.calls[-1][1]["If-Modified-Since"] == entry["last_modified"]
+
+    server.files["https://x.pl/progi.xlsx"] = b"v2 content!"
+    third = fetch_source(store, target, "https://x.pl/progi.xlsx", session=server)
+    assert third.status == "updated" and third.sha256 != first.sha256
+    assert target.read_bytes() == b"v2 content!"
+    assert store.object_path(first.sha256).exists()
+
+
+def test_first_refresh_compares_with_existing_working_copy(tmp_dir):
+    server = FakeServer({"https://x.pl/progi.xlsx": b"v1 content"})
+    store = SourceStore(tmp_dir / "store", base_dir=tmp_dir)
+    same = tmp_dir / "raw" / "progi.xlsx"
+    same.parent.mkdir(parents=True)
+    same.write_bytes(b"v1 content")
+    stale = tmp_dir / "raw" / "stare.xlsx"
+    stale.write_bytes(b"v0")
+
+    assert fetch_source(
+        store, same, "https://x.pl/progi.xlsx", session=server
+    ).status == ("unchanged")
+    result = fetch_source(store, stale, "https://x.pl/progi.xlsx", session=server)
+    assert result.status == "updated" and result.changed
+    assert stale.read_bytes() == b"v1 content"
+
+
+def test_store_restores_missing_or_corrupted_working_copy(tmp_dir, monkeypatch):
+    server = FakeServer({"https://x.pl/progi.xlsx": b"v1 content"})
+    store = SourceStore(tmp_dir / "store", base_dir=tmp_dir)
+    target = tmp_dir / "raw" / "progi.xlsx"
+    fetch_source(store, target, "https://x.pl/progi.xlsx", session=server)
+
+    assert not store.restore(target)
+    target.write_bytes(b"uszkodzony")
+    assert store.restore(target) and target.read_bytes() == b"v1 content"
+
+    target.unlink()
+    monkeypatch.setattr(pipeline, "_source_store", store)
+    source = {"path": str(target), "source_url": "https://x.pl/progi.xlsx"}
+    assert pipeline.ensure_source_file(source, offline=True) == target
+    assert target.read_bytes() == b"v1 content"
+    assert len(server.calls) == 1
+
+
+def test_refresh_sources_reports_each_source_and_writes_manifest(tmp_dir):
+    server = FakeServer(
+        {"https://x.pl/a.xlsx": b"a" * 10, "https://x.pl/b.html": b"<html>"}
+    )
+    store = SourceStore(tmp_dir / "store", base_dir=tmp_dir)
+    sources = [
+        {"path": tmp_dir / "a.xlsx", "source_url": "https://x.pl/a.xlsx"},
+        {"path": tmp_dir / "b.html", "source_url": "https://x.pl/b.html"},
+        {"path": tmp_dir / "gone.xlsx", "source_url": "https://x.pl/gone.xlsx"},
+        {"path": tmp_dir / "local.xlsx"},
+    ]
+
+    results = refresh_sources(sources, store, session=server, max_workers=4)
+
+    assert [result.status for result in results] == [
+        "downloaded",
+        "downloaded",
+        "failed",
+        "local",
+    ]
+    manifest = json.loads(store.manifest_path.read_text(encoding="utf-8"))
+    assert sorted(manifest["sources"]) == ["a.xlsx", "b.html"]
+
+    reloaded = SourceStore(tmp_dir / "store", base_dir=tmp_dir)
+    again = refresh_sources(sources[:2], reloaded, session=server)
+    assert [result.status for result in again] == ["unchanged", "unchanged"]
+
+
+def test_offline_pipeline_fails_fast_listing_missing_inputs(tmp_dir, monkeypatch):
+    year_cfg = {
+        "year": 2030,
+        "offer": {"type": "pzo_omikron", "path": str(tmp_dir / "offer")},
+        "thresholds": {
+            "path": str(tmp_dir / "progi.xlsx"),
+            "source_url": "https://x.pl/progi.xlsx",
+        },
+        "ranking": {"type": "perspektywy_html", "path": str(tmp_dir / "r.html")},
+    }
+    monkeypatch.setattr(pipeline, "project_config", lambda: {})
+    monkeypatch.setattr(pipeline, "source_config", lambda: {"years": {2030: year_cfg}})
+    monkeypatch.setattr(
+        pipeline,
+        "process_year",
+        lambda *args: pytest.fail("offline nie powinien przetwarzać danych"),
+    )
+
+    with pytest.raises(OfflineSourceError) as excinfo:
+        pipeline.run_pipeline(offline=True)
+
+    message = str(excinfo.value)
+    assert "progi.xlsx" in message and "r.html" in message and "offer" in message
+    with pytest.raises(OfflineSourceError):
+        pipeline.ensure_source_file(year_cfg["thresholds"], offline=True)
+
+
+def test_vulcan_offer_offline_needs_saved_pages(tmp_dir):
+    raw_dir = tmp_dir / "vulcan_raw"
+    offer_cfg = {"path": str(tmp_dir / "oferta.xlsx"), "raw_dir": str(raw_dir)}
+    store = VulcanRawStore(raw_dir)
+    store.save(7, 404, None)
+    store.write_manifest()
+
+    assert not pipeline.offer_available_offline(offer_cfg)
+
+    store.save(8, 200, "<html></html>")
+    store.write_manifest()
+    assert pipeline.offer_available_offline(offer_cfg)
+
+
+def test_configured_sources_dedupes_paths_across_years(tmp_dir):
+    shared = {"path": str(tmp_dir / "progi.xlsx")}
+    years = [
+        {"thresholds": shared | {"source_url": "https://x.pl/p"}, "ranking": None},
+        {"thresholds": shared, "ranking": {"path": str(tmp_dir / "r.pdf")}},
+    ]
+
+    sources = pipeline.configured_sources(years)
+
+    assert [source["path"].name for source in sources] == ["progi.xlsx", "r.pdf"]
+    assert sources[0]["source_url"] == "https://x.pl/p"
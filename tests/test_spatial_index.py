@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.score import haversine_km, shortlist_schools_by_distance
+from scripts.analysis.spatial_index import SpatialIndex
+from scripts.visualization.plots import scatter_density_vs_rank
+
+
+def random_schools(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "NazwaSzkoly": [f"LO {i}" for i in range(n)],
+            "SzkolaLat": rng.uniform(52.10, 52.37, n),
+            "SzkolaLon": rng.uniform(20.85, 21.27, n),
+            "RankingPoz": rng.integers(1, 200, n),
+        },
+        index=[f"lo_{i}" for i in range(n)],
+    )
+
+
+def brute_force(df, lat, lon):
+    return haversine_km(lat, lon, df["SzkolaLat"], df["SzkolaLon"])
+
+
+@pytest.mark.parametrize("cell_km", [0.3, 1.0, 5.0])
+def test_radius_and_nearest_match_brute_force(cell_km):
+    df = random_schools()
+    index = SpatialIndex.from_frame(df, cell_km=cell_km)
+    rng = np.random.default_rng(0)
+
+    for lat, lon in zip(rng.uniform(52.0, 52.45, 25), rng.uniform(20.8, 21.3, 25)):
+        distances = brute_force(df, lat, lon)
+        for radius in (0.5, 2.0, 7.5):
+            expected = distances[distances <= radius].sort_values()
+            found = index.query_radius(lat, lon, radius)
+            assert set(found.index) == set(expected.index)
+            assert np.allclose(found.to_numpy(), expected.to_numpy())
+            assert index.count_radius(lat, lon, radius) == len(expected)
+        nearest = index.nearest(lat, lon, k=7)
+        assert nearest.index.tolist() == distances.nsmallest(7).index.tolist()
+
+
+def test_nearest_respects_max_distance_and_small_sets():
+    df = random_schools(n=5)
+    index = SpatialIndex.from_frame(df)
+    lat, lon = 52.23, 21.01
+
+    assert len(index.nearest(lat, lon, k=50)) == 5
+    limited = index.nearest(lat, lon, k=5, max_distance_km=3.0)
+    assert (limited <= 3.0).all()
+    assert len(index.nearest(lat, lon, k=0)) == 0
+    assert len(SpatialIndex([], []).nearest(lat, lon, k=3)) == 0
+
+
+def test_from_frame_skips_missing_coordinates():
+    df = pd.DataFrame(
+        {"SzkolaLat": [52.2, None, "52.3"], "SzkolaLon": [21.0, 21.1, 21.2]},
+        index=["a", "b", "c"],
+    )
+
+    index = SpatialIndex.from_frame(df)
+
+    assert len(index) == 2
+    assert index.nearest(52.3, 21.2).index.tolist() == ["c"]
+    assert len(SpatialIndex.from_frame(df.drop(columns=["SzkolaLon"]))) == 0
+    with pytest.raises(ValueError):
+        SpatialIndex([52.2], [None])
+
+
+def test_neighbour_counts_match_pairwise_distances():
+    df = random_schools(n=120)
+    expected = [
+        int((brute_force(df, lat, lon) <= 1.0).sum()) - 1
+        for lat, lon in zip(df["SzkolaLat"], df["SzkolaLon"])
+    ]
+
+    counts = SpatialIndex.from_frame(df).neighbour_counts(1.0)
+
+    assert counts.tolist() == expected
+    fig = scatter_density_vs_rank(df.reset_index(drop=True))
+    assert fig is not None
+
+
+def test_shortlist_with_index_matches_distance_column():
+    df = random_schools()
+    lat, lon = 52.2297, 21.0122
+    expected = shortlist_schools_by_distance(
+        df.assign(OdlegloscKm=brute_force(df, lat, lon)), limit=15, max_distance_km=4
+    )
+
+    result = shortlist_schools_by_distance(
+        df,
+        limit=15,
+        max_distance_km=4,
+        spatial_index=SpatialIndex.from_frame(df),
+        start_point=(lat, lon),
+    )
+
+    assert result.index.tolist() == expected.index.tolist()
+    assert np.allclose(result["OdlegloscKm"], expected["OdlegloscKm"])
@@ -0,0 +1,240 @@
+import datetime
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.transit_router import (
+    Pattern,
+    TransitRouter,
+    active_service_ids,
+    parse_gtfs_time,
+)
+
+STOPS = {
+    "A": (52.200, 21.000),
+    "B": (52.210, 21.000),
+    "B2": (52.2105, 21.000),  # ok. 55 m od B - przesiadka piesza
+    "C": (52.220, 21.000),
+    "D": (52.230, 21.010),
+    "E": (52.250, 21.050),
+}
+# (trip_id, service_id, [(stop, HH:MM), ...])
+TRIPS = [
+    ("L1_1", "WD", [("A", "07:35"), ("B", "07:42"), ("C", "07:50")]),
+    ("L1_2", "WD", [("A", "07:50"), ("B", "07:57"), ("C", "08:05")]),
+    # Ekspres wyprzedza L1_1 - musi trafić do osobnego wzorca.
+    ("L1_X", "WD", [("A", "07:37"), ("B", "07:41"), ("C", "07:45")]),
+    ("L2_1", "WD", [("B2", "07:46"), ("D", "07:58")]),
+    ("L2_2", "WD", [("B2", "08:10"), ("D", "08:22")]),
+    ("L3_1", "WE", [("A", "07:40"), ("E", "07:55")]),
+    ("L4_1", "WD", [("C", "07:00"), ("E", "07:20")]),  # odjechał przed nami
+]
+ORIGIN = (52.2005, 21.000)  # ok. 55 m od A
+SCHOOLS = {
+    "przy_C": STOPS["C"],
+    "przy_D": (52.23045, 21.010),  # ok. 50 m od D
+    "przy_E": STOPS["E"],
+    "pieszo": (52.2014, 21.000),  # 100 m od punktu startu
+    "daleko": (52.500, 21.500),
+}
+MONDAY = datetime.date(2025, 9, 1)
+SATURDAY = datetime.date(2025, 9, 6)
+
+
+def write_gtfs(directory: Path) -> None:
+    directory.mkdir(parents=True)
+    pd.DataFrame(
+        [
+            {"stop_id": stop, "stop_name": stop, "stop_lat": lat, "stop_lon": lon}
+            for stop, (lat, lon) in STOPS.items()
+        ]
+    ).to_csv(directory / "stops.txt", index=False)
+    pd.DataFrame(
+        [
+            {"route_id": trip.split("_")[0], "service_id": service, "trip_id": trip}
+            for trip, service, _ in TRIPS
+        ]
+    ).to_csv(directory / "trips.txt", index=False)
+    pd.DataFrame(
+        [
+            {
+                "trip_id": trip,
+                "arrival_time": f"{clock}:00",
+                "departure_time": f"{clock}:00",
+                "stop_id": stop,
+                "stop_sequence": sequence,
+            }
+            for trip, _, calls in TRIPS
+            for sequence, (stop, clock) in enumerate(calls, start=1)
+        ]
+    ).to_csv(directory / "stop_times.txt", index=False)
+    days = ["monday", "tuesday", "wednesday", "thursday", "friday"]
+    weekend = ["saturday", "sunday"]
+    pd.DataFrame(
+        [
+            {"service_id": "WD", **{d: int(d in days) for d in days + weekend}},
+            {"service_id": "WE", **{d: int(d in weekend) for d in days + weekend}},
+        ]
+    ).assign(start_date=20250101, end_date=20251231).to_csv(
+        directory / "calendar.txt", index=False
+    )
+
+
+@pytest.fixture(scope="module")
+def gtfs_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("gtfs") / "feed"
+    write_gtfs(path)
+    return path
+
+
+def school_minutes(router, **kwargs):
+    targets = router.prepare_targets(
+        [lat for lat, _ in SCHOOLS.values()], [lon for _, lon in SCHOOLS.values()]
+    )
+    minutes = router.travel_minutes(*ORIGIN, targets, **kwargs)
+    return dict(zip(SCHOOLS, minutes))
+
+
+def test_parse_gtfs_time_handles_after_midnight_and_blanks():
+    parsed = parse_gtfs_time(pd.Series(["07:30:00", "25:10:30", None, ""]))
+    assert parsed[:2].tolist() == [27000, 90630]
+    assert np.isnan(parsed[2:]).all()
+
+
+def test_active_service_ids_applies_calendar_dates_exceptions():
+    calendar = pd.DataFrame(
+        {
+            "service_id": ["WD"],
+            "monday": [1],
+            "tuesday": [1],
+            "wednesday": [1],
+            "thursday": [1],
+            "friday": [1],
+            "saturday": [0],
+            "sunday": [0],
+            "start_date": [20250101],
+            "end_date": [20251231],
+        }
+    )
+    exceptions = pd.DataFrame(
+        {
+            "service_id": ["WD", "HOLIDAY"],
+            "date": [20250901, 20250901],
+            "exception_type": [2, 1],
+        }
+    )
+    assert active_service_ids(calendar, None, MONDAY) == {"WD"}
+    assert active_service_ids(calendar, exceptions, MONDAY) == {"HOLIDAY"}
+
+
+def test_router_finds_earliest_arrivals_with_transfers(gtfs_dir):
+    router = TransitRouter.from_gtfs(gtfs_dir, service_date=MONDAY)
+    minutes = school_minutes(router)
+
+    # Ekspres L1_X: odjazd 7:37, przyjazd na C 7:45.
+    assert minutes["przy_C"] == pytest.approx(15.0)
+    # L1_X do B (7:41), 45 s pieszo na B2, L2_1 7:46 -> D 7:58, 40 s do szkoły.
+    assert minutes["przy_D"] == pytest.approx(28 + 40 / 60, abs=0.02)
+    assert minutes["pieszo"] == pytest.approx(100 / 1.25 / 60, abs=0.02)
+    assert np.isnan(minutes["przy_E"])  # L3 tylko w weekend, L4 już odjechał
+    assert np.isnan(minutes["daleko"])
+
+    single_ride = school_minutes(router, max_rounds=1)
+    assert single_ride["przy_C"] == pytest.approx(15.0)
+    assert np.isnan(single_ride["przy_D"])
+
+    later = school_minutes(router, departure_seconds=7 * 3600 + 45 * 60)
+    # L1_2 7:50 -> B 7:57, L2_2 8:10 -> D 8:22.
+    assert later["przy_D"] == pytest.approx(37 + 40 / 60, abs=0.02)
+
+
+def test_router_reads_zip_and_filters_services_by_date(gtfs_dir):
+    archive = gtfs_dir.with_suffix(".zip")
+    try:
+        with zipfile.ZipFile(archive, "w") as zf:
+            for path in gtfs_dir.iterdir():
+                zf.write(path, path.name)
+        router = TransitRouter.from_gtfs(archive, service_date=SATURDAY)
+    finally:
+        archive.unlink()
+
+    minutes = school_minutes(router)
+    assert minutes["przy_E"] == pytest.approx(25.0)
+    assert np.isnan(minutes["przy_C"]) and np.isnan(minutes["przy_D"])
+
+
+def test_router_splits_overtaking_trips_into_fifo_patterns(gtfs_dir):
+    router = TransitRouter.from_gtfs(gtfs_dir)
+
+    for pattern in router.patterns:
+        assert (np.diff(pattern.arrivals, axis=0) >= 0).all()
+        assert (np.diff(pattern.departures, axis=0) >= 0).all()
+    line_1 = [p for p in router.patterns if len(p.stops) == 3]
+    assert sorted(len(p.arrivals) for p in line_1) == [1, 2]
+
+
+def random_network(rng):
+    """Losowa sieć: przystanki w kwadracie ok. 1,5 km, linie FIFO."""
+    n_stops = 30
+    lat = 52.2 + rng.uniform(0, 0.014, n_stops)
+    lon = 21.0 + rng.uniform(0, 0.022, n_stops)
+    patterns = []
+    for _ in range(8):
+        stops = rng.choice(n_stops, size=rng.integers(3, 7), replace=False)
+        profile = np.concatenate(
+            [[0], np.cumsum(rng.integers(60, 400, len(stops) - 1))]
+        )
+        starts = np.sort(rng.integers(7 * 3600, 8 * 3600, 4))
+        times = starts[:, None] + profile[None, :]
+        patterns.append(Pattern(stops=stops, arrivals=times, departures=times))
+    return TransitRouter(np.arange(n_stops), lat, lon, patterns), lat, lon
+
+
+def connection_scan(router, origin_stop, departure):
+    """Wzorzec: skan połączeń, przejście piesze po każdym przyjeździe pojazdu."""
+    offsets = router.stop_xy[:, None, :] - router.stop_xy[None, :, :]
+    distance = np.hypot(offsets[..., 0], offsets[..., 1])
+    walk_seconds = np.ceil(distance / router.walk_speed_mps)
+    nearby = (distance <= 300.0) & ~np.eye(len(distance), dtype=bool)
+    connections = sorted(
+        (p.departures[t, i], p.arrivals[t, i + 1], p.stops[i], p.stops[i + 1], (k, t))
+        for k, p in enumerate(router.patterns)
+        for t in range(len(p.departures))
+        for i in range(len(p.stops) - 1)
+    )
+    best = np.full(len(router.stop_ids), np.inf)
+    best[origin_stop] = departure
+    boarded = set()
+    for dep, arr, u, v, trip in connections:
+        if trip not in boarded and best[u] > dep:
+            continue
+        boarded.add(trip)
+        best[v] = min(best[v], arr)
+        walked = arr + walk_seconds[v]
+        best[nearby[v]] = np.minimum(best[nearby[v]], walked[nearby[v]])
+    return best
+
+
+def test_router_matches_connection_scan_on_random_networks():
+    rng = np.random.default_rng(45)
+    departure = 7 * 3600
+    for _ in range(200):
+        router, lat, lon = random_network(rng)
+        origin = int(rng.integers(len(lat)))
+        expected = (connection_scan(router, origin, departure) - departure) / 60.0
+        expected[~np.isfinite(expected)] = np.nan
+
+        minutes = router.travel_minutes(
+            lat[origin],
+            lon[origin],
+            router.prepare_targets(lat, lon, max_walk_m=1.0),
+            departure_seconds=departure,
+            max_rounds=40,
+            max_access_walk_m=1.0,
+            max_minutes=600,
+        )
+
+        np.testing.assert_allclose(minutes, expected)
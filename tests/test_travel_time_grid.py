@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.analysis.score import add_travel_time_from_grid, score_personalized_classes
+from scripts.analysis.travel_time_grid import (
+    NO_DATA,
+    SpeedModelTimeSource,
+    TravelTimeGrid,
+    build_travel_time_grid,
+    dequantize,
+    load_travel_time_grid,
+    quantize,
+)
+
+BOUNDS = (52.20, 21.00, 52.22, 21.03)
+SCHOOLS = pd.DataFrame(
+    {
+        "SzkolaIdentyfikator": ["LO_A", "LO_B"],
+        "SzkolaLat": [52.205, 52.215],
+        "SzkolaLon": [21.005, 21.025],
+    }
+)
+
+
+class UnreachableSecond:
+    def __call__(self, lat, lon):
+        return np.array([lat * 100 - 5220, np.nan])
+
+
+def build_speed_grid(**kwargs):
+    source = SpeedModelTimeSource(SCHOOLS["SzkolaLat"], SCHOOLS["SzkolaLon"])
+    return build_travel_time_grid(
+        SCHOOLS["SzkolaIdentyfikator"], source, bounds=BOUNDS, workers=1, **kwargs
+    )
+
+
+def test_quantize_rounds_caps_and_marks_missing():
+    values = quantize(np.array([0.4, 12.6, 400.0, np.nan, -3.0]))
+    assert values.dtype == np.uint8
+    assert values.tolist() == [0, 13, 254, NO_DATA, 0]
+    restored = dequantize(quantize(np.array([10.0, np.nan]), step_min=2.0), 2.0)
+    assert restored[0] == 10.0 and np.isnan(restored[1])
+
+
+def test_grid_covers_bounds_and_looks_up_cell_values():
+    grid = build_speed_grid()
+
+    assert grid.shape == (9, 9)  # ok. 2,2 km x 2,05 km w komórkach 250 m
+    assert grid.minutes.shape == (9, 9, 2)
+    assert (grid.minutes != NO_DATA).all()
+    source = SpeedModelTimeSource(SCHOOLS["SzkolaLat"], SCHOOLS["SzkolaLon"])
+    row, col = grid.cell_of(52.2051, 21.0052)
+    expected = source(*grid.cell_center(row, col))
+    np.testing.assert_array_equal(grid.minutes[row, col], quantize(expected))
+    minutes = grid.lookup(52.2051, 21.0052)
+    assert minutes.index.tolist() == ["LO_A", "LO_B"]
+    np.testing.assert_allclose(minutes.to_numpy(), expected, atol=0.5)
+    assert minutes["LO_A"] < minutes["LO_B"]
+    assert grid.lookup(52.30, 21.0).isna().all()
+
+
+def test_grid_parallel_build_matches_serial_and_keeps_missing():
+    serial = build_travel_time_grid(
+        ["LO_A", "LO_B"], UnreachableSecond(), bounds=BOUNDS, workers=1
+    )
+    parallel = build_travel_time_grid(
+        ["LO_A", "LO_B"], UnreachableSecond(), bounds=BOUNDS, workers=2
+    )
+
+    np.testing.assert_array_equal(serial.minutes, parallel.minutes)
+    assert (serial.minutes[..., 1] == NO_DATA).all()
+    assert serial.minutes[..., 0].tolist() == sorted(serial.minutes[..., 0].tolist())
+
+
+def test_grid_round_trips_through_npz(tmp_path):
+    directory = tmp_path / "grid"
+    assert load_travel_time_grid(directory / "brak.npz") is None
+    grid = build_speed_grid(metadata={"source": "speed"})
+    grid.save(directory / "grid.npz")
+    loaded = TravelTimeGrid.load(directory / "grid.npz")
+
+    np.testing.assert_array_equal(loaded.minutes, grid.minutes)
+    assert loaded.keys.tolist() == ["LO_A", "LO_B"]
+    assert loaded.cell_m == grid.cell_m and loaded.lat_min == grid.lat_min
+    assert loaded.metadata["source"] == "speed"
+    assert loaded.lookup(52.205, 21.005).equals(grid.lookup(52.205, 21.005))
+
+
+def test_scoring_prefers_grid_travel_time_over_straight_line():
+    grid = build_speed_grid()
+    schools = add_travel_time_from_grid(
+        SCHOOLS.assign(OdlegloscKm=[1.0, 1.0]), grid, 52.205, 21.005
+    )
+    assert schools["CzasDojazduMin"].notna().all()
+    assert (
+        add_travel_time_from_grid(SCHOOLS, None, 52.2, 21.0)["CzasDojazduMin"]
+        .isna()
+        .all()
+    )
+
+    classes = schools.assign(
+        Prog_min_klasa=[150.0, 150.0],
+        Prog_min_szkola=np.nan,
+        CzasDojazduMin=[15.0, np.nan],
+    )
+    scored = score_personalized_classes(
+        classes, points=160, weights={"distance": 1.0}
+    ).set_index("SzkolaIdentyfikator")
+
+    assert scored.loc["LO_A", "DistanceComponent"] == pytest.approx(0.75)
+    # Brak czasu dla LO_B: składowa wraca do odległości 1 km z 15 km.
+    assert scored.loc["LO_B", "DistanceComponent"] == pytest.approx(14 / 15)
+    assert "dojazd 15 min" in scored.loc["LO_A", "Dlaczego"]